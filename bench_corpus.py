@@ -0,0 +1,69 @@
+"""Renders every board of a config corpus and reports throughput and tail latency.
+
+    SLD_CORPUS_PATH=corpus.jsonl streamlit run deploycode.py   # capture
+    python bench_corpus.py corpus.jsonl
+
+Each entry is rendered the way a rerun renders it on a render-cache miss:
+the preview PNG, then the PowerPoint deck. Calls go straight to
+deploycode's renderers, in one process, so in-process caches (feeder
+fragments, symbol templates) warm up over the corpus as they do on a
+server. Prints latency percentiles per artifact and per whole entry,
+entries per second, and the slowest entries by shape.
+"""
+import io
+import os
+import sys
+import time
+import argparse
+
+from loadtest import percentile
+
+def shape(board):
+    """Short description of a board: voltage, feeders by type, couplers."""
+    kinds = {}
+    for conf in board["swg_configs"].values():
+        kind = "Extension" if conf["type"] == "Sub-Board" and conf.get("sub_voltage") == board["voltage"] else conf["type"]
+        kinds[kind] = kinds.get(kind, 0) + 1
+    couplers = len(board["lv_couplers"]) + len(board["inter_sub_bus_couplers"]) + len(board["inter_lv_couplers"])
+    return f"{board['voltage']} " + " ".join(f"{n}x{k}" for k, n in sorted(kinds.items())) + f", {couplers} couplers"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("corpus", nargs="?", default=os.environ.get("SLD_CORPUS_PATH", "corpus.jsonl"),
+                        help="corpus file (default: $SLD_CORPUS_PATH, else corpus.jsonl)")
+    parser.add_argument("--repeat", type=int, default=1, help="times the whole corpus is rendered")
+    parser.add_argument("--only", choices=("preview", "pptx"), help="render one artifact only")
+    parser.add_argument("--slowest", type=int, default=5, help="slowest entries to list")
+    args = parser.parse_args()
+    os.environ.pop("SLD_CORPUS_PATH", None) # Rendering must not capture
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import deploycode as dc
+
+    entries = dc.read_corpus(args.corpus)
+    if not entries: raise SystemExit(f"{args.corpus}: no entries of corpus version {dc.CORPUS_VERSION}")
+    artifacts = [args.only] if args.only else ["preview", "pptx"]
+    render = {"preview": lambda b: dc.write_preview_png(b, io.BytesIO()), "pptx": lambda b: dc.generate_pptx(**b)}
+    print(f"{len(entries)} entries, {args.repeat} round(s), artifacts: {', '.join(artifacts)}")
+
+    times = {a: [] for a in artifacts + ["entry"]}; per_entry = []
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for e in entries:
+            t_entry = time.perf_counter()
+            for a in artifacts:
+                t = time.perf_counter(); render[a](e["board"]); times[a].append(time.perf_counter() - t)
+            dt = time.perf_counter() - t_entry
+            times["entry"].append(dt); per_entry.append((dt, e))
+    wall = time.perf_counter() - t0
+
+    print(f"{'':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for a, xs in times.items():
+        xs = sorted(xs)
+        print(f"{a:>8} {percentile(xs, 50)*1e3:8.0f} {percentile(xs, 95)*1e3:8.0f} {percentile(xs, 99)*1e3:8.0f} {xs[-1]*1e3:8.0f}")
+    print(f"throughput: {len(per_entry) / wall:.2f} entries/s over {wall:.1f} s")
+    print("slowest:")
+    for dt, e in sorted(per_entry, key=lambda x: -x[0])[:args.slowest]:
+        print(f"  {dt*1e3:8.0f} ms  {e['id']}  {shape(e['board'])}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,49 @@
 import io
+import os
+import re
+import copy
+import json
+import base64
 import math
+import time
+import uuid
+import atexit
+import logging
+import hashlib
+import functools
+import collections
+import sqlite3
+import zipfile
+import zlib
+import tempfile
+import threading
+from importlib import metadata
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 import streamlit as st
-from pptx.util import Inches, Pt
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from pptx.util import Emu, Inches, Pt
 from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE, MSO_CONNECTOR_TYPE
 from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN
 from pptx import Presentation
+from pptx.shapes.group import GroupShape
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn, nsdecls
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+from lxml import etree
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.collections import LineCollection
+from matplotlib.text import Text
+from matplotlib.backend_bases import FigureCanvasBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 # ============================================================
 # 1. UTILS & CONFIGURATION
@@ -23,6 +59,30 @@ def get_tx_chain(voltage, scheme):
         else: return [{"ratio": "132/33 kV", "bus": "33kV"}, {"ratio": "33/11 kV", "bus": "11kV"}, {"ratio": "11/0.4 kV", "bus": "0.4kV"}]
     return []
 
+# --- Widget keys ---
+# Sidebar widget keys live in namespaces: the whole form, and inside it each
+# feeder's subtree. A namespace's generation is part of its keys, so resetting
+# one is a single counter bump; its widgets come back under new keys with their
+# defaults, and Streamlit drops the old keys once nothing renders them.
+
+def wkey(key, feeder=None):
+    """Session key of sidebar widget `key`, in feeder `feeder`'s subtree if given."""
+    gens = st.session_state.get("widget_gen", {})
+    form, sub = gens.get("form", 0), gens.get(feeder, 0) if feeder is not None else 0
+    return f"{form}.{sub}/{key}" if form or sub else key
+
+def reset_widgets(feeder=None):
+    """Resets one feeder's widgets, or with no feeder the whole form, to their defaults."""
+    gens = st.session_state.setdefault("widget_gen", {})
+    trace_event("reset", feeder)
+    if feeder is None: st.session_state.widget_gen = {"form": gens.get("form", 0) + 1}
+    else: gens[feeder] = gens.get(feeder, 0) + 1
+
+def prune_widget_generations(n_feeders):
+    """Forgets the generations of feeders past the last one, so a re-added feeder starts clean."""
+    gens = st.session_state.get("widget_gen", {})
+    for feeder in [f for f in gens if f != "form" and f >= n_feeders]: del gens[feeder]
+
 def get_lv_gen_inputs(key_prefix, include_emsb=False):
     if include_emsb:
         c1, c2, c3 = st.columns(3)
@@ -160,84 +220,610 @@ def calculate_section_layout(section_feeders, swg_configs, start_x, is_pptx=Fals
     total_width = current_x - start_x - dims["gap"] 
     return total_width, feeder_centers, feeder_widths, sub_widths_map
 
+def spooled_reader(write, suffix=""):
+    """Runs write(f) against a temp file and returns it reopened as a BufferedReader."""
+    # st.download_button accepts BufferedReader, so the payload never sits in our memory
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        write(f)
+    fh = open(path, "rb")
+    try:
+        os.remove(path) # POSIX keeps the open handle valid
+    except OSError:
+        pass
+    return fh
+
+# --- Colinear segment merging ---
+# While a batch is active, drawing code hands its straight segments to it instead
+# of the backend; touching colinear runs of one style are merged on the way out.
+
+_line_batch = threading.local()
+
+def batch_segment(x1, y1, x2, y2, style, payload):
+    """Queues a segment on the active batch; returns False when no batch is active."""
+    segs = getattr(_line_batch, "segs", None)
+    if segs is None: return False
+    segs.append((x1, y1, x2, y2, style, payload))
+    return True
+
+def merge_colinear(segs, eps=1e-9):
+    """Merges touching axis-aligned segments that share a line and style.
+    Returns (x1, y1, x2, y2, style, payloads) runs in order of their first segment."""
+    lines = {}; runs = []
+    for n, (x1, y1, x2, y2, style, payload) in enumerate(segs):
+        if x1 == x2: key = (0, x1, style); lo, hi = min(y1, y2), max(y1, y2)
+        elif y1 == y2: key = (1, y1, style); lo, hi = min(x1, x2), max(x1, x2)
+        else:
+            runs.append((n, (x1, y1, x2, y2, style, [payload]))); continue
+        lines.setdefault(key, []).append((lo, hi, n, payload))
+    for (axis, c, style), items in lines.items():
+        items.sort(key=lambda it: (it[0], it[2]))
+        group = []
+        for lo, hi, n, payload in items + [(math.inf, math.inf, -1, None)]:
+            if group and lo > group_hi + eps:
+                group.sort(key=lambda it: it[0])
+                seg = (c, group_lo, c, group_hi) if axis == 0 else (group_lo, c, group_hi, c)
+                runs.append((group[0][0], seg + (style, [p for _, p in group])))
+                group = []
+            if not group: group_lo, group_hi = lo, hi
+            group.append((n, payload)); group_hi = max(group_hi, hi)
+    runs.sort(key=lambda r: r[0])
+    return [r for _, r in runs]
+
+def merges_lines(flush):
+    """Decorator: batches segments drawn during the call and passes the merged runs to flush().
+    A nested call gets its own batch, so its shapes are final when it returns."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            outer = getattr(_line_batch, "segs", None)
+            segs = _line_batch.segs = []
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                _line_batch.segs = outer
+            flush(merge_colinear(segs))
+            return result
+        return run
+    return wrap
+
 # ============================================================
 # 2. PPTX DRAWING HELPERS
 # ============================================================
 
 def S(val, scale):
-    """Safe scaling to Inches, returns float-like Inch object"""
-    return Inches(float(val) * float(scale))
+    """Safe scaling to Inches, returns float-like Inch object (rounded to the nearest EMU)"""
+    return Emu(round(float(val) * float(scale) * 914400))
+
+# --- Theme and text styles ---
+# The few stroke colours and widths the SLD uses live in the deck theme, and
+# shapes point at them with p:style refs instead of repeating a:ln. Label
+# formats get a paragraph level each in the deck's default text styles.
+
+THEME_ACCENTS = {"accent1": "0070C0", "accent2": "00B050", "accent3": "FF0000"} # MV blue, generation green, coupler red
+THEME_COLORS = {v: k for k, v in THEME_ACCENTS.items()}
+THEME_COLORS["000000"] = "tx1"
+THEME_LINE_IDX = {2.0: "2", 3.0: "3"} # pt -> theme lnStyleLst entry
+_THEME_LINE_W = {"2": 25400, "3": 38100}
+_TEXT_LEVELS = 8 # lvl2pPr..lvl9pPr; lvl1pPr stays the untouched default
+
+_STYLE_XML = (
+    '<p:style><a:lnRef idx="{idx}"><a:schemeClr val="{clr}"/></a:lnRef>'
+    '<a:fillRef idx="0"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="1"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="tx1"/></a:fontRef></p:style>'
+) # python-pptx's connector style with the line ref swapped in
+
+def line_style_xml(width_pt, color, join=""):
+    """Returns (a:ln, p:style) XML for a stroke; theme colours and widths become style refs."""
+    scheme = THEME_COLORS.get(str(color)); idx = THEME_LINE_IDX.get(float(width_pt))
+    if scheme and idx:
+        return (f"<a:ln>{join}</a:ln>" if join else ""), _STYLE_XML.format(idx=idx, clr=scheme)
+    ln = f'<a:ln w="{Pt(width_pt)}"><a:solidFill><a:srgbClr val="{color}"/></a:solidFill>{join}</a:ln>'
+    return ln, _STYLE_XML.format(idx="2", clr="accent1")
+
+@functools.lru_cache(maxsize=8)
+def _sld_theme_blob(blob):
+    theme = parse_xml(blob)
+    scheme = theme.find(f"{qn('a:themeElements')}/{qn('a:clrScheme')}")
+    for name, val in THEME_ACCENTS.items():
+        el = scheme.find(qn(f"a:{name}"))
+        for c in list(el): el.remove(c)
+        el.append(parse_xml(f'<a:srgbClr {nsdecls("a")} val="{val}"/>'))
+    lines = theme.find(f"{qn('a:themeElements')}/{qn('a:fmtScheme')}/{qn('a:lnStyleLst')}")
+    for idx, w in _THEME_LINE_W.items(): lines[int(idx) - 1].set("w", str(w))
+    return etree.tostring(theme, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+def apply_sld_theme(prs):
+    """Sets the SLD colours and stroke widths on the deck's theme (cached per source theme)."""
+    part = prs.slide_master.part.part_related_by(RT.THEME)
+    part._blob = _sld_theme_blob(part.blob)
+
+# --- Base deck ---
+# python-pptx's default package carries ten layouts we never use, a printer
+# settings blob and a thumbnail. Strip them and bake the theme in once; every
+# build then opens a copy of the slim package.
+
+@functools.lru_cache(maxsize=1)
+def base_deck_bytes():
+    """The default deck cut to its master and Blank layout, SLD theme applied."""
+    prs = Presentation()
+    for layout in list(prs.slide_layouts):
+        if layout.name != "Blank": prs.slide_layouts.remove(layout)
+    for rels, reltype in ((prs.part.rels, RT.PRINTER_SETTINGS), (prs.part.package._rels, RT.THUMBNAIL)):
+        for rId in [r.rId for r in rels.values() if r.reltype == reltype]: rels.pop(rId)
+    props = prs.core_properties # Fixed, so equal configs give equal bytes
+    props.title = "Single Line Diagram"; props.last_modified_by = "SLD Generator"; props.comments = ""
+    apply_sld_theme(prs)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+def new_deck():
+    """Returns (presentation, blank_layout) opened from the slim base deck."""
+    prs = Presentation(io.BytesIO(base_deck_bytes()))
+    return prs, prs.slide_layouts[0]
+
+# --- Template decks ---
+# A company template is a deck whose first slide carries the border, title
+# block and revision table. Text in it may hold {project}, {drawing_no},
+# {revision}, {date}, {sheet} and {sheets}; a shape named "Drawing Frame"
+# marks the area the SLD is scaled into (the whole slide if there is none).
+# The template keeps its own theme, so its border and logo are drawn as
+# designed; finished sheets spell out the SLD colours and widths instead.
+
+SLD_TEMPLATE_PATH = os.environ.get("SLD_TEMPLATE_PATH", "") # Default company template, if any
+TEMPLATE_FRAME_NAME = "drawing frame"
+TITLE_BLOCK_FIELDS = ("project", "drawing_no", "revision", "date")
+
+@functools.lru_cache(maxsize=4)
+def _template_deck(data):
+    """Trims a template to its first slide; its theme is left as it is. Returns (bytes, frame)."""
+    prs = Presentation(io.BytesIO(data))
+    if not len(prs.slides):
+        raise ValueError("Template deck has no slides")
+    sld_ids = prs.slides._sldIdLst
+    for sld_id in list(sld_ids)[1:]:
+        sld_ids.remove(sld_id); prs.part.drop_rel(sld_id.rId)
+    shape = next((s for s in prs.slides[0].shapes if s.name.strip().lower() == TEMPLATE_FRAME_NAME), None)
+    if shape is not None: frame = (shape.left, shape.top, shape.width, shape.height)
+    else: frame = (0, 0, prs.slide_width, prs.slide_height)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue(), frame
+
+@functools.lru_cache(maxsize=4)
+def _template_file(path, mtime_ns, size):
+    with open(path, "rb") as f:
+        return _template_deck(f.read())
+
+def load_template(template):
+    """
+    Prepares a template deck, given as a path or as bytes; raises if it can't
+    be used. The template is parsed once per process (per path and mtime, or
+    per content). Returns (bytes, frame) with frame = (x, y, cx, cy) EMU.
+    """
+    if isinstance(template, (bytes, bytearray, memoryview)):
+        return _template_deck(bytes(template))
+    info = os.stat(template)
+    return _template_file(os.fspath(template), info.st_mtime_ns, info.st_size)
+
+def template_deck(template):
+    """Opens a fresh copy of a template deck. Returns (presentation, frame), see load_template()."""
+    data, frame = load_template(template)
+    return Presentation(io.BytesIO(data)), frame
+
+def clone_slide(prs, src, count=None):
+    """Appends a copy of `src` (its first `count` shapes) to the deck: background, shapes and the parts they reference."""
+    slide = prs.slides.add_slide(src.slide_layout)
+    tree = slide.shapes._spTree
+    for el in list(tree.iter_shape_elms()): tree.remove(el) # Layout placeholders
+    rids = {}
+    for rel in src.part.rels.values():
+        if rel.reltype in (RT.SLIDE_LAYOUT, RT.NOTES_SLIDE): continue
+        target = rel.target_ref if rel.is_external else rel.target_part
+        rids[rel.rId] = slide.part.relate_to(target, rel.reltype, rel.is_external)
+    bg = src._element.cSld.bg
+    if bg is not None: slide._element.cSld.insert(0, copy.deepcopy(bg))
+    for el in list(src.shapes._spTree.iter_shape_elms())[:count]:
+        tree.insert_element_before(copy.deepcopy(el), "p:extLst")
+    # Copied r:embed / r:id / r:link attributes still name the source slide's rIds
+    r_ns = qn("r:id")[:-len("id")]
+    for el in slide._element.iter():
+        for k, v in el.attrib.items():
+            if k.startswith(r_ns) and v in rids: el.set(k, rids[v])
+    return slide
+
+def add_sheet(prs, blank, sheets):
+    """
+    Adds the next drawing sheet and records it in `sheets` as (slide, number
+    of template shapes under the drawing). Without a layout (`blank` None)
+    the deck is a template: its slide is the first sheet, copies the rest.
+    """
+    if blank is not None: slide = prs.slides.add_slide(blank)
+    elif not sheets: slide = prs.slides[0]
+    else: slide = clone_slide(prs, *sheets[0]) # Template shapes only, not sheet 1's drawing
+    sheets.append((slide, 0 if blank is not None else len(list(slide.shapes._spTree.iter_shape_elms()))))
+    return slide
+
+def fill_title_block(slide, fields, count):
+    """Replaces {field} tokens in the first `count` (template) shapes of the slide."""
+    tokens = {f"{{{k}}}": str(v) for k, v in fields.items()}
+    for el in list(slide.shapes._spTree.iter_shape_elms())[:count]:
+        for p in el.iter(qn("a:p")):
+            runs = list(p.iter(qn("a:t")))
+            text = "".join(t.text or "" for t in runs)
+            if "{" not in text: continue
+            new = text
+            for tok, v in tokens.items(): new = new.replace(tok, v)
+            if new == text: continue
+            # PowerPoint may split a token across runs; the filled text takes the first run's format
+            runs[0].text = new
+            for t in runs[1:]: t.text = ""
+
+def inline_theme_strokes(slide, skip=0):
+    """
+    Gives drawn shapes (after the first `skip`) explicit srgbClr colours and
+    widths for the SLD accents and line styles their p:style refs point at.
+    A template keeps its own theme, where those slots mean something else.
+    """
+    for el in list(slide.shapes._spTree.iter_shape_elms())[skip:]:
+        for style in el.iter(qn("p:style")):
+            sp_pr = style.getprevious() # spPr comes right before the style in sp and cxnSp
+            ln_ref, fill_ref = style.find(qn("a:lnRef")), style.find(qn("a:fillRef"))
+            rgb = THEME_ACCENTS.get(ln_ref[0].get("val"))
+            if ln_ref.get("idx") in _THEME_LINE_W or rgb:
+                ln = sp_pr.get_or_add_ln()
+                if ln.get("w") is None and ln_ref.get("idx") in _THEME_LINE_W: ln.set("w", str(_THEME_LINE_W[ln_ref.get("idx")]))
+                if ln.eg_lineFillProperties is None and rgb: ln.get_or_change_to_solidFill().get_or_change_to_srgbClr().val = rgb
+            rgb = THEME_ACCENTS.get(fill_ref[0].get("val"))
+            if fill_ref.get("idx") != "0" and rgb and sp_pr.eg_fillProperties is None:
+                sp_pr.get_or_change_to_solidFill().get_or_change_to_srgbClr().val = rgb
+
+_deck_text = threading.local()
+
+def begin_text_styles():
+    """Starts collecting paragraph formats for the deck being built on this thread."""
+    _deck_text.levels = {}
+    _deck_text.inline = 0 # Paragraphs formatted inline because the levels ran out
+    _deck_text.used = None # Formats used by the drawing being recorded, see record_text_levels()
+
+def style_paragraph(p, size, bold=False, color=None, align=None):
+    """Formats a label paragraph, by deck text level while one is free, inline otherwise."""
+    levels = getattr(_deck_text, "levels", None)
+    key = (Pt(size).centipoints, bold, str(color) if color is not None else None, align)
+    if levels is not None and (key in levels or len(levels) < _TEXT_LEVELS):
+        p.level = levels.setdefault(key, len(levels) + 1)
+        used = getattr(_deck_text, "used", None)
+        if used is not None: used.append(key)
+        return
+    if levels is not None: _deck_text.inline += 1
+    p.font.size = Pt(size)
+    if bold: p.font.bold = True
+    if color is not None: p.font.color.rgb = color
+    if align is not None: p.alignment = align
+
+def record_text_levels(draw):
+    """
+    Runs draw() and returns (its result, the formats of the deck text levels
+    it used as {level: format} in first-use order, for claim_text_levels()).
+    The formats are None if a label had to be formatted inline.
+    """
+    outer = getattr(_deck_text, "used", None)
+    inline = getattr(_deck_text, "inline", None)
+    _deck_text.used = []
+    try: result = draw()
+    finally: used, _deck_text.used = _deck_text.used, outer
+    if outer is not None: outer.extend(used)
+    levels = getattr(_deck_text, "levels", None)
+    if levels is None or _deck_text.inline != inline: return result, None
+    # Claiming in first-use order numbers new levels as drawing again would
+    return result, {str(levels[key]): key for key in dict.fromkeys(used)}
+
+def claim_text_levels(formats):
+    """Claims this deck's levels for recorded `formats`; returns {old level: new level}, or None if they do not fit."""
+    levels = getattr(_deck_text, "levels", None)
+    if formats is None or levels is None: return None
+    if len(levels) + len({k for k in formats.values() if k not in levels}) > _TEXT_LEVELS: return None
+    used = getattr(_deck_text, "used", None)
+    if used is not None: used.extend(formats.values())
+    return {lvl: str(levels.setdefault(key, len(levels) + 1)) for lvl, key in formats.items()}
+
+def relevel(el, lvls):
+    """Renumbers the text levels of the paragraphs under el by {old level: new level}."""
+    for p_pr in el.iter(qn("a:pPr")):
+        if p_pr.get("lvl") is not None: p_pr.set("lvl", lvls[p_pr.get("lvl")])
+
+def apply_text_styles(prs, theme=True):
+    """
+    Writes the collected levels into the deck's default text style and master
+    otherStyle. theme: colours may name the SLD theme's slots (False for a
+    template deck, whose theme is its own).
+    """
+    levels = getattr(_deck_text, "levels", None) or {}
+    _deck_text.levels = None
+    targets = [prs.part._element.find(qn("p:defaultTextStyle")),
+               prs.slide_master._element.find(f"{qn('p:txStyles')}/{qn('p:otherStyle')}")]
+    for lst in targets:
+        if lst is None: continue
+        base = lst.find(qn("a:lvl1pPr"))
+        for (sz, bold, color, align), n in levels.items():
+            lvl = copy.deepcopy(base); lvl.tag = qn(f"a:lvl{n + 1}pPr")
+            lvl.set("marL", "0"); lvl.set("indent", "0")
+            if align is not None: lvl.set("algn", {PP_ALIGN.CENTER: "ctr", PP_ALIGN.RIGHT: "r"}.get(align, "l"))
+            rpr = lvl.find(qn("a:defRPr")); rpr.set("sz", str(sz)); rpr.set("b", "1" if bold else "0")
+            if color is not None:
+                for fill in rpr.findall(qn("a:solidFill")): rpr.remove(fill)
+                clr = f'<a:schemeClr val="{THEME_COLORS[color]}"/>' if theme and color in THEME_COLORS else f'<a:srgbClr val="{color}"/>'
+                rpr.insert(0, parse_xml(f'<a:solidFill {nsdecls("a")}>{clr}</a:solidFill>'))
+            old = lst.find(lvl.tag)
+            if old is not None: lst.replace(old, lvl)
+            else: lst.insert_element_before(lvl, "a:extLst")
+
+# --- Symbol templates ---
+# Each symbol is drawn once per (kind, scale, colour) with python-pptx around
+# (0, 0) on a scratch slide; placing it is a deepcopy plus an offset shift.
+# Stamped copies keep the template's shape ids until renumber_shape_ids().
+
+_XFRM_OFF = f"{qn('p:spPr')}/{qn('a:xfrm')}/{qn('a:off')}"
+_SYMBOL_TEMPLATES = {}
+_symbol_lock = threading.RLock() # Templates nest (a breaker is two stamped lines)
+_scratch = {}
+
+def _scratch_slide():
+    if "slide" not in _scratch:
+        prs, blank = new_deck()
+        _scratch["slide"] = prs.slides.add_slide(blank)
+    return _scratch["slide"]
+
+def symbol_template(key, draw):
+    """Returns the cached shape elements for `key`, building them with draw(slide) on first use."""
+    tpl = _SYMBOL_TEMPLATES.get(key)
+    if tpl is None:
+        with _symbol_lock:
+            tpl = _SYMBOL_TEMPLATES.get(key)
+            if tpl is None:
+                tree = _scratch_slide().shapes._spTree
+                n_before = len(tree)
+                draw(_scratch_slide())
+                tpl = list(tree)[n_before:]
+                for el in tpl:
+                    tree.remove(el)
+                    # The geometry is named by kind, name_shapes() prefixes the topology
+                    # path; label text boxes keep python-pptx's "TextBox N"
+                    if el[0][1].get("txBox") != "1": el[0][0].set("name", key[0])
+                _SYMBOL_TEMPLATES[key] = tpl
+    return tpl
+
+def stamp_symbol(slide, tpl, dx, dy):
+    """Appends a copy of the template shapes translated by (dx, dy) EMU; returns the new elements."""
+    tree = slide.shapes._spTree
+    placed = []
+    for el in tpl:
+        el = copy.deepcopy(el)
+        off = el.find(_XFRM_OFF)
+        off.set("x", str(int(off.get("x")) + dx))
+        off.set("y", str(int(off.get("y")) + dy))
+        tree.insert_element_before(el, "p:extLst")
+        placed.append(el)
+    return placed
+
+def set_symbol_texts(placed, texts):
+    """Fills the text runs of stamped shapes in document order; empty texts drop their run."""
+    runs = [t for el in placed for t in el.iter(qn("a:t"))]
+    for t, text in zip(runs, texts):
+        if text:
+            t.text = text
+        else:
+            r = t.getparent(); r.getparent().remove(r)
+
+def _shape_kind(name):
+    # "F3/SF2/breaker-2" -> "breaker", python-pptx's "TextBox 17" -> "textbox"
+    return re.sub(r"[ -]\d+$", "", name.rsplit("/", 1)[-1]).lower().replace(" ", "_")
+
+def name_shapes(slide, skip=0):
+    """Names drawn shapes (after the first `skip`) by topology path and kind: F3/SF2/EF1/breaker, repeats as breaker-2."""
+    def walk(elms, path):
+        seen = {}
+        for el in elms:
+            c_nv_pr = el[0][0]
+            if el.tag == qn("p:grpSp"): # Groups already carry their path
+                walk(el.iter_shape_elms(), c_nv_pr.get("name") + "/")
+                continue
+            kind = _shape_kind(c_nv_pr.get("name"))
+            seen[kind] = n = seen.get(kind, 0) + 1
+            c_nv_pr.set("name", f"{path}{kind}" + (f"-{n}" if n > 1 else ""))
+    walk(list(slide.shapes._spTree.iter_shape_elms())[skip:], "")
+
+def renumber_shape_ids(slide):
+    """Gives every shape on the slide a unique id in document order."""
+    for n, c_nv_pr in enumerate(slide.shapes._spTree.iter(qn("p:cNvPr")), start=1):
+        c_nv_pr.set("id", str(n))
+
+def add_shape_group(parent, name):
+    """Appends an empty group to a slide or group, named by its topology path (F3, F3/SF2, F3/SF2/EF1)."""
+    tpl = symbol_template(("group",), lambda s: s.shapes.add_group_shape())
+    el = copy.deepcopy(tpl[0])
+    parent.shapes._spTree.insert_element_before(el, "p:extLst")
+    grp = GroupShape(el, parent.shapes)
+    grp.name = name
+    grp.shapes._recalculate_extents = lambda: None # localize_groups() sizes groups once the slide is drawn
+    return grp
+
+_XFRM_PATHS = (f"{qn('p:spPr')}/{qn('a:xfrm')}", f"{qn('p:grpSpPr')}/{qn('a:xfrm')}")
+
+def localize_groups(slide, skip=0):
+    """Rebases every drawn group (after the first `skip` shapes) to a local frame: children relative to (0, 0), group placed by a:off."""
+    # Shapes are drawn into groups in slide coordinates; innermost groups go first so
+    # each parent measures its children after they have been rebased
+    drawn = list(slide.shapes._spTree.iter_shape_elms())[skip:]
+    for grp in reversed([g for el in drawn for g in el.iter(qn("p:grpSp"))]):
+        boxes = []
+        for c in grp.iter_shape_elms():
+            xfrm = c.find(_XFRM_PATHS[c.tag == qn("p:grpSp")])
+            off = xfrm.find(qn("a:off")); ext = xfrm.find(qn("a:ext"))
+            boxes.append((off, int(off.get("x")), int(off.get("y")), int(ext.get("cx")), int(ext.get("cy"))))
+        if not boxes: continue
+        x = min(b[1] for b in boxes); y = min(b[2] for b in boxes)
+        cx = max(b[1] + b[3] for b in boxes) - x; cy = max(b[2] + b[4] for b in boxes) - y
+        for off, bx, by, _, _ in boxes:
+            off.set("x", str(bx - x)); off.set("y", str(by - y))
+        grp.x, grp.y, grp.cx, grp.cy = x, y, cx, cy
+        grp.chOff.x = grp.chOff.y = 0
+        grp.chExt.cx, grp.chExt.cy = cx, cy
+
+def shift_shapes(slide, dy, skip=0):
+    """Moves the slide's top-level shapes after the first `skip` down by dy EMU (groups must be localized)."""
+    for el in list(slide.shapes._spTree.iter_shape_elms())[skip:]:
+        off = el.find(_XFRM_PATHS[el.tag == qn("p:grpSp")]).find(qn("a:off"))
+        off.set("y", str(int(off.get("y")) + dy))
+
+def _draw_line(slide, x1, y1, x2, y2, width_pt, color):
+    conn = slide.shapes.add_connector(MSO_CONNECTOR_TYPE.STRAIGHT, x1, y1, x2, y2)
+    scheme = THEME_COLORS.get(str(color)); idx = THEME_LINE_IDX.get(float(width_pt))
+    if scheme and idx: # Theme stroke: only the style ref changes, no a:ln
+        ref = conn._element.find(f"{qn('p:style')}/{qn('a:lnRef')}")
+        ref.set("idx", idx); ref[0].set("val", scheme)
+    else:
+        conn.line.width = Pt(width_pt)
+        conn.line.color.rgb = color
 
 def add_line(slide, x1, y1, x2, y2, width_pt=3, color=RGBColor(0, 112, 192)):
     # Safely cast to int (EMU) for PPTX
-    conn = slide.shapes.add_connector(MSO_CONNECTOR_TYPE.STRAIGHT, int(x1), int(y1), int(x2), int(y2))
-    conn.line.width = Pt(width_pt)
-    conn.line.color.rgb = color
-    return conn
-
-def add_busbar(slide, left, top, width):
-    if width <= 0: return
+    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+    tpl = symbol_template(("line", width_pt, str(color)), lambda s: _draw_line(s, 0, 0, 0, 0, width_pt, color))
+    el = stamp_symbol(slide, tpl, min(x1, x2), min(y1, y2))[0]
+    xfrm = el.find(_XFRM_OFF).getparent()
+    ext = xfrm.find(qn("a:ext"))
+    ext.set("cx", str(abs(x2 - x1))); ext.set("cy", str(abs(y2 - y1)))
+    if x1 > x2: xfrm.set("flipH", "1")
+    if y1 > y2: xfrm.set("flipV", "1")
+    batch_segment(x1, y1, x2, y2, (width_pt, str(color), el.getparent()), el) # Only merge within one slide or group
+
+def merge_pptx_lines(runs):
+    # The first connector of a run keeps its place in z-order and takes the merged extent
+    for x1, y1, x2, y2, style, els in runs:
+        if len(els) < 2: continue
+        xfrm = els[0].find(_XFRM_OFF).getparent()
+        xfrm.attrib.pop("flipH", None); xfrm.attrib.pop("flipV", None)
+        off = xfrm.find(qn("a:off")); ext = xfrm.find(qn("a:ext"))
+        off.set("x", str(min(x1, x2))); off.set("y", str(min(y1, y2)))
+        ext.set("cx", str(abs(x2 - x1))); ext.set("cy", str(abs(y2 - y1)))
+        for el in els[1:]: el.getparent().remove(el)
+
+def _draw_busbar(slide, left, top, width):
     bar = slide.shapes.add_shape(MSO_AUTO_SHAPE_TYPE.RECTANGLE, int(left), int(top), int(width), Inches(0.2))
     bar.fill.solid()
     bar.fill.fore_color.rgb = RGBColor(0, 112, 192)
     bar.line.fill.background()
 
+def add_busbar(slide, left, top, width):
+    if width <= 0: return
+    tpl = symbol_template(("busbar",), lambda s: _draw_busbar(s, 0, 0, 1))
+    el = stamp_symbol(slide, tpl, int(left), int(top))[0]
+    el.find(_XFRM_OFF).getnext().set("cx", str(int(width)))
+
+# --- Single-shape symbols ---
+# Every stroke of a symbol lives in one a:custGeom shape; labels stay as one
+# attached textbox. Paths are in EMU relative to the shape's top-left corner.
+
+def _path_xml(w, h, filled, ops):
+    fill_attr = "" if filled else ' fill="none"'
+    parts = [f'<a:path w="{w}" h="{h}"{fill_attr}>']
+    for op in ops:
+        if op[0] == "M": parts.append(f'<a:moveTo><a:pt x="{op[1]}" y="{op[2]}"/></a:moveTo>')
+        elif op[0] == "L": parts.append(f'<a:lnTo><a:pt x="{op[1]}" y="{op[2]}"/></a:lnTo>')
+        elif op[0] == "O": # Full circle: centre x, y and radius
+            _, x, y, r = op
+            parts.append(f'<a:moveTo><a:pt x="{x + r}" y="{y}"/></a:moveTo><a:arcTo wR="{r}" hR="{r}" stAng="0" swAng="21600000"/><a:close/>')
+        elif op[0] == "Z": parts.append('<a:close/>')
+    parts.append('</a:path>')
+    return "".join(parts)
+
+def add_custgeom_symbol(slide, name, left, top, width, height, paths, line_pt, line_color, fill_color=None):
+    """
+    Adds one freeform shape holding every stroke of a symbol.
+    paths: list of (filled, ops); ops are ("M", x, y), ("L", x, y), ("O", cx, cy, r) or ("Z",).
+    """
+    fill = f'<a:solidFill><a:srgbClr val="{fill_color}"/></a:solidFill>' if fill_color is not None else '<a:noFill/>'
+    ln, style = line_style_xml(line_pt, line_color, '<a:miter lim="800000"/>')
+    sp = parse_xml(
+        f'<p:sp {nsdecls("a", "p")}><p:nvSpPr><p:cNvPr id="0" name="{name}"/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+        f'<p:spPr><a:xfrm><a:off x="{int(left)}" y="{int(top)}"/><a:ext cx="{int(width)}" cy="{int(height)}"/></a:xfrm>'
+        f'<a:custGeom><a:avLst/><a:gdLst/><a:ahLst/><a:cxnLst/><a:rect l="0" t="0" r="r" b="b"/><a:pathLst>'
+        + "".join(_path_xml(int(width), int(height), filled, ops) for filled, ops in paths) +
+        f'</a:pathLst></a:custGeom>{fill}{ln}</p:spPr>{style}</p:sp>'
+    )
+    slide.shapes._spTree.insert_element_before(sp, "p:extLst")
+    return sp
+
+def _draw_breaker_x(slide, half, color):
+    d = 2 * half
+    add_custgeom_symbol(slide, "Breaker", -half, -half, d, d,
+                        [(False, [("M", 0, 0), ("L", d, d), ("M", 0, d), ("L", d, 0)])], 3.0, color)
+
 def add_breaker_x(slide, cx, cy, scale, size_base=0.25, color=RGBColor(0, 112, 192)):
     # cx, cy are expected to be int (EMU)
     half = int(S(size_base, scale))
-    add_line(slide, cx - half, cy - half, cx + half, cy + half, 3.0, color)
-    add_line(slide, cx - half, cy + half, cx + half, cy - half, 3.0, color)
+    tpl = symbol_template(("breaker", half, str(color)), lambda s: _draw_breaker_x(s, half, color))
+    stamp_symbol(slide, tpl, int(cx), int(cy))
+
+def _lead_ops(x, y_a, y_b):
+    # A 3pt lead inside a 2pt-outline shape: a 1pt-wide bar stroked at 2pt, inset by the half-stroke
+    hw = int(Pt(0.5)); inset = int(Pt(1.0))
+    return [("M", x - hw, y_a + inset), ("L", x + hw, y_a + inset), ("L", x + hw, y_b - inset), ("L", x - hw, y_b - inset), ("Z",)]
+
+def _draw_transformer(slide, scale):
+    # Centred on (0, 0): two windings plus the leads above and below
+    r = int(S(0.35, scale))
+    line_y1 = int(-S(0.9, scale))
+    line_y2 = int(-2 * r + S(0.05, scale))
+    line_y3 = int(2 * r - S(0.05, scale))
+    line_y4 = int(S(0.9, scale))
+    top = line_y1
+    add_custgeom_symbol(slide, "Transformer", -r, top, 2 * r, line_y4 - line_y1, [
+        (True, [("O", r, -r - top, r)]),
+        (True, [("O", r, r - top, r)]),
+        (False, _lead_ops(r, line_y1 - top, line_y2 - top) + _lead_ops(r, line_y3 - top, line_y4 - top)),
+    ], 2.0, RGBColor(0, 0, 0), RGBColor(255, 255, 255))
+
+    tb = slide.shapes.add_textbox(int(S(0.4, scale)), int(-S(0.8, scale)), int(S(4.0, scale)), int(S(1.5, scale)))
+    p = tb.text_frame.paragraphs[0]; p.text = "TX\nRATIO"
+    p.font.bold = True; p.font.size = Pt(max(10, 20*scale)) 
 
 def pptx_add_transformer(slide, cx_int, center_y, ratio_txt, tx_id, scale):
-    # cx_int, center_y expected as int (EMU)
-    r = int(S(0.35, scale)); d = r * 2
-    top_y = center_y - r; bot_y = center_y + r
-    
-    s1 = slide.shapes.add_shape(MSO_AUTO_SHAPE_TYPE.OVAL, int(cx_int - r), int(top_y - r), int(d), int(d))
-    s1.fill.solid(); s1.fill.fore_color.rgb = RGBColor(255, 255, 255) 
-    s1.line.width = Pt(2.0); s1.line.color.rgb = RGBColor(0,0,0)
-    
-    s2 = slide.shapes.add_shape(MSO_AUTO_SHAPE_TYPE.OVAL, int(cx_int - r), int(bot_y - r), int(d), int(d))
-    s2.fill.solid(); s2.fill.fore_color.rgb = RGBColor(255, 255, 255) 
-    s2.line.width = Pt(2.0); s2.line.color.rgb = RGBColor(0,0,0)
-    
-    line_y1 = int(center_y - S(0.9, scale))
-    line_y2 = int(top_y - r + S(0.05, scale))
-    line_y3 = int(bot_y + r - S(0.05, scale))
-    line_y4 = int(center_y + S(0.9, scale))
-    
-    add_line(slide, cx_int, line_y1, cx_int, line_y2, 3, RGBColor(0,0,0))
-    add_line(slide, cx_int, line_y3, cx_int, line_y4, 3, RGBColor(0,0,0))
+    tpl = symbol_template(("transformer", scale), lambda s: _draw_transformer(s, scale))
+    set_symbol_texts(stamp_symbol(slide, tpl, int(cx_int), int(center_y)), [tx_id, ratio_txt])
 
-    tb = slide.shapes.add_textbox(int(cx_int + S(0.4, scale)), int(center_y - S(0.8, scale)), int(S(4.0, scale)), int(S(1.5, scale)))
-    p = tb.text_frame.paragraphs[0]; p.text = f"{tx_id}\n{ratio_txt}"; 
-    p.font.bold = True; p.font.size = Pt(max(10, 20*scale)) 
-
-def pptx_add_inverter_branch(slide, cx, start_y, gens, scale):
-    # cx, start_y as int (EMU)
-    if not gens: return
-    box_top = int(start_y + S(1.5, scale))
-    add_line(slide, cx, start_y, cx, box_top, 2, RGBColor(0, 176, 80))
-    gen = gens[0]
-    w = int(S(2.2, scale)); h = int(S(1.5, scale)); left = int(cx - w/2)
-    
-    s = slide.shapes.add_shape(MSO_AUTO_SHAPE_TYPE.RECTANGLE, left, box_top, w, h)
-    s.fill.background(); s.line.color.rgb = RGBColor(0, 176, 80); s.line.width = Pt(2.0)
-    add_line(slide, left, box_top, left + w, box_top+h, 2, RGBColor(0, 176, 80))
-    add_line(slide, left, box_top+h, left + w, box_top, 2, RGBColor(0, 176, 80))
-    
+def _gen_label_lines(gen):
     title = "BESS" if gen['type'] == "BESS" else "SOLAR PV"
     cap_unit = "kWh" if gen['type'] == "BESS" else "kWp"
-    lines = [title, f"{gen['kWac']} kWac", f"{gen['cap_val']} {cap_unit}"]
+    return [title, f"{gen['kWac']} kWac", f"{gen['cap_val']} {cap_unit}"]
+
+def _draw_gen_block(slide, scale, drop_h, diagonals, label_w, label_h):
+    # Drop line from (0, 0), generator box with its diagonal(s), then the 3-line label
+    box_top = int(S(1.5, scale))
+    w = int(S(2.2, scale)); h = int(S(1.5, scale)); left = int(-w/2)
+    ops = [("M", -left, 0), ("L", -left, drop_h),
+           ("M", 0, box_top), ("L", w, box_top), ("L", w, box_top + h), ("L", 0, box_top + h), ("Z",)]
+    if diagonals == 2: ops += [("M", 0, box_top), ("L", w, box_top + h)]
+    ops += [("M", 0, box_top + h), ("L", w, box_top)]
+    add_custgeom_symbol(slide, "Generator", left, 0, w, max(drop_h, box_top + h), [(False, ops)], 2.0, RGBColor(0, 176, 80))
     
-    tb = slide.shapes.add_textbox(int(cx - S(3, scale)), int(box_top + h + S(0.1, scale)), int(S(6, scale)), int(S(2.5, scale)))
+    tb = slide.shapes.add_textbox(int(-S(label_w / 2, scale)), int(box_top + h + S(0.1, scale)), int(S(label_w, scale)), int(S(label_h, scale)))
     tf = tb.text_frame
-    for l in lines:
+    for l in ["T", "K", "C"]:
         p = tf.add_paragraph(); p.text = l 
         p.font.size = Pt(max(10, 20*scale)); 
         p.font.color.rgb = RGBColor(0, 176, 80); 
         p.alignment = PP_ALIGN.CENTER; p.font.bold = True
 
+def pptx_add_inverter_branch(slide, cx, start_y, gens, scale):
+    # cx, start_y as int (EMU)
+    if not gens: return
+    tpl = symbol_template(("inverter", scale), lambda s: _draw_gen_block(s, scale, int(S(1.5, scale)), 2, 6.0, 2.5))
+    set_symbol_texts(stamp_symbol(slide, tpl, int(cx), int(start_y)), _gen_label_lines(gens[0]))
+
 def pptx_add_lv_system(slide, cx, start_y, gens, has_emsb, emsb_name, scale):
     # cx, start_y as int (EMU)
     if not gens and not has_emsb: return
@@ -255,26 +841,12 @@ def pptx_add_lv_system(slide, cx, start_y, gens, has_emsb, emsb_name, scale):
         px = start_x_offset + idx * spacing
         box_top = int(start_y + S(1.5, scale))
         
-        add_line(slide, px, start_y, px, int(box_top + S(0.05, scale)), 2, RGBColor(0, 176, 80))
-        
         if itype == 'GEN':
-            w = int(S(2.2, scale)); h = int(S(1.5, scale)); left = int(px - w/2)
-            s = slide.shapes.add_shape(MSO_AUTO_SHAPE_TYPE.RECTANGLE, left, box_top, w, h)
-            s.fill.background(); s.line.color.rgb = RGBColor(0, 176, 80); s.line.width = Pt(2.0)
-            add_line(slide, left, int(box_top + h), left + w, box_top, 2, RGBColor(0, 176, 80))
-            
-            title = "BESS" if data['type'] == "BESS" else "SOLAR PV"
-            lines = [title, f"{data['kWac']} kWac", f"{data['cap_val']} {'kWh' if data['type']=='BESS' else 'kWp'}"]
-            
-            tb = slide.shapes.add_textbox(int(px - S(2.5, scale)), int(box_top + h + S(0.1, scale)), int(S(5.0, scale)), int(S(2.0, scale)))
-            tf = tb.text_frame
-            for l in lines:
-                p = tf.add_paragraph(); p.text = l; 
-                p.font.size = Pt(max(10, 20*scale)); 
-                p.font.color.rgb = RGBColor(0, 176, 80); 
-                p.alignment = PP_ALIGN.CENTER; p.font.bold = True
+            tpl = symbol_template(("lv_gen", scale), lambda s: _draw_gen_block(s, scale, int(int(S(1.5, scale)) + S(0.05, scale)), 1, 5.0, 2.0))
+            set_symbol_texts(stamp_symbol(slide, tpl, px, int(start_y)), _gen_label_lines(data))
                 
         elif itype == 'EMSB':
+            add_line(slide, px, start_y, px, int(box_top + S(0.05, scale)), 2, RGBColor(0, 176, 80))
             breaker_y = int(start_y + S(0.8, scale))
             add_breaker_x(slide, px, breaker_y, scale, 0.20)
             w = int(S(1.6, scale)); h = int(S(0.8, scale)); left = int(px - w/2)
@@ -283,8 +855,7 @@ def pptx_add_lv_system(slide, cx, start_y, gens, has_emsb, emsb_name, scale):
             
             tb = slide.shapes.add_textbox(int(px - S(1.5, scale)), int(box_top + h), int(S(3, scale)), int(S(0.8, scale)))
             tb.text_frame.text = data
-            tb.text_frame.paragraphs[0].font.size = Pt(max(10, 20*scale)); 
-            tb.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER 
+            style_paragraph(tb.text_frame.paragraphs[0], max(10, 20*scale), align=PP_ALIGN.CENTER)
 
 def add_continuation_arrow(slide, x, y, direction, label, scale):
     # x, y as int (EMU)
@@ -307,13 +878,29 @@ def add_continuation_arrow(slide, x, y, direction, label, scale):
     if label:
         tb = slide.shapes.add_textbox(text_x, int(y - S(1.0, scale)), int(S(2.5, scale)), int(S(0.8, scale)))
         p = tb.text_frame.paragraphs[0]; p.text = label
-        p.font.size = Pt(max(10, 20*scale)); 
-        p.font.bold = True; p.font.color.rgb = RGBColor(255, 0, 0); p.alignment = align
+        style_paragraph(p, max(10, 20*scale), bold=True, color=RGBColor(255, 0, 0), align=align)
 
 # ============================================================
 # 3. MATPLOTLIB PREVIEW HELPERS
 # ============================================================
 
+def plot_segment(ax, x1, y1, x2, y2, color, lw, capstyle="projecting", zorder=2):
+    # Defaults match ax.plot; buses pass capstyle="butt", zorder=1 like ax.hlines
+    if not batch_segment(x1, y1, x2, y2, (color, lw, capstyle, zorder), ax):
+        ax.plot([x1, x2], [y1, y2], color=color, lw=lw, solid_capstyle=capstyle, zorder=zorder)
+
+def merge_mpl_lines(runs):
+    # Consecutive runs of one style become one LineCollection, so draw order is unchanged
+    groups = []
+    for x1, y1, x2, y2, style, axes in runs:
+        ax = axes[0]
+        if groups and groups[-1][0] is ax and groups[-1][1] == style:
+            groups[-1][2].append([(x1, y1), (x2, y2)])
+        else:
+            groups.append((ax, style, [[(x1, y1), (x2, y2)]]))
+    for ax, (color, lw, capstyle, zorder), lines in groups:
+        ax.add_collection(LineCollection(lines, colors=color, linewidths=lw, capstyle=capstyle, zorder=zorder))
+
 def draw_tx_mpl(ax, x, y, label, ratio):
     r = 0.3
     c1 = plt.Circle((x, y + 0.25), r, fill=True, fc='white', ec='black', lw=2, zorder=10)
@@ -336,12 +923,12 @@ def draw_lv_system_mpl(ax, cx, start_y, gens, has_emsb, emsb_name):
         px = start_x + idx * spacing
         box_top = start_y - 1.5
         
-        ax.plot([px, px], [start_y, box_top], color="tab:green", lw=3)
+        plot_segment(ax, px, start_y, px, box_top, "tab:green", 3)
         
         if itype == 'GEN':
             rect = patches.Rectangle((px - 0.75, box_top - 1.0), 1.5, 1.0, fill=False, edgecolor="tab:green", lw=2)
             ax.add_patch(rect)
-            ax.plot([px - 0.75, px + 0.75], [box_top - 1.0, box_top], color="tab:green", lw=1.5)
+            plot_segment(ax, px - 0.75, box_top - 1.0, px + 0.75, box_top, "tab:green", 1.5)
             
             title = "BESS" if data['type'] == "BESS" else "SOLAR PV"
             unit = "kWh" if data['type'] == "BESS" else "kWp"
@@ -352,8 +939,8 @@ def draw_lv_system_mpl(ax, cx, start_y, gens, has_emsb, emsb_name):
                 
         elif itype == 'EMSB':
             by = start_y - 0.8
-            ax.plot([px-0.15, px+0.15], [by-0.15, by+0.15], color="tab:blue", lw=2)
-            ax.plot([px-0.15, px+0.15], [by+0.15, by-0.15], color="tab:blue", lw=2)
+            plot_segment(ax, px-0.15, by-0.15, px+0.15, by+0.15, "tab:blue", 2)
+            plot_segment(ax, px-0.15, by+0.15, px+0.15, by-0.15, "tab:blue", 2)
             
             rect = patches.Rectangle((px - 0.6, box_top - 0.6), 1.2, 0.6, fill=True, facecolor="tab:blue", edgecolor="tab:blue")
             ax.add_patch(rect)
@@ -373,9 +960,9 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
         ctype = config.get("type", "Standard")
         color = "tab:green" if ctype == "MV Gen" else "tab:blue"
         
-        ax.plot([cx, cx], [Y_MAIN_BUS, Y_FDR_BRK], color=color, lw=3)
-        ax.plot([cx-0.2, cx+0.2], [Y_FDR_BRK-0.2, Y_FDR_BRK+0.2], color=color, lw=3)
-        ax.plot([cx-0.2, cx+0.2], [Y_FDR_BRK+0.2, Y_FDR_BRK-0.2], color=color, lw=3)
+        plot_segment(ax, cx, Y_MAIN_BUS, cx, Y_FDR_BRK, color, 3)
+        plot_segment(ax, cx-0.2, Y_FDR_BRK-0.2, cx+0.2, Y_FDR_BRK+0.2, color, 3)
+        plot_segment(ax, cx-0.2, Y_FDR_BRK+0.2, cx+0.2, Y_FDR_BRK-0.2, color, 3)
         
         if voltage != "400V":
             ax.text(cx, Y_FDR_BRK+0.5, swg_names[i], ha="center", fontsize=10, fontweight="bold")
@@ -392,21 +979,21 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
             
             if not is_extension:
                 y_bus_connection = current_y - 1.5
-                ax.plot([cx, cx], [current_y, y_bus_connection + 0.6], color="tab:blue", lw=3)
+                plot_segment(ax, cx, current_y, cx, y_bus_connection + 0.6, "tab:blue", 3)
                 draw_tx_mpl(ax, cx, y_bus_connection, f"TX-{i+1}", f"{voltage}/{sub_voltage}")
                 y_mv_breaker_main = y_bus_connection - 0.7 
-                ax.plot([cx, cx], [y_bus_connection - 0.15, y_mv_breaker_main + 0.2], color="tab:blue", lw=3)
-                ax.plot([cx-0.15, cx+0.15], [y_mv_breaker_main-0.15, y_mv_breaker_main+0.15], color="tab:blue", lw=3) 
-                ax.plot([cx-0.15, cx+0.15], [y_mv_breaker_main+0.15, y_mv_breaker_main-0.15], color="tab:blue", lw=3) 
+                plot_segment(ax, cx, y_bus_connection - 0.15, cx, y_mv_breaker_main + 0.2, "tab:blue", 3)
+                plot_segment(ax, cx-0.15, y_mv_breaker_main-0.15, cx+0.15, y_mv_breaker_main+0.15, "tab:blue", 3) 
+                plot_segment(ax, cx-0.15, y_mv_breaker_main+0.15, cx+0.15, y_mv_breaker_main-0.15, "tab:blue", 3) 
                 y_sub_bus = y_mv_breaker_main - 0.6
-                ax.plot([cx, cx], [y_mv_breaker_main - 0.15, y_sub_bus], color="tab:blue", lw=3)
+                plot_segment(ax, cx, y_mv_breaker_main - 0.15, cx, y_sub_bus, "tab:blue", 3)
             else:
                 y_ext_brk = current_y - 1.5 
-                ax.plot([cx, cx], [current_y, y_ext_brk + 0.2], color="tab:blue", lw=3)
-                ax.plot([cx-0.2, cx+0.2], [y_ext_brk-0.2, y_ext_brk+0.2], color="tab:blue", lw=3)
-                ax.plot([cx-0.2, cx+0.2], [y_ext_brk+0.2, y_ext_brk-0.2], color="tab:blue", lw=3)
+                plot_segment(ax, cx, current_y, cx, y_ext_brk + 0.2, "tab:blue", 3)
+                plot_segment(ax, cx-0.2, y_ext_brk-0.2, cx+0.2, y_ext_brk+0.2, "tab:blue", 3)
+                plot_segment(ax, cx-0.2, y_ext_brk+0.2, cx+0.2, y_ext_brk-0.2, "tab:blue", 3)
                 y_sub_bus = y_ext_brk - 0.8
-                ax.plot([cx, cx], [y_ext_brk - 0.2, y_sub_bus], color="tab:blue", lw=3)
+                plot_segment(ax, cx, y_ext_brk - 0.2, cx, y_sub_bus, "tab:blue", 3)
 
             sub_feeders = config.get("sub_feeders", {})
             n_subs = len(sub_feeders)
@@ -419,7 +1006,7 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                 total_sb_width = sum(widths_list) + (len(widths_list)-1)*dims["sub_gap"]
                 start_sub_x = cx - (total_sb_width / 2)
                 
-                ax.hlines(y_sub_bus, start_sub_x, start_sub_x + total_sb_width, lw=4, color="tab:blue")
+                plot_segment(ax, start_sub_x, y_sub_bus, start_sub_x + total_sb_width, y_sub_bus, "tab:blue", 4, "butt", 1)
                 sub_board_bus_coords[i] = (start_sub_x, start_sub_x + total_sb_width, y_sub_bus)
                 
                 ax.text(start_sub_x + total_sb_width + 0.2, y_sub_bus, sub_voltage, color="tab:blue", fontsize=8, fontweight='bold', va='center', ha='left')
@@ -435,9 +1022,9 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                     has_emsb = s_conf.get("has_emsb", False)
                     
                     y_sub_mv_brk = y_sub_bus - 0.8
-                    ax.plot([sub_x, sub_x], [y_sub_bus, y_sub_mv_brk+0.15], color="tab:blue", lw=2)
-                    ax.plot([sub_x-0.1, sub_x+0.1], [y_sub_mv_brk-0.1, y_sub_mv_brk+0.1], color="tab:blue", lw=2)
-                    ax.plot([sub_x-0.1, sub_x+0.1], [y_sub_mv_brk+0.1, y_sub_mv_brk-0.1], color="tab:blue", lw=2)
+                    plot_segment(ax, sub_x, y_sub_bus, sub_x, y_sub_mv_brk+0.15, "tab:blue", 2)
+                    plot_segment(ax, sub_x-0.1, y_sub_mv_brk-0.1, sub_x+0.1, y_sub_mv_brk+0.1, "tab:blue", 2)
+                    plot_segment(ax, sub_x-0.1, y_sub_mv_brk+0.1, sub_x+0.1, y_sub_mv_brk-0.1, "tab:blue", 2)
                     
                     y_end_point = 0
                     x_end_point = sub_x
@@ -450,7 +1037,7 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                         if ext_feeders:
                             # Draw line down to Nested Bus
                             y_nest_bus = y_sub_mv_brk - 1.5
-                            ax.plot([sub_x, sub_x], [y_sub_mv_brk-0.15, y_nest_bus], color="tab:blue", lw=2)
+                            plot_segment(ax, sub_x, y_sub_mv_brk-0.15, sub_x, y_nest_bus, "tab:blue", 2)
                             
                             # Calculate nested width
                             n_ext = len(ext_feeders)
@@ -473,7 +1060,7 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                                 total_ext_w += (n_ext - 1) * (dims["sub_gap"] * 0.8)
                             
                             nest_start_x = sub_x - total_ext_w/2
-                            ax.hlines(y_nest_bus, nest_start_x, nest_start_x + total_ext_w, lw=3, color="tab:blue")
+                            plot_segment(ax, nest_start_x, y_nest_bus, nest_start_x + total_ext_w, y_nest_bus, "tab:blue", 3, "butt", 1)
                             
                             # For coupler logic (Extension Bus)
                             sub_bus_edges_local[j] = (nest_start_x, nest_start_x + total_ext_w)
@@ -497,9 +1084,9 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                                 ef_type = ef_conf.get("type", "Standard")
                                 
                                 y_nf_brk = y_nest_bus - 0.5
-                                ax.plot([ef_center, ef_center], [y_nest_bus, y_nf_brk+0.1], color="tab:blue", lw=1.5)
-                                ax.plot([ef_center-0.1, ef_center+0.1], [y_nf_brk-0.1, y_nf_brk+0.1], color="tab:blue", lw=1.5)
-                                ax.plot([ef_center-0.1, ef_center+0.1], [y_nf_brk+0.1, y_nf_brk-0.1], color="tab:blue", lw=1.5)
+                                plot_segment(ax, ef_center, y_nest_bus, ef_center, y_nf_brk+0.1, "tab:blue", 1.5)
+                                plot_segment(ax, ef_center-0.1, y_nf_brk-0.1, ef_center+0.1, y_nf_brk+0.1, "tab:blue", 1.5)
+                                plot_segment(ax, ef_center-0.1, y_nf_brk+0.1, ef_center+0.1, y_nf_brk-0.1, "tab:blue", 1.5)
                                 
                                 this_lv_left = ef_center
                                 this_lv_right = ef_center
@@ -511,15 +1098,15 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                                 else:
                                     # Standard -> TX
                                     y_nf_tx = y_nf_brk - 0.8
-                                    ax.plot([ef_center, ef_center], [y_nf_brk-0.1, y_nf_tx+0.25], color="tab:blue", lw=1.5)
+                                    plot_segment(ax, ef_center, y_nf_brk-0.1, ef_center, y_nf_tx+0.25, "tab:blue", 1.5)
                                     draw_tx_mpl(ax, ef_center, y_nf_tx, "", f"{sub_voltage}/0.4")
                                     
                                     # LV Bus
                                     y_nf_lv = y_nf_tx - 1.0
-                                    ax.plot([ef_center, ef_center], [y_nf_tx-0.3, y_nf_lv], color="tab:blue", lw=1.5)
+                                    plot_segment(ax, ef_center, y_nf_tx-0.3, ef_center, y_nf_lv, "tab:blue", 1.5)
                                     
                                     bus_viz = ef_w - 0.5
-                                    ax.hlines(y_nf_lv, ef_center - bus_viz/2, ef_center + bus_viz/2, lw=2, color="tab:blue")
+                                    plot_segment(ax, ef_center - bus_viz/2, y_nf_lv, ef_center + bus_viz/2, y_nf_lv, "tab:blue", 2, "butt", 1)
                                     draw_lv_system_mpl(ax, ef_center, y_nf_lv, ef_conf.get("gens", []), ef_conf.get("has_emsb"), "EMSB")
                                     
                                     this_lv_left = ef_center - bus_viz/2
@@ -548,34 +1135,34 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                                     y2 = nested_lv_coords_mpl[pair_idx+1][2]
                                     mid_cy = (y1+y2)/2
                                     
-                                    ax.plot([r_edge, l_edge], [mid_cy, mid_cy], color="tab:red", lw=2)
+                                    plot_segment(ax, r_edge, mid_cy, l_edge, mid_cy, "tab:red", 2)
                                     mid_cx = (r_edge + l_edge)/2
-                                    ax.plot([mid_cx-0.1, mid_cx+0.1], [mid_cy-0.1, mid_cy+0.1], color="tab:red", lw=2)
-                                    ax.plot([mid_cx-0.1, mid_cx+0.1], [mid_cy+0.1, mid_cy-0.1], color="tab:red", lw=2)
+                                    plot_segment(ax, mid_cx-0.1, mid_cy-0.1, mid_cx+0.1, mid_cy+0.1, "tab:red", 2)
+                                    plot_segment(ax, mid_cx-0.1, mid_cy+0.1, mid_cx+0.1, mid_cy-0.1, "tab:red", 2)
                             
                             x_end_point = ext_last_lv_right 
                             y_end_point = ext_last_lv_y
                         else:
-                            ax.plot([sub_x, sub_x], [y_sub_mv_brk-0.15, y_sub_mv_brk-1.5], color="tab:blue", lw=2)
+                            plot_segment(ax, sub_x, y_sub_mv_brk-0.15, sub_x, y_sub_mv_brk-1.5, "tab:blue", 2)
                             ax.text(sub_x, y_sub_mv_brk - 1.7, f"{sub_voltage} OUT", ha="center", fontweight="bold")
                             y_end_point = y_sub_mv_brk - 1.5
                             x_end_point = sub_x
                     else:
                         # Standard -> Step Down TX
                         y_tx_sub = y_sub_mv_brk - 1.2
-                        ax.plot([sub_x, sub_x], [y_sub_mv_brk-0.15, y_tx_sub+0.3], color="tab:blue", lw=2)
+                        plot_segment(ax, sub_x, y_sub_mv_brk-0.15, sub_x, y_tx_sub+0.3, "tab:blue", 2)
                         draw_tx_mpl(ax, sub_x, y_tx_sub, f"TX-SF{j+1}", f"{sub_voltage}/0.4")
                         y_sub_breaker = y_tx_sub - 1.5
-                        ax.plot([sub_x, sub_x], [y_tx_sub - 0.6, y_sub_breaker], color="tab:blue", lw=2)
+                        plot_segment(ax, sub_x, y_tx_sub - 0.6, sub_x, y_sub_breaker, "tab:blue", 2)
                         bx, by = sub_x, y_sub_breaker
-                        ax.plot([bx-0.1, bx+0.1], [by-0.1, by+0.1], color="tab:blue", lw=2)
-                        ax.plot([bx-0.1, bx+0.1], [by+0.1, by-0.1], color="tab:blue", lw=2)
+                        plot_segment(ax, bx-0.1, by-0.1, bx+0.1, by+0.1, "tab:blue", 2)
+                        plot_segment(ax, bx-0.1, by+0.1, bx+0.1, by-0.1, "tab:blue", 2)
                         y_lv_out = by - 0.2
                         sub_feeder_lv_coords[(i, j)] = (sub_x, y_lv_out)
                         bus_width_viz = max(dims["item_w"], sub_w - 0.5)
                         bus_left = sub_x - bus_width_viz/2
                         bus_right = sub_x + bus_width_viz/2
-                        ax.hlines(y_lv_out, bus_left, bus_right, lw=4, color="tab:blue")
+                        plot_segment(ax, bus_left, y_lv_out, bus_right, y_lv_out, "tab:blue", 4, "butt", 1)
                         sub_feeder_bus_edges[(i, j)] = (bus_left, bus_right)
                         sub_bus_edges_local[j] = (bus_left, bus_right)
                         sub_y_local[j] = y_lv_out
@@ -607,26 +1194,26 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
                 for cp in config.get("sub_couplers", []):
                      if cp in sub_bus_edges_local and (cp+1) in sub_bus_edges_local:
                          e1 = sub_bus_edges_local[cp][1]; e2 = sub_bus_edges_local[cp+1][0]; y_cp = sub_y_local[cp]
-                         ax.plot([e1, e2], [y_cp, y_cp], color="tab:red", lw=2)
+                         plot_segment(ax, e1, y_cp, e2, y_cp, "tab:red", 2)
                          mid_cx = (e1+e2)/2
-                         ax.plot([mid_cx-0.1, mid_cx+0.1], [y_cp-0.1, y_cp+0.1], color="tab:red", lw=2)
-                         ax.plot([mid_cx-0.1, mid_cx+0.1], [y_cp+0.1, y_cp-0.1], color="tab:red", lw=2)
+                         plot_segment(ax, mid_cx-0.1, y_cp-0.1, mid_cx+0.1, y_cp+0.1, "tab:red", 2)
+                         plot_segment(ax, mid_cx-0.1, y_cp+0.1, mid_cx+0.1, y_cp-0.1, "tab:red", 2)
 
         else: # Standard
             chain = get_tx_chain(voltage, config.get("tx_scheme", ""))
             temp_y = current_y
             if not chain and voltage == "400V":
-                y_bus = 2.0; ax.plot([cx, cx], [temp_y, y_bus], color="tab:blue", lw=3)
+                y_bus = 2.0; plot_segment(ax, cx, temp_y, cx, y_bus, "tab:blue", 3)
                 lv_bus_y[i] = y_bus; lv_bus_x[i] = cx
                 y_fin = y_bus
             else:
                 for step in chain:
                     y_tx = temp_y - 1.5
                     draw_tx_mpl(ax, cx, y_tx, f"TX-{i+1}", step["ratio"])
-                    ax.plot([cx, cx], [temp_y, y_tx+0.6], color="tab:blue", lw=3, zorder=1)
+                    plot_segment(ax, cx, temp_y, cx, y_tx+0.6, "tab:blue", 3, zorder=1)
                     temp_y = y_tx - 0.6
                 y_bus = temp_y - 1.0
-                ax.plot([cx, cx], [temp_y, y_bus], color="tab:blue", lw=3)
+                plot_segment(ax, cx, temp_y, cx, y_bus, "tab:blue", 3)
                 lv_bus_y[i] = y_bus; lv_bus_x[i] = cx
                 y_fin = y_bus
             
@@ -635,7 +1222,7 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
             bw = max(dims["min_w"], cnt * dims["item_w"])
             
             left_edge = cx - int(bw/2); right_edge = cx + int(bw/2)
-            ax.hlines(lv_bus_y[i], left_edge, right_edge, lw=5, color="tab:blue")
+            plot_segment(ax, left_edge, lv_bus_y[i], right_edge, lv_bus_y[i], "tab:blue", 5, "butt", 1)
             lv_bus_edges[i] = (left_edge, right_edge)
             ax.text(cx, lv_bus_y[i]-0.3, config.get("msb_name", ""), ha="center", va="top", fontweight="bold")
             draw_lv_system_mpl(ax, cx, lv_bus_y[i], gens, has_emsb, config["emsb"]["name"])
@@ -646,6 +1233,357 @@ def draw_section_feeders_mpl(ax, feeder_indices, x_centers, sub_widths_map, Y_MA
 
     return lv_bus_x, lv_bus_y, lv_bus_edges, sub_feeder_lv_coords, sub_feeder_bus_edges, sub_board_bus_coords, last_sub_feeder_coords, first_sub_feeder_coords
 
+# --- Feeder fragments ---
+# A feeder's drawing depends only on its config subtree, name, index, scale and
+# whether it ends the group, never on its neighbours. Rendered feeders are kept
+# relative to their centre line and stamped at the new x on later builds.
+
+FRAGMENT_CACHE_MAX = 256
+_fragments = collections.OrderedDict() # key -> (group element, anchors, text level formats)
+_fragment_lock = threading.Lock()
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+def feeder_digest(conf):
+    """Merkle hash of a feeder config: generators, then extension feeders, then sub-feeders, then the feeder."""
+    def node(c, children):
+        own = {k: v for k, v in c.items() if k not in ("gens", "sub_feeders", "extension_feeders")}
+        return _digest(own, [_digest(g) for g in c.get("gens", [])], children)
+    subs = []
+    for _, sf in sorted(conf.get("sub_feeders", {}).items()):
+        subs.append(node(sf, [node(ef, []) for _, ef in sorted(sf.get("extension_feeders", {}).items())]))
+    return node(conf, subs)
+
+def _shift_x(el, dx):
+    for off in el.iter(qn("a:off")): off.set("x", str(int(off.get("x")) + dx))
+
+def _shift_anchors(anchors, dx):
+    moved = {}
+    for part, v in anchors.items():
+        if part == "lv": moved[part] = {**v, "left": v["left"] + dx, "right": v["right"] + dx}
+        elif part == "sub_bus": moved[part] = (v[0] + dx, v[1] + dx, v[2])
+        else: moved[part] = (v[0] + dx, v[1])
+    return moved
+
+def place_feeder(slide, key, cx, draw):
+    """
+    Adds a feeder centred on cx and returns its anchors. Stamps the cached
+    fragment for `key` when there is one (and its label formats still fit
+    the deck's text levels); otherwise draw() renders it and the result,
+    (group element, anchors), is cached relative to cx.
+    """
+    with _fragment_lock:
+        hit = _fragments.get(key)
+        if hit is not None: _fragments.move_to_end(key)
+    if hit is not None:
+        frag, anchors, formats = hit
+        lvls = claim_text_levels(formats)
+        if lvls is not None:
+            el = copy.deepcopy(frag)
+            _shift_x(el, cx); relevel(el, lvls)
+            slide.shapes._spTree.insert_element_before(el, "p:extLst")
+            return _shift_anchors(anchors, cx)
+    (el, anchors), formats = record_text_levels(draw)
+    # Only fragments whose labels all use deck levels replay exactly in another deck
+    if formats is None: return anchors
+    frag = copy.deepcopy(el)
+    _shift_x(frag, -cx)
+    with _fragment_lock:
+        _fragments[key] = (frag, _shift_anchors(anchors, -cx), formats)
+        while len(_fragments) > FRAGMENT_CACHE_MAX: _fragments.popitem(last=False)
+    return anchors
+
+@merges_lines(merge_pptx_lines)
+def draw_feeder_on_slide(slide, voltage, idx, config, name, cx, w_feeder_scaled, sub_ws_scaled, dims, is_last, scale_factor):
+    """
+    Draws feeder idx hanging from the main bus at cx, as group F{idx+1}.
+    Returns (group element, anchors): the coupler anchor points it exposes
+    under "lv", "sub_bus", "first" and "last" (int EMU, absent if none).
+    """
+    Y_MAIN_BUS = int(S(6.0, scale_factor))
+    Y_FDR_BRK = int(S(7.5, scale_factor))
+    anchors = {}
+
+    ctype = config.get("type", "Standard")
+    col = RGBColor(0,176,80) if ctype == "MV Gen" else RGBColor(0,112,192)
+    fg = add_shape_group(slide, f"F{idx+1}")
+
+    add_line(fg, cx, Y_MAIN_BUS, cx, int(Y_FDR_BRK + S(0.1, scale_factor)), 3, col)
+    add_breaker_x(fg, cx, Y_FDR_BRK, scale_factor, 0.25, col)
+    
+    if voltage != "400V":
+        tb = fg.shapes.add_textbox(int(cx - S(2, scale_factor)), int(Y_FDR_BRK - S(0.8, scale_factor)), int(S(4, scale_factor)), int(S(0.8, scale_factor)))
+        tb.text_frame.text = name
+        style_paragraph(tb.text_frame.paragraphs[0], max(8, 16*scale_factor), bold=True, align=PP_ALIGN.CENTER)
+
+    cur_y = int(Y_FDR_BRK + S(0.1, scale_factor))
+    y_fin_this_feeder = 0; lv_edges = (0, 0)
+
+    if ctype == "MV Gen":
+        gens = config.get("gens", [])
+        pptx_add_inverter_branch(fg, cx, cur_y, gens, scale_factor)
+        
+    elif ctype == "Sub-Board":
+        sub_voltage = config.get('sub_voltage')
+        is_extension = (voltage == sub_voltage)
+        
+        y_tx1 = int(cur_y + S(2.5, scale_factor))
+        y_sub_bus = int(y_tx1 + S(2.7, scale_factor))
+        
+        if not is_extension:
+            pptx_add_transformer(fg, cx, y_tx1, f"{voltage}/{sub_voltage}", f"TX-{idx+1}", scale_factor)
+            add_line(fg, cx, cur_y, cx, int(y_tx1 - S(0.9, scale_factor)))
+            
+            y_mv_breaker_main = int(y_tx1 + S(1.5, scale_factor))
+            add_line(fg, cx, int(y_tx1 + S(0.9, scale_factor)), cx, int(y_mv_breaker_main - S(0.2, scale_factor)))
+            add_breaker_x(fg, cx, y_mv_breaker_main, scale_factor, 0.25)
+            
+            y_sub_bus = int(y_mv_breaker_main + S(1.2, scale_factor))
+            add_line(fg, cx, int(y_mv_breaker_main + S(0.2, scale_factor)), cx, int(y_sub_bus + S(0.05, scale_factor)))
+        else:
+            y_ext_breaker = y_tx1
+            add_line(fg, cx, cur_y, cx, int(y_ext_breaker - S(0.2, scale_factor)))
+            add_breaker_x(fg, cx, y_ext_breaker, scale_factor, 0.25)
+            y_sub_bus = int(y_ext_breaker + S(1.2, scale_factor))
+            add_line(fg, cx, int(y_ext_breaker + S(0.2, scale_factor)), cx, int(y_sub_bus + S(0.05, scale_factor)))
+            
+        sub_feeders = config.get("sub_feeders", {})
+        n_subs = len(sub_feeders)
+        if n_subs > 0:
+            total_sb_width = sum(sub_ws_scaled) + (len(sub_ws_scaled)-1)*int(S(dims["sub_gap"], scale_factor))
+            start_sub_x = cx - total_sb_width // 2
+            add_busbar(fg, start_sub_x, y_sub_bus, total_sb_width)
+            
+            # Storing int (EMU)
+            anchors["sub_bus"] = (start_sub_x, start_sub_x + total_sb_width, y_sub_bus)
+            
+            tb = fg.shapes.add_textbox(start_sub_x + total_sb_width, int(y_sub_bus - S(0.3, scale_factor)), int(S(1.0, scale_factor)), int(S(0.5, scale_factor)))
+            tb.text_frame.text = sub_voltage; style_paragraph(tb.text_frame.paragraphs[0], max(10, 20*scale_factor))
+
+            curr_sb_x = start_sub_x
+            sub_bus_edges_local = {}; sub_y_local = {}
+
+            for j in range(n_subs):
+                sw = sub_ws_scaled[j]; sx = curr_sb_x + sw // 2
+                sg = add_shape_group(fg, f"F{idx+1}/SF{j+1}")
+                s_conf = sub_feeders.get(j, {})
+                sf_type = s_conf.get("type", "Standard")
+                
+                y_mv_brk_sub = int(y_sub_bus + S(1.2, scale_factor))
+                add_line(sg, sx, y_sub_bus, sx, int(y_mv_brk_sub - S(0.2, scale_factor)))
+                add_breaker_x(sg, sx, y_mv_brk_sub, scale_factor, 0.2)
+                
+                y_end_pt = 0 
+                x_end_pt = 0
+                
+                if sf_type == "MV Gen":
+                    pptx_add_inverter_branch(sg, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), s_conf.get("gens", []), scale_factor)
+                    y_end_pt = int(y_mv_brk_sub + S(2.0, scale_factor))
+                    x_end_pt = sx 
+                elif sf_type == "Extension":
+                    ext_feeders = s_conf.get("extension_feeders", {})
+                    if ext_feeders:
+                        y_nest_bus = int(y_mv_brk_sub + S(2.5, scale_factor))
+                        add_line(sg, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), sx, y_nest_bus)
+                        
+                        total_ext_w = 0
+                        ext_item_widths = []
+                        for k in ext_feeders:
+                            ef_conf = ext_feeders[k]
+                            ef_type = ef_conf.get("type", "Standard")
+                            if ef_type == "MV Gen":
+                                ef_w = int(S(dims["item_w"], scale_factor))
+                            else:
+                                ef_gens = ef_conf.get("gens", [])
+                                ef_emsb = ef_conf.get("has_emsb", False)
+                                ef_cnt = len(ef_gens) + (1 if ef_emsb else 0)
+                                ef_w = max(int(S(dims["item_w"] * 1.5, scale_factor)), ef_cnt * int(S(dims["item_w"], scale_factor)))
+                            ext_item_widths.append(ef_w)
+                            total_ext_w += ef_w
+                        
+                        if len(ext_feeders) > 1:
+                            total_ext_w += (len(ext_feeders) - 1) * int(S(dims["sub_gap"] * 0.8, scale_factor))
+                            
+                        nest_start_x = sx - total_ext_w // 2
+                        add_busbar(sg, nest_start_x, y_nest_bus, total_ext_w)
+                        
+                        sub_bus_edges_local[j] = (nest_start_x, nest_start_x + total_ext_w)
+                        sub_y_local[j] = y_nest_bus
+
+                        curr_nest_x = nest_start_x
+                        
+                        ext_first_lv_left = 0
+                        ext_first_lv_y = 0
+                        ext_last_lv_right = 0
+                        ext_last_lv_y = 0
+                        
+                        nested_lv_coords = {} 
+
+                        n_ext = len(ext_feeders)
+                        for k in range(n_ext):
+                            ef_conf = ext_feeders[k]
+                            ef_type = ef_conf.get("type", "Standard")
+                            ef_w = ext_item_widths[k]
+                            ef_center = curr_nest_x + ef_w // 2
+                            eg = add_shape_group(sg, f"F{idx+1}/SF{j+1}/EF{k+1}")
+                            
+                            y_nf_brk = int(y_nest_bus + S(1.0, scale_factor))
+                            add_line(eg, ef_center, y_nest_bus, ef_center, y_nf_brk)
+                            add_breaker_x(eg, ef_center, y_nf_brk, scale_factor, 0.15)
+                            
+                            this_lv_left = ef_center
+                            this_lv_right = ef_center
+                            this_lv_y = y_nf_brk 
+                            
+                            if ef_type == "MV Gen":
+                                pptx_add_inverter_branch(eg, ef_center, int(y_nf_brk + S(0.1, scale_factor)), ef_conf.get("gens", []), scale_factor)
+                                this_lv_y = int(y_nf_brk + S(2.0, scale_factor))
+                            else:
+                                y_nf_tx = int(y_nf_brk + S(1.5, scale_factor))
+                                add_line(eg, ef_center, int(y_nf_brk + S(0.1, scale_factor)), ef_center, int(y_nf_tx - S(0.9, scale_factor)))
+                                pptx_add_transformer(eg, ef_center, y_nf_tx, f"{sub_voltage}/0.4", "", scale_factor)
+                                
+                                y_nf_lv = int(y_nf_tx + S(1.5, scale_factor))
+                                add_line(eg, ef_center, int(y_nf_tx + S(0.9, scale_factor)), ef_center, y_nf_lv)
+                                
+                                bus_viz = ef_w - int(S(0.5, scale_factor))
+                                add_busbar(eg, ef_center - bus_viz // 2, y_nf_lv, bus_viz)
+                                pptx_add_lv_system(eg, ef_center, y_nf_lv, ef_conf.get("gens", []), ef_conf.get("has_emsb"), "EMSB", scale_factor)
+                                
+                                this_lv_left = ef_center - bus_viz // 2
+                                this_lv_right = ef_center + bus_viz // 2
+                                this_lv_y = y_nf_lv
+                            
+                            nested_lv_coords[k] = (this_lv_left, this_lv_right, this_lv_y)
+
+                            if k == 0:
+                                ext_first_lv_left = this_lv_left
+                                ext_first_lv_y = this_lv_y
+                            if k == n_ext - 1:
+                                ext_last_lv_right = this_lv_right
+                                ext_last_lv_y = this_lv_y
+                            
+                            tb = eg.shapes.add_textbox(int(ef_center - S(1.0, scale_factor)), int(y_nf_brk - S(0.5, scale_factor)), int(S(2.0, scale_factor)), int(S(0.5, scale_factor)))
+                            tb.text_frame.text = ef_conf.get("name", "")
+                            style_paragraph(tb.text_frame.paragraphs[0], max(8, 10*scale_factor), align=PP_ALIGN.CENTER)
+                            
+                            curr_nest_x += ef_w + int(S(dims["sub_gap"] * 0.8, scale_factor))
+                        
+                        # Draw internal extension couplers (PPTX)
+                        req_ext_couplers = s_conf.get("extension_couplers", [])
+                        for pair_idx in req_ext_couplers:
+                            if pair_idx in nested_lv_coords and (pair_idx+1) in nested_lv_coords:
+                                r_edge = nested_lv_coords[pair_idx][1]
+                                y1 = nested_lv_coords[pair_idx][2]
+                                l_edge = nested_lv_coords[pair_idx+1][0]
+                                y2 = nested_lv_coords[pair_idx+1][2]
+                                
+                                mid_cy = (y1 + y2) // 2
+                                
+                                add_line(sg, r_edge, mid_cy, l_edge, mid_cy, 3, RGBColor(255,0,0))
+                                mid_cx = (r_edge + l_edge) // 2
+                                add_breaker_x(sg, mid_cx, mid_cy, scale_factor, 0.15, RGBColor(255,0,0))
+
+                        y_end_pt = ext_last_lv_y 
+                        x_end_pt = ext_last_lv_right 
+                    else:
+                        add_line(sg, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), sx, int(y_mv_brk_sub + S(2.5, scale_factor)))
+                        tb = sg.shapes.add_textbox(int(sx - S(1.5, scale_factor)), int(y_mv_brk_sub + S(2.7, scale_factor)), int(S(3.0, scale_factor)), int(S(0.8, scale_factor)))
+                        tb.text_frame.text = f"{sub_voltage} OUT"
+                        style_paragraph(tb.text_frame.paragraphs[0], max(10, 14*scale_factor), bold=True, align=PP_ALIGN.CENTER)
+                        y_end_pt = int(y_mv_brk_sub + S(3.0, scale_factor))
+                        x_end_pt = sx
+                else:
+                    y_tx_sub = int(y_mv_brk_sub + S(2.2, scale_factor))
+                    add_line(sg, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), sx, int(y_tx_sub - S(0.9, scale_factor)))
+                    pptx_add_transformer(sg, sx, y_tx_sub, f"{sub_voltage}/0.4", f"TX-SF{j+1}", scale_factor)
+                    
+                    y_sub_breaker = int(y_tx_sub + S(1.5, scale_factor))
+                    add_line(sg, sx, int(y_tx_sub + S(0.9, scale_factor)), sx, y_sub_breaker)
+                    add_breaker_x(sg, sx, y_sub_breaker, scale_factor, 0.2)
+                    
+                    y_lv_out = int(y_sub_breaker + S(0.2, scale_factor))
+                    b_viz = max(int(S(dims["item_w"], scale_factor)), sw - int(S(0.5, scale_factor)))
+                    b_start = sx - b_viz // 2
+                    b_end = b_start + b_viz
+                    add_busbar(sg, b_start, y_lv_out, b_viz)
+                    
+                    if j == n_subs - 1 and is_last:
+                        tb = sg.shapes.add_textbox(int(b_end + S(0.1, scale_factor)), int(y_lv_out - S(0.3, scale_factor)), int(S(1.5, scale_factor)), int(S(0.6, scale_factor)))
+                        tb.text_frame.text = "400V"
+                        p = tb.text_frame.paragraphs[0]
+                        style_paragraph(p, max(10, 20*scale_factor), bold=True, color=RGBColor(0, 112, 192), align=PP_ALIGN.LEFT)
+                    
+                    sub_bus_edges_local[j] = (b_start, b_start + b_viz)
+                    sub_y_local[j] = y_lv_out
+                    
+                    pptx_add_lv_system(sg, sx, y_lv_out, s_conf.get("gens", []), s_conf.get("has_emsb"), "EMSB", scale_factor)
+                    
+                    y_end_pt = y_lv_out
+                    x_end_pt = b_end
+                
+                curr_sb_x += sw + int(S(dims["sub_gap"], scale_factor))
+                
+                if j == 0:
+                     if sf_type == "Standard":
+                         anchors["first"] = (int(sx - max(S(dims["item_w"], scale_factor), sw - S(0.5, scale_factor))/2), y_end_pt)
+                     elif sf_type == "Extension" and ext_feeders:
+                         anchors["first"] = (ext_first_lv_left, ext_first_lv_y)
+
+                if j == n_subs - 1:
+                    if sf_type == "Standard":
+                         anchors["last"] = (x_end_pt, y_end_pt)
+                    elif sf_type == "Extension" and ext_feeders:
+                         anchors["last"] = (ext_last_lv_right, ext_last_lv_y)
+            
+            for cp in config.get("sub_couplers", []):
+                 if cp in sub_bus_edges_local and (cp+1) in sub_bus_edges_local:
+                     e1 = sub_bus_edges_local[cp][1]; e2 = sub_bus_edges_local[cp+1][0]; y_cp = sub_y_local[cp]
+                     add_line(fg, e1, y_cp, e2, y_cp, 3, RGBColor(255,0,0))
+                     add_breaker_x(fg, (e1+e2) // 2, y_cp, scale_factor, 0.2, RGBColor(255,0,0))
+
+    else: # Standard
+        chain = get_tx_chain(voltage, config.get("tx_scheme", ""))
+        temp_y = cur_y
+        if not chain and voltage == "400V":
+            y_fin_this_feeder = int(S(14.0, scale_factor))
+            add_line(fg, cx, temp_y, cx, y_fin_this_feeder)
+        else:
+            for step in chain:
+                y_tx = int(temp_y + S(2.5, scale_factor))
+                pptx_add_transformer(fg, cx, y_tx, step["ratio"], f"TX-{idx+1}", scale_factor)
+                add_line(fg, cx, temp_y, cx, int(y_tx - S(0.9, scale_factor)))
+                temp_y = int(y_tx + S(0.9, scale_factor))
+            y_fin_this_feeder = int(temp_y + S(2.0, scale_factor))
+            add_line(fg, cx, temp_y, cx, int(y_fin_this_feeder + S(0.05, scale_factor)))
+        
+        gens = config.get("gens", []); has_emsb = config.get("emsb", {}).get("has")
+        cnt = len(gens) + (1 if has_emsb else 0)
+        bw = max(int(S(dims["min_w"], scale_factor)), cnt * int(S(dims["item_w"], scale_factor)))
+        
+        left_edge = cx - bw // 2; right_edge = cx + bw // 2
+        add_busbar(fg, left_edge, y_fin_this_feeder, bw)
+        
+        if is_last:
+            tb = fg.shapes.add_textbox(int(right_edge + S(0.1, scale_factor)), int(y_fin_this_feeder - S(0.3, scale_factor)), int(S(1.5, scale_factor)), int(S(0.6, scale_factor)))
+            tb.text_frame.text = "400V"
+            p = tb.text_frame.paragraphs[0]
+            style_paragraph(p, max(10, 20*scale_factor), bold=True, color=RGBColor(0, 112, 192), align=PP_ALIGN.LEFT)
+        
+        lv_edges = (left_edge, right_edge)
+        pptx_add_lv_system(fg, cx, y_fin_this_feeder, gens, has_emsb, config["emsb"]["name"], scale_factor)
+        
+        anchors["first"] = (left_edge, y_fin_this_feeder)
+        anchors["last"] = (right_edge, y_fin_this_feeder)
+
+    if ctype == "Standard":
+        anchors["lv"] = {"y": y_fin_this_feeder, "left": lv_edges[0], "right": lv_edges[1]}
+
+    return fg._element, anchors
+
+
+@merges_lines(merge_pptx_lines)
 def draw_feeder_group_on_slide(slide, voltage, feeders_list, swg_configs, swg_names, 
                                start_x, dims, incomer_data, 
                                draw_bc_start, draw_bc_end, bc_label, 
@@ -658,7 +1596,6 @@ def draw_feeder_group_on_slide(slide, voltage, feeders_list, swg_configs, swg_na
     Y_MAIN_BUS = int(S(6.0, scale_factor))
     Y_INC_TOP = int(S(1.0, scale_factor))
     Y_INC_BRK = int(S(4.0, scale_factor))
-    Y_FDR_BRK = int(S(7.5, scale_factor))
     GAP = int(S(dims["gap"], scale_factor))
     
     current_x = int(start_x)
@@ -696,9 +1633,7 @@ def draw_feeder_group_on_slide(slide, voltage, feeders_list, swg_configs, swg_na
         tb = slide.shapes.add_textbox(int(mid_bc - S(1.5, scale_factor)), int(Y_MAIN_BUS - S(1.5, scale_factor)), int(S(3.0, scale_factor)), int(S(1.2, scale_factor)))
         tb.text_frame.text = bc_label
         for p in tb.text_frame.paragraphs:
-            p.font.color.rgb = RGBColor(255,0,0)
-            p.font.size = Pt(max(10, 20*scale_factor)) 
-            p.alignment = PP_ALIGN.CENTER
+            style_paragraph(p, max(10, 20*scale_factor), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
         add_continuation_arrow(slide, c_end, Y_MAIN_BUS, "next", "To Sheet 2", scale_factor)
     else:
         add_busbar(slide, bus_left, Y_MAIN_BUS, actual_bus_end - bus_left)
@@ -715,9 +1650,7 @@ def draw_feeder_group_on_slide(slide, voltage, feeders_list, swg_configs, swg_na
         tb = slide.shapes.add_textbox(tb_x, tb_y, tb_w, int(S(1.5, scale_factor)))
         tb.text_frame.text = incomer_data["label"]
         for p in tb.text_frame.paragraphs:
-            p.alignment = PP_ALIGN.CENTER
-            p.font.bold = True
-            p.font.size = Pt(max(10, 20*scale_factor)) 
+            style_paragraph(p, max(10, 20*scale_factor), bold=True, align=PP_ALIGN.CENTER)
 
     lv_coords_local = {}
     sub_board_bus_local = {}
@@ -730,301 +1663,325 @@ def draw_feeder_group_on_slide(slide, voltage, feeders_list, swg_configs, swg_na
         
         cx = cursor_x + w_feeder_scaled // 2
         
-        ctype = config.get("type", "Standard")
-        col = RGBColor(0,176,80) if ctype == "MV Gen" else RGBColor(0,112,192)
-
-        add_line(slide, cx, Y_MAIN_BUS, cx, int(Y_FDR_BRK + S(0.1, scale_factor)), 3, col)
-        add_breaker_x(slide, cx, Y_FDR_BRK, scale_factor, 0.25, col)
-        
-        if voltage != "400V":
-            tb = slide.shapes.add_textbox(int(cx - S(2, scale_factor)), int(Y_FDR_BRK - S(0.8, scale_factor)), int(S(4, scale_factor)), int(S(0.8, scale_factor)))
-            tb.text_frame.text = swg_names[idx]
-            p = tb.text_frame.paragraphs[0]; p.alignment = PP_ALIGN.CENTER; p.font.bold = True; p.font.size = Pt(max(8, 16*scale_factor)) 
-
-        cur_y = int(Y_FDR_BRK + S(0.1, scale_factor))
-        y_fin_this_feeder = 0; lv_edges = (0, 0)
-
-        if ctype == "MV Gen":
-            gens = config.get("gens", [])
-            pptx_add_inverter_branch(slide, cx, cur_y, gens, scale_factor)
-            
-        elif ctype == "Sub-Board":
-            sub_voltage = config.get('sub_voltage')
-            is_extension = (voltage == sub_voltage)
-            
-            y_tx1 = int(cur_y + S(2.5, scale_factor))
-            y_sub_bus = int(y_tx1 + S(2.7, scale_factor))
-            
-            if not is_extension:
-                pptx_add_transformer(slide, cx, y_tx1, f"{voltage}/{sub_voltage}", f"TX-{idx+1}", scale_factor)
-                add_line(slide, cx, cur_y, cx, int(y_tx1 - S(0.9, scale_factor)))
-                
-                y_mv_breaker_main = int(y_tx1 + S(1.5, scale_factor))
-                add_line(slide, cx, int(y_tx1 + S(0.9, scale_factor)), cx, int(y_mv_breaker_main - S(0.2, scale_factor)))
-                add_breaker_x(slide, cx, y_mv_breaker_main, scale_factor, 0.25)
-                
-                y_sub_bus = int(y_mv_breaker_main + S(1.2, scale_factor))
-                add_line(slide, cx, int(y_mv_breaker_main + S(0.2, scale_factor)), cx, int(y_sub_bus + S(0.05, scale_factor)))
-            else:
-                y_ext_breaker = y_tx1
-                add_line(slide, cx, cur_y, cx, int(y_ext_breaker - S(0.2, scale_factor)))
-                add_breaker_x(slide, cx, y_ext_breaker, scale_factor, 0.25)
-                y_sub_bus = int(y_ext_breaker + S(1.2, scale_factor))
-                add_line(slide, cx, int(y_ext_breaker + S(0.2, scale_factor)), cx, int(y_sub_bus + S(0.05, scale_factor)))
-                
-            sub_feeders = config.get("sub_feeders", {})
-            n_subs = len(sub_feeders)
-            if n_subs > 0:
-                total_sb_width = sum(sub_ws_scaled) + (len(sub_ws_scaled)-1)*int(S(dims["sub_gap"], scale_factor))
-                start_sub_x = cx - total_sb_width // 2
-                add_busbar(slide, start_sub_x, y_sub_bus, total_sb_width)
-                
-                # Storing int (EMU)
-                sub_board_bus_local[idx] = (start_sub_x, start_sub_x + total_sb_width, y_sub_bus)
-                
-                tb = slide.shapes.add_textbox(start_sub_x + total_sb_width, int(y_sub_bus - S(0.3, scale_factor)), int(S(1.0, scale_factor)), int(S(0.5, scale_factor)))
-                tb.text_frame.text = sub_voltage; tb.text_frame.paragraphs[0].font.size = Pt(max(10, 20*scale_factor))
+        is_last = (i == len(feeders_list) - 1)
+        key = (feeder_digest(config), swg_names[idx], voltage, idx, is_last, float(scale_factor), tuple(sorted(dims.items())))
+        anchors = place_feeder(slide, key, cx, lambda: draw_feeder_on_slide(slide, voltage, idx, config, swg_names[idx], cx,
+                                                                            w_feeder_scaled, sub_ws_scaled, dims, is_last, scale_factor))
+        for part, found in (("lv", lv_coords_local), ("sub_bus", sub_board_bus_local), ("first", first_sub_local), ("last", last_sub_local)):
+            if part in anchors: found[idx] = anchors[part]
 
-                curr_sb_x = start_sub_x
-                sub_bus_edges_local = {}; sub_y_local = {}
+        cursor_x += w_feeder_scaled + GAP
 
-                for j in range(n_subs):
-                    sw = sub_ws_scaled[j]; sx = curr_sb_x + sw // 2
-                    s_conf = sub_feeders.get(j, {})
-                    sf_type = s_conf.get("type", "Standard")
-                    
-                    y_mv_brk_sub = int(y_sub_bus + S(1.2, scale_factor))
-                    add_line(slide, sx, y_sub_bus, sx, int(y_mv_brk_sub - S(0.2, scale_factor)))
-                    add_breaker_x(slide, sx, y_mv_brk_sub, scale_factor, 0.2)
-                    
-                    y_end_pt = 0 
-                    x_end_pt = 0
-                    
-                    if sf_type == "MV Gen":
-                        pptx_add_inverter_branch(slide, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), s_conf.get("gens", []), scale_factor)
-                        y_end_pt = int(y_mv_brk_sub + S(2.0, scale_factor))
-                        x_end_pt = sx 
-                    elif sf_type == "Extension":
-                        ext_feeders = s_conf.get("extension_feeders", {})
-                        if ext_feeders:
-                            y_nest_bus = int(y_mv_brk_sub + S(2.5, scale_factor))
-                            add_line(slide, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), sx, y_nest_bus)
-                            
-                            total_ext_w = 0
-                            ext_item_widths = []
-                            for k in ext_feeders:
-                                ef_conf = ext_feeders[k]
-                                ef_type = ef_conf.get("type", "Standard")
-                                if ef_type == "MV Gen":
-                                    ef_w = int(S(dims["item_w"], scale_factor))
-                                else:
-                                    ef_gens = ef_conf.get("gens", [])
-                                    ef_emsb = ef_conf.get("has_emsb", False)
-                                    ef_cnt = len(ef_gens) + (1 if ef_emsb else 0)
-                                    ef_w = max(int(S(dims["item_w"] * 1.5, scale_factor)), ef_cnt * int(S(dims["item_w"], scale_factor)))
-                                ext_item_widths.append(ef_w)
-                                total_ext_w += ef_w
-                            
-                            if len(ext_feeders) > 1:
-                                total_ext_w += (len(ext_feeders) - 1) * int(S(dims["sub_gap"] * 0.8, scale_factor))
-                                
-                            nest_start_x = sx - total_ext_w // 2
-                            add_busbar(slide, nest_start_x, y_nest_bus, total_ext_w)
-                            
-                            sub_bus_edges_local[j] = (nest_start_x, nest_start_x + total_ext_w)
-                            sub_y_local[j] = y_nest_bus
+    drawn_width = cursor_x - start_x
+    return lv_coords_local, drawn_width, actual_bus_end, sub_board_bus_local, last_sub_local, first_sub_local
 
-                            curr_nest_x = nest_start_x
-                            
-                            ext_first_lv_left = 0
-                            ext_first_lv_y = 0
-                            ext_last_lv_right = 0
-                            ext_last_lv_y = 0
-                            
-                            nested_lv_coords = {} 
+# --- Sheet bodies ---
+# What generate_pptx() draws on a sheet before the couplers that cross sheets:
+# the feeder groups, the bus couplers between them and the voltage label.
+# Each returns the anchors of its feeders, {"lv", "sub_bus", "first", "last"}
+# as reported by draw_feeder_group_on_slide(), keyed by feeder index.
 
-                            n_ext = len(ext_feeders)
-                            for k in range(n_ext):
-                                ef_conf = ext_feeders[k]
-                                ef_type = ef_conf.get("type", "Standard")
-                                ef_w = ext_item_widths[k]
-                                ef_center = curr_nest_x + ef_w // 2
-                                
-                                y_nf_brk = int(y_nest_bus + S(1.0, scale_factor))
-                                add_line(slide, ef_center, y_nest_bus, ef_center, y_nf_brk)
-                                add_breaker_x(slide, ef_center, y_nf_brk, scale_factor, 0.15)
-                                
-                                this_lv_left = ef_center
-                                this_lv_right = ef_center
-                                this_lv_y = y_nf_brk 
-                                
-                                if ef_type == "MV Gen":
-                                    pptx_add_inverter_branch(slide, ef_center, int(y_nf_brk + S(0.1, scale_factor)), ef_conf.get("gens", []), scale_factor)
-                                    this_lv_y = int(y_nf_brk + S(2.0, scale_factor))
-                                else:
-                                    y_nf_tx = int(y_nf_brk + S(1.5, scale_factor))
-                                    add_line(slide, ef_center, int(y_nf_brk + S(0.1, scale_factor)), ef_center, int(y_nf_tx - S(0.9, scale_factor)))
-                                    pptx_add_transformer(slide, ef_center, y_nf_tx, f"{sub_voltage}/0.4", "", scale_factor)
-                                    
-                                    y_nf_lv = int(y_nf_tx + S(1.5, scale_factor))
-                                    add_line(slide, ef_center, int(y_nf_tx + S(0.9, scale_factor)), ef_center, y_nf_lv)
-                                    
-                                    bus_viz = ef_w - int(S(0.5, scale_factor))
-                                    add_busbar(slide, ef_center - bus_viz // 2, y_nf_lv, bus_viz)
-                                    pptx_add_lv_system(slide, ef_center, y_nf_lv, ef_conf.get("gens", []), ef_conf.get("has_emsb"), "EMSB", scale_factor)
-                                    
-                                    this_lv_left = ef_center - bus_viz // 2
-                                    this_lv_right = ef_center + bus_viz // 2
-                                    this_lv_y = y_nf_lv
-                                
-                                nested_lv_coords[k] = (this_lv_left, this_lv_right, this_lv_y)
+def _sheet_anchors():
+    return {"lv": {}, "sub_bus": {}, "first": {}, "last": {}}
 
-                                if k == 0:
-                                    ext_first_lv_left = this_lv_left
-                                    ext_first_lv_y = this_lv_y
-                                if k == n_ext - 1:
-                                    ext_last_lv_right = this_lv_right
-                                    ext_last_lv_y = this_lv_y
-                                
-                                tb = slide.shapes.add_textbox(int(ef_center - S(1.0, scale_factor)), int(y_nf_brk - S(0.5, scale_factor)), int(S(2.0, scale_factor)), int(S(0.5, scale_factor)))
-                                tb.text_frame.text = ef_conf.get("name", "")
-                                tb.text_frame.paragraphs[0].font.size = Pt(max(8, 10*scale_factor))
-                                tb.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-                                
-                                curr_nest_x += ef_w + int(S(dims["sub_gap"] * 0.8, scale_factor))
-                            
-                            # Draw internal extension couplers (PPTX)
-                            req_ext_couplers = s_conf.get("extension_couplers", [])
-                            for pair_idx in req_ext_couplers:
-                                if pair_idx in nested_lv_coords and (pair_idx+1) in nested_lv_coords:
-                                    r_edge = nested_lv_coords[pair_idx][1]
-                                    y1 = nested_lv_coords[pair_idx][2]
-                                    l_edge = nested_lv_coords[pair_idx+1][0]
-                                    y2 = nested_lv_coords[pair_idx+1][2]
-                                    
-                                    mid_cy = (y1 + y2) // 2
-                                    
-                                    add_line(slide, r_edge, mid_cy, l_edge, mid_cy, 3, RGBColor(255,0,0))
-                                    mid_cx = (r_edge + l_edge) // 2
-                                    add_breaker_x(slide, mid_cx, mid_cy, scale_factor, 0.15, RGBColor(255,0,0))
+def _keep_group(found, coords, sb_loc, l_loc, f_loc):
+    found["lv"].update(coords); found["sub_bus"].update(sb_loc)
+    found["last"].update(l_loc); found["first"].update(f_loc)
 
-                            y_end_pt = ext_last_lv_y 
-                            x_end_pt = ext_last_lv_right 
-                        else:
-                            add_line(slide, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), sx, int(y_mv_brk_sub + S(2.5, scale_factor)))
-                            tb = slide.shapes.add_textbox(int(sx - S(1.5, scale_factor)), int(y_mv_brk_sub + S(2.7, scale_factor)), int(S(3.0, scale_factor)), int(S(0.8, scale_factor)))
-                            tb.text_frame.text = f"{sub_voltage} OUT"
-                            tb.text_frame.paragraphs[0].font.size = Pt(max(10, 14*scale_factor))
-                            tb.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-                            tb.text_frame.paragraphs[0].font.bold = True
-                            y_end_pt = int(y_mv_brk_sub + S(3.0, scale_factor))
-                            x_end_pt = sx
-                    else:
-                        y_tx_sub = int(y_mv_brk_sub + S(2.2, scale_factor))
-                        add_line(slide, sx, int(y_mv_brk_sub + S(0.2, scale_factor)), sx, int(y_tx_sub - S(0.9, scale_factor)))
-                        pptx_add_transformer(slide, sx, y_tx_sub, f"{sub_voltage}/0.4", f"TX-SF{j+1}", scale_factor)
-                        
-                        y_sub_breaker = int(y_tx_sub + S(1.5, scale_factor))
-                        add_line(slide, sx, int(y_tx_sub + S(0.9, scale_factor)), sx, y_sub_breaker)
-                        add_breaker_x(slide, sx, y_sub_breaker, scale_factor, 0.2)
-                        
-                        y_lv_out = int(y_sub_breaker + S(0.2, scale_factor))
-                        b_viz = max(int(S(dims["item_w"], scale_factor)), sw - int(S(0.5, scale_factor)))
-                        b_start = sx - b_viz // 2
-                        b_end = b_start + b_viz
-                        add_busbar(slide, b_start, y_lv_out, b_viz)
-                        
-                        if j == n_subs - 1 and i == len(feeders_list) - 1:
-                            tb = slide.shapes.add_textbox(int(b_end + S(0.1, scale_factor)), int(y_lv_out - S(0.3, scale_factor)), int(S(1.5, scale_factor)), int(S(0.6, scale_factor)))
-                            tb.text_frame.text = "400V"
-                            p = tb.text_frame.paragraphs[0]
-                            p.font.size = Pt(max(10, 20*scale_factor)) # FIXED 20pt
-                            p.font.bold = True
-                            p.font.color.rgb = RGBColor(0, 112, 192)
-                            p.alignment = PP_ALIGN.LEFT
-                        
-                        sub_bus_edges_local[j] = (b_start, b_start + b_viz)
-                        sub_y_local[j] = y_lv_out
-                        
-                        pptx_add_lv_system(slide, sx, y_lv_out, s_conf.get("gens", []), s_conf.get("has_emsb"), "EMSB", scale_factor)
-                        
-                        y_end_pt = y_lv_out
-                        x_end_pt = b_end
-                    
-                    curr_sb_x += sw + int(S(dims["sub_gap"], scale_factor))
-                    
-                    if j == 0:
-                         if sf_type == "Standard":
-                             first_sub_local[idx] = (int(sx - max(S(dims["item_w"], scale_factor), sw - S(0.5, scale_factor))/2), y_end_pt)
-                         elif sf_type == "Extension" and ext_feeders:
-                             first_sub_local[idx] = (ext_first_lv_left, ext_first_lv_y)
+def add_voltage_label(slide, voltage, bus_end_x, scale):
+    tb = slide.shapes.add_textbox(int(bus_end_x + S(0.1, scale)), int(S(6.0, scale) - S(0.3, scale)), int(S(1.5, scale)), int(S(0.6, scale)))
+    tb.text_frame.text = voltage
+    p = tb.text_frame.paragraphs[0]
+    style_paragraph(p, max(10, 20*scale), bold=True, color=RGBColor(0, 112, 192), align=PP_ALIGN.LEFT)
 
-                    if j == n_subs - 1:
-                        if sf_type == "Standard":
-                             last_sub_local[idx] = (x_end_pt, y_end_pt)
-                        elif sf_type == "Extension" and ext_feeders:
-                             last_sub_local[idx] = (ext_last_lv_right, ext_last_lv_y)
-                
-                for cp in config.get("sub_couplers", []):
-                     if cp in sub_bus_edges_local and (cp+1) in sub_bus_edges_local:
-                         e1 = sub_bus_edges_local[cp][1]; e2 = sub_bus_edges_local[cp+1][0]; y_cp = sub_y_local[cp]
-                         add_line(slide, e1, y_cp, e2, y_cp, 3, RGBColor(255,0,0))
-                         add_breaker_x(slide, (e1+e2) // 2, y_cp, scale_factor, 0.2, RGBColor(255,0,0))
+def draw_sheet_single(slide, voltage, sections, swg_configs, swg_names, msb_bc_status, start_x, dims, scale):
+    """Every section on one sheet, joined by bus couplers BC-n."""
+    found = _sheet_anchors()
+    GAP_RAW = dims["gap"]
+    current_x = start_x
+    
+    for s_i, feeders in enumerate(sections):
+        inc_label = f"INCOMING {s_i+1}\n({voltage})"
+        is_last = (s_i == len(sections) - 1)
+        
+        coords, w_used, bus_end_x, sb_loc, l_loc, f_loc = draw_feeder_group_on_slide(slide, voltage, feeders, swg_configs, swg_names, 
+                                            current_x, dims, 
+                                            {"label": inc_label}, 
+                                            False, False, "", scale)
+        _keep_group(found, coords, sb_loc, l_loc, f_loc)
+        current_x += w_used
+        
+        if not is_last:
+            gap_size = int(S(1.0, scale))
+            y_bus = int(S(6.0, scale))
+            add_line(slide, current_x - int(S(GAP_RAW, scale)), y_bus, current_x + gap_size, y_bus, 3, RGBColor(255,0,0))
+            mid_x = (current_x + gap_size // 2 - int(S(GAP_RAW, scale)) // 2)
+            add_breaker_x(slide, mid_x, y_bus, scale, 0.25, RGBColor(255,0,0))
+            bc_text = f"BC-{s_i+1}\n({msb_bc_status.get(s_i, 'NO')})"
+            tb_bc = slide.shapes.add_textbox(int(mid_x - S(1.5, scale)), int(y_bus - S(1.2, scale)), int(S(3.0, scale)), int(S(0.8, scale)))
+            tb_bc.text_frame.text = bc_text
+            for p in tb_bc.text_frame.paragraphs:
+                style_paragraph(p, max(10, 20*scale), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
+
+            current_x += gap_size
+        else:
+            add_voltage_label(slide, voltage, bus_end_x, scale)
+    return found
+
+def draw_sheet_lhs(slide, voltage, feeders, swg_configs, swg_names, bc_label, start_x, dims, scale):
+    """Left sheet of a split: the first section (or half of the only one), ending in bus coupler bc_label."""
+    found = _sheet_anchors()
+    coords, _, _, sb_loc, l_loc, f_loc = draw_feeder_group_on_slide(slide, voltage, feeders, swg_configs, swg_names, 
+                                   start_x, dims, {"label": f"INCOMING 1\n({voltage})"}, 
+                                   False, True, bc_label, scale)
+    _keep_group(found, coords, sb_loc, l_loc, f_loc)
+    return found
+
+def draw_sheet_rhs(slide, voltage, groups, swg_configs, swg_names, msb_bc_status, start_x, dims, scale):
+    """Right sheet of a split: groups [(feeders, incomer label)], continuing the left sheet's bus."""
+    found = _sheet_anchors()
+    GAP_RAW = dims["gap"]
+    curr_x = start_x
+    for r_i, (r_feeders, lbl) in enumerate(groups):
+        is_first = (r_i == 0)
+        c_out, w_used, bus_end_x, sb_out, l_out, f_out = draw_feeder_group_on_slide(slide, voltage, r_feeders, swg_configs, swg_names, 
+                                            curr_x, dims, {"label": lbl},
+                                            is_first, False, "", scale)
+        _keep_group(found, c_out, sb_out, l_out, f_out)
+        
+        if r_i < len(groups) - 1:
+            curr_x += w_used
+            add_line(slide, curr_x - int(S(GAP_RAW, scale)), int(S(6.0, scale)), curr_x + int(S(1.0, scale)), int(S(6.0, scale)), 3, RGBColor(255,0,0))
+            mid_x = (curr_x + int(S(1.0, scale)) // 2 - int(S(GAP_RAW, scale)) // 2)
+            add_breaker_x(slide, mid_x, int(S(6.0, scale)), scale, 0.25, RGBColor(255,0,0))
+            bc_text = f"BC-{r_i+2}\n({msb_bc_status.get(r_i+1, 'NO')})"
+            tb_bc = slide.shapes.add_textbox(int(mid_x - S(0.5, scale)), int(S(6.0, scale) - S(1.2, scale)), int(S(3.0, scale)), int(S(0.8, scale)))
+            tb_bc.text_frame.text = bc_text
+            for p in tb_bc.text_frame.paragraphs:
+                style_paragraph(p, max(10, 20*scale), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
+
+            curr_x += int(S(1.0, scale))
+        else:
+            add_voltage_label(slide, voltage, bus_end_x, scale)
+    return found
 
-        else: # Standard
-            chain = get_tx_chain(voltage, config.get("tx_scheme", ""))
-            temp_y = cur_y
-            if not chain and voltage == "400V":
-                y_fin_this_feeder = int(S(14.0, scale_factor))
-                add_line(slide, cx, temp_y, cx, y_fin_this_feeder)
+def place_sheet_body(slide, memo, draw, *args):
+    """
+    Draws a sheet body with draw(slide, *args) and returns its anchors.
+    memo: (last build's bodies, this build's bodies), or None to just draw.
+    Bodies are kept as (elements, anchors, formats, levels before, levels
+    after, XML bytes).
+    A body drawn from the same arguments in the last build is copied from
+    there when its label formats still fit the deck's text levels, or, for
+    a body with inline labels, when the levels are as they were before it.
+    """
+    if memo is None: return draw(slide, *args)
+    last, kept = memo
+    key = _digest(draw.__name__, *args)
+    tree = slide.shapes._spTree
+    levels = getattr(_deck_text, "levels", None)
+    hit = last.get(key)
+    if hit is not None:
+        els, found, formats, before, after, _ = hit
+        lvls = claim_text_levels(formats)
+        if lvls is None and formats is None and levels is not None and levels == before:
+            levels.update(after); lvls = {str(n): str(n) for n in after.values()}
+        if lvls is not None:
+            for el in els:
+                el = copy.deepcopy(el); relevel(el, lvls)
+                tree.insert_element_before(el, "p:extLst")
+            kept[key] = hit
+            return copy.deepcopy(found)
+    n = len(list(tree.iter_shape_elms()))
+    before = dict(levels or {})
+    found, formats = record_text_levels(lambda: draw(slide, *args))
+    if levels is not None:
+        els = [copy.deepcopy(el) for el in list(tree.iter_shape_elms())[n:]]
+        size = sum(len(etree.tostring(el)) for el in els) # Measured once, for the session's memory account
+        kept[key] = (els, copy.deepcopy(found), formats, before, dict(levels), size)
+    return found
+
+# --- Sheet workers ---
+# Sheet bodies only share the deck's text levels, which place_sheet_body()
+# renumbers on copy, so the sheets of a split board can be drawn at the same
+# time in worker processes. Each worker draws onto a scratch slide of its own
+# deck and returns the body as XML, in the form place_sheet_body() memoizes.
+# Workers are started from a fork server, not forked from the server: its
+# threads may hold locks (logging, caches) at the moment of a fork. Like any
+# spawned process they re-import the caller's main module, so a script with no
+# `if __name__ == "__main__":` guard kills them; a pool that breaks before it
+# ever drew a sheet turns the workers off for the process.
+
+SHEET_WORKERS = int(os.environ.get("SLD_SHEET_WORKERS", min(2, os.cpu_count() or 1))) # 1 or less: draw in-process
+SHEET_TIMEOUT_S = float(os.environ.get("SLD_SHEET_TIMEOUT_S", "60")) # Then the sheets are drawn in-process
+_sheet_pool = None
+_sheet_pool_lock = threading.Lock()
+_sheet_pool_state = {"drew": False, "off": False} # A body came back; workers turned off
+
+def sheet_pool():
+    """The shared worker pool, or None where sheets are drawn in-process."""
+    global _sheet_pool
+    with _sheet_pool_lock:
+        if _sheet_pool is None and SHEET_WORKERS > 1 and not _sheet_pool_state["off"]:
+            resource_tracker.ensure_running() # Shared by the workers, so it frees their segments if we exit first
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload([__name__]) # Workers fork from a server that imported this module once
             else:
-                for step in chain:
-                    y_tx = int(temp_y + S(2.5, scale_factor))
-                    pptx_add_transformer(slide, cx, y_tx, step["ratio"], f"TX-{idx+1}", scale_factor)
-                    add_line(slide, cx, temp_y, cx, int(y_tx - S(0.9, scale_factor)))
-                    temp_y = int(y_tx + S(0.9, scale_factor))
-                y_fin_this_feeder = int(temp_y + S(2.0, scale_factor))
-                add_line(slide, cx, temp_y, cx, int(y_fin_this_feeder + S(0.05, scale_factor)))
-            
-            gens = config.get("gens", []); has_emsb = config.get("emsb", {}).get("has")
-            cnt = len(gens) + (1 if has_emsb else 0)
-            bw = max(int(S(dims["min_w"], scale_factor)), cnt * int(S(dims["item_w"], scale_factor)))
-            
-            left_edge = cx - bw // 2; right_edge = cx + bw // 2
-            add_busbar(slide, left_edge, y_fin_this_feeder, bw)
-            
-            if i == len(feeders_list) - 1:
-                tb = slide.shapes.add_textbox(int(right_edge + S(0.1, scale_factor)), int(y_fin_this_feeder - S(0.3, scale_factor)), int(S(1.5, scale_factor)), int(S(0.6, scale_factor)))
-                tb.text_frame.text = "400V"
-                p = tb.text_frame.paragraphs[0]
-                p.font.size = Pt(max(10, 20*scale_factor)) 
-                p.font.bold = True
-                p.font.color.rgb = RGBColor(0, 112, 192)
-                p.alignment = PP_ALIGN.LEFT
-            
-            lv_edges = (left_edge, right_edge)
-            pptx_add_lv_system(slide, cx, y_fin_this_feeder, gens, has_emsb, config["emsb"]["name"], scale_factor)
-            
-            first_sub_local[idx] = (left_edge, y_fin_this_feeder)
-            last_sub_local[idx] = (right_edge, y_fin_this_feeder)
-
-        if ctype == "Standard":
-            lv_coords_local[idx] = {"y": y_fin_this_feeder, "left": lv_edges[0], "right": lv_edges[1]}
-
-        cursor_x += w_feeder_scaled + GAP
-
-    drawn_width = cursor_x - start_x
-    return lv_coords_local, drawn_width, actual_bus_end, sub_board_bus_local, last_sub_local, first_sub_local
-
+                ctx = multiprocessing.get_context("spawn")
+            _sheet_pool = ProcessPoolExecutor(SHEET_WORKERS, mp_context=ctx)
+        return _sheet_pool
+
+def reset_sheet_pool(pool):
+    """Drops a broken or stuck pool, killing its workers; the next build starts a new one."""
+    global _sheet_pool
+    with _sheet_pool_lock:
+        if _sheet_pool is pool: _sheet_pool = None
+    for proc in list((pool._processes or {}).values()): proc.kill() # A stuck job would hold its worker forever
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Bodies of large boards come back through a shared memory segment instead
+# of the result pipe: the worker writes the XML once and the parent parses
+# it in place. The parent owns the segment from then on and always frees it.
+SHM_MIN_BYTES = 64 * 1024 # Smaller results are cheaper to pickle
+
+def shm_put(chunks):
+    """Copies byte chunks into a new shared memory segment; returns (name, [(start, end)]) for shm_take()."""
+    spans, pos = [], 0
+    for c in chunks: spans.append((pos, pos + len(c))); pos += len(c)
+    shm = shared_memory.SharedMemory(create=True, size=max(pos, 1))
+    try:
+        for c, (start, end) in zip(chunks, spans): shm.buf[start:end] = c
+    except BaseException:
+        shm.close(); shm.unlink()
+        raise
+    shm.close() # The segment lives on until shm_take() unlinks it
+    return shm.name, spans
+
+def shm_take(name, spans, parse):
+    """Maps a shm_put() segment, returns [parse(view) for each chunk] and unlinks the segment."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out = []
+        for start, end in spans:
+            with shm.buf[start:end] as view: out.append(parse(view))
+        return out
+    finally:
+        shm.close(); shm.unlink()
+
+def _draw_sheet_job(job):
+    name, args = job
+    prs, blank = new_deck()
+    begin_text_styles()
+    memo = ({}, {})
+    place_sheet_body(prs.slides.add_slide(blank), memo, globals()[name], *args)
+    _deck_text.levels = None
+    (key, (els, found, formats, before, after, size)), = memo[1].items()
+    xml = [etree.tostring(el) for el in els]
+    payload = shm_put(xml) if size >= SHM_MIN_BYTES else (None, xml)
+    return key, (payload, found, formats, before, after, size)
+
+def _body_elements(payload):
+    name, data = payload
+    if name is None: return [parse_xml(x) for x in data]
+    return shm_take(name, data, parse_xml)
+
+def draw_sheet_bodies(bodies):
+    """
+    Draws [(draw, args)] sheet bodies in the worker pool; returns them as
+    {key: memo entry} for place_sheet_body(), or {} to draw them in-process
+    (a single body, no pool, or the pool broke or timed out). Errors raised
+    while drawing propagate.
+    """
+    pool = sheet_pool() if len(bodies) > 1 else None
+    if pool is None: return {}
+    deadline = time.monotonic() + SHEET_TIMEOUT_S
+    done, error = [], None
+    for fut in [pool.submit(_draw_sheet_job, (draw.__name__, args)) for draw, args in bodies]:
+        try: done.append(fut.result(timeout=max(0, deadline - time.monotonic())))
+        except Exception as e: error = error or e
+    # Taken even when another job failed, so no segment is left behind
+    drawn = {key: (_body_elements(payload), *rest) for key, (payload, *rest) in done}
+    if isinstance(error, (BrokenProcessPool, FutureTimeout)): # A worker died or hangs
+        with _sheet_pool_lock: # Broken before any body came back: workers can't start in this process
+            was_off = _sheet_pool_state["off"]
+            if isinstance(error, BrokenProcessPool) and not _sheet_pool_state["drew"]: _sheet_pool_state["off"] = True
+        if _sheet_pool_state["off"] and not was_off:
+            _log.warning("sheet workers failed before drawing a sheet (%r); drawing in-process from now on. "
+                         "A script that calls generate_pptx() needs an `if __name__ == \"__main__\":` guard.", error)
+        elif not was_off:
+            _log.warning("sheet workers failed (%r); drawing in-process", error)
+        reset_sheet_pool(pool)
+        return {}
+    if error is not None: raise error
+    _sheet_pool_state["drew"] = True
+    return drawn
+
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0) # Earliest ZIP date; every entry gets it
+
+def write_package(prs, f, blobs=None):
+    """
+    Saves the deck like prs.save(f), but deterministically: parts in partname
+    order and fixed ZIP entry dates, so equal decks are equal bytes.
+    blobs: {partname: bytes} already serialized, written instead of the part XML.
+    """
+    blobs = blobs or {}
+    package = prs.part.package
+    parts = sorted(package.iter_parts(), key=lambda part: part.partname)
+    with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zf:
+        def write(uri, blob):
+            info = zipfile.ZipInfo(uri.membername, ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED; info.create_system = 0
+            zf.writestr(info, blob)
+        write(CONTENT_TYPES_URI, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        write(PACKAGE_URI.rels_uri, package._rels.xml)
+        for part in parts:
+            write(part.partname, blobs.get(part.partname) or part.blob)
+            if part._rels: write(part.partname.rels_uri, part.rels.xml)
+    return f
+
+def save_presentation(prs, out=None, return_as="bytes", blobs=None):
+    """
+    out: path or writable binary file object. When given, the deck is written
+    there directly and `out` is returned.
+    return_as: "bytes", "memoryview" (zero-copy view of the in-memory buffer)
+    or "file" (spooled to a temp file, returned as an open reader).
+    blobs: pre-serialized parts, see write_package().
+    """
+    if out is not None:
+        return write_package(prs, out, blobs)
+    if return_as == "file":
+        return spooled_reader(lambda f: write_package(prs, f, blobs), ".pptx")
+    if return_as not in ("bytes", "memoryview"):
+        raise ValueError(f"Unknown return_as: {return_as!r}")
+    buf = io.BytesIO()
+    write_package(prs, buf, blobs)
+    return buf.getbuffer() if return_as == "memoryview" else buf.getvalue()
 
 def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status, 
                   msb_bc_status, lv_couplers, lv_bc_status, swg_names, swg_configs,
-                  inter_sub_bus_couplers=None, inter_lv_couplers=None):
-    
+                  inter_sub_bus_couplers=None, inter_lv_couplers=None,
+                  template=None, title_block=None, reuse=None, out=None, return_as="bytes"):
+    """
+    Builds the SLD deck. reuse: a dict kept by the caller across builds (one
+    per session). Sheet bodies drawn from the same feeders as in the last
+    build are copied from it rather than drawn, and slides that came out the
+    same are written from its saved parts instead of being finished again.
+    The two sheets of a split board are drawn in worker processes, which
+    re-import the caller's main module: a calling script needs an
+    `if __name__ == "__main__":` guard, else sheets are drawn in-process.
+    """
+
     if inter_sub_bus_couplers is None: inter_sub_bus_couplers = []
     if inter_lv_couplers is None: inter_lv_couplers = []
 
-    prs = Presentation()
+    # With a template the slide size is fixed and the drawing is scaled into its frame
+    if template is None:
+        prs, blank = new_deck(); frame = None
+    else:
+        prs, frame = template_deck(template); blank = None
+    sheets = []
+    begin_text_styles()
     MAX_PPTX_WIDTH_INCHES = 56.0 
     dims = get_feeder_width_config(is_pptx=True)
     GAP_RAW = dims["gap"]
@@ -1055,65 +2012,33 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
     global_sub_bus_map = {}
     global_last_sub = {}
     global_first_sub = {}
+    def keep_anchors(found, slide, scale):
+        for idx, data in found["lv"].items(): global_lv_map[idx] = {**data, 'slide': slide, 'scale': scale}
+        for k, v in found["sub_bus"].items(): global_sub_bus_map[k] = {'coords': v, 'slide': slide, 'scale': scale}
+        for k, v in found["last"].items(): global_last_sub[k] = {'coords': v, 'slide': slide, 'scale': scale}
+        for k, v in found["first"].items(): global_first_sub[k] = {'coords': v, 'slide': slide, 'scale': scale}
+    def subset(idxs): return {i: swg_configs.get(i, {}) for i in idxs}, {i: swg_names[i] for i in idxs}
+    memo = (reuse.get("bodies", {}), {}) if reuse is not None else None
     
     needed_height = 30.0 if has_sub_board else 20.0
-    Y_MAIN_BUS_CONST = 6.0 
 
     # --- SCENARIO A: SINGLE SLIDE ---
     if not requires_split:
-        scale = 1.0
-        final_w_inches = max(20.0, needed_width)
-        
-        prs.slide_width = int(Inches(final_w_inches))
-        prs.slide_height = int(Inches(needed_height))
-        
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        start_margin = int(Inches(final_w_inches - total_raw_width) / 2)
-        current_x = start_margin
-        
-        for s_i, feeders in enumerate(sections):
-            inc_label = f"INCOMING {s_i+1}\n({voltage})"
-            is_last = (s_i == len(sections) - 1)
-            
-            coords, w_used, bus_end_x, sb_loc, l_loc, f_loc = draw_feeder_group_on_slide(slide, voltage, feeders, swg_configs, swg_names, 
-                                                current_x, dims, 
-                                                {"label": inc_label}, 
-                                                False, False, "", scale)
-            
-            for idx, data in coords.items(): 
-                data['slide'] = slide
-                data['scale'] = scale 
-                global_lv_map[idx] = data
+        if frame is None:
+            scale = 1.0
+            final_w_inches = max(20.0, needed_width)
             
-            for k, v in sb_loc.items(): global_sub_bus_map[k] = {'coords': v, 'slide': slide, 'scale': scale}
-            for k, v in l_loc.items(): global_last_sub[k] = {'coords': v, 'slide': slide, 'scale': scale}
-            for k, v in f_loc.items(): global_first_sub[k] = {'coords': v, 'slide': slide, 'scale': scale}
-
-            current_x += w_used
-            
-            if not is_last:
-                gap_size = int(S(1.0, scale))
-                y_bus = int(S(Y_MAIN_BUS_CONST, scale))
-                add_line(slide, current_x - int(S(GAP_RAW, scale)), y_bus, current_x + gap_size, y_bus, 3, RGBColor(255,0,0))
-                mid_x = (current_x + gap_size // 2 - int(S(GAP_RAW, scale)) // 2)
-                add_breaker_x(slide, mid_x, y_bus, scale, 0.25, RGBColor(255,0,0))
-                bc_text = f"BC-{s_i+1}\n({msb_bc_status.get(s_i, 'NO')})"
-                tb_bc = slide.shapes.add_textbox(int(mid_x - S(1.5, scale)), int(y_bus - S(1.2, scale)), int(S(3.0, scale)), int(S(0.8, scale)))
-                tb_bc.text_frame.text = bc_text
-                for p in tb_bc.text_frame.paragraphs:
-                    p.alignment = PP_ALIGN.CENTER
-                    p.font.color.rgb = RGBColor(255,0,0)
-                    p.font.size = Pt(max(10, 20*scale)) 
-
-                current_x += gap_size
-            else:
-                tb = slide.shapes.add_textbox(int(bus_end_x + S(0.1, scale)), int(S(Y_MAIN_BUS_CONST, scale) - S(0.3, scale)), int(S(1.5, scale)), int(S(0.6, scale)))
-                tb.text_frame.text = voltage
-                p = tb.text_frame.paragraphs[0]
-                p.font.size = Pt(max(10, 20*scale)) 
-                p.font.bold = True
-                p.font.color.rgb = RGBColor(0, 112, 192)
-                p.alignment = PP_ALIGN.LEFT
+            prs.slide_width = int(Inches(final_w_inches))
+            prs.slide_height = int(Inches(needed_height))
+            start_margin = int(Inches(final_w_inches - total_raw_width) / 2)
+        else:
+            fx, _, fw, fh = frame
+            scale = min(1.0, fw / Inches(needed_width), fh / Inches(needed_height))
+            start_margin = fx + int((fw - S(total_raw_width, scale)) / 2)
+        
+        slide = add_sheet(prs, blank, sheets)
+        keep_anchors(place_sheet_body(slide, memo, draw_sheet_single, voltage, sections, *subset(sum(sections, [])),
+                                      msb_bc_status, start_margin, dims, scale), slide, scale)
 
     # --- SCENARIO B: SPLIT ---
     else:
@@ -1140,107 +2065,48 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
             rhs_indices_groups = sections[1:]
             rhs_raw_w = sum(section_raw_widths[1:]) + (len(rhs_indices_groups)-1)*1.0 + 2.0
 
-        max_content_w = max(lhs_raw_w, rhs_raw_w)
-        target_slide_w = max_content_w + 2.0
-        final_slide_w = min(target_slide_w, MAX_PPTX_WIDTH_INCHES)
-        final_slide_w = max(final_slide_w, 20.0) 
-        
-        prs.slide_width = int(Inches(final_slide_w))
-        prs.slide_height = int(Inches(needed_height))
-        
-        available_w = final_slide_w - 2.0
+        if frame is None:
+            max_content_w = max(lhs_raw_w, rhs_raw_w)
+            target_slide_w = max_content_w + 2.0
+            final_slide_w = min(target_slide_w, MAX_PPTX_WIDTH_INCHES)
+            final_slide_w = max(final_slide_w, 20.0) 
+            
+            prs.slide_width = int(Inches(final_slide_w))
+            prs.slide_height = int(Inches(needed_height))
+            
+            available_w = final_slide_w - 2.0
+            scale_h_limit = 0.85
+            area_x, area_w = 0, Inches(final_slide_w)
+        else:
+            area_x, _, area_w, fh = frame
+            available_w = area_w / Inches(1) - 2.0
+            scale_h_limit = min(0.85, fh / Inches(needed_height))
         scale_lhs_w = min(1.0, available_w / lhs_raw_w)
         scale_rhs_w = min(1.0, available_w / rhs_raw_w)
-        scale_h_limit = 0.85
         
         scale_lhs = min(scale_lhs_w, scale_h_limit)
         scale_rhs = min(scale_rhs_w, scale_h_limit)
         
-        slide1 = prs.slides.add_slide(prs.slide_layouts[6])
         lhs_content_w = S(lhs_raw_w, scale_lhs)
-        start_x1 = int((Inches(final_slide_w) - lhs_content_w) / 2)
-        
-        if len(sections) == 1:
-             c1, _, _, sb1, l1, f1 = draw_feeder_group_on_slide(slide1, voltage, lhs_fds, swg_configs, swg_names, 
-                                            start_x1, dims, {"label": f"INCOMING 1\n({voltage})"}, 
-                                            False, True, "Bus Cont.", scale_lhs)
-        else:
-             c1, _, _, sb1, l1, f1 = draw_feeder_group_on_slide(slide1, voltage, lhs_fds, swg_configs, swg_names, 
-                                            start_x1, dims, {"label": f"INCOMING 1\n({voltage})"}, 
-                                            False, True, f"BC-1\n({msb_bc_status.get(0, 'NO')})", scale_lhs)
-        for idx, data in c1.items(): 
-            data['slide'] = slide1
-            data['scale'] = scale_lhs
-            global_lv_map[idx] = data
-        for k, v in sb1.items(): global_sub_bus_map[k] = {'coords': v, 'slide': slide1, 'scale': scale_lhs}
-        for k, v in l1.items(): global_last_sub[k] = {'coords': v, 'slide': slide1, 'scale': scale_lhs}
-        for k, v in f1.items(): global_first_sub[k] = {'coords': v, 'slide': slide1, 'scale': scale_lhs}
-        
-        slide2 = prs.slides.add_slide(prs.slide_layouts[6])
+        start_x1 = area_x + int((area_w - lhs_content_w) / 2)
+        bc_label = "Bus Cont." if len(sections) == 1 else f"BC-1\n({msb_bc_status.get(0, 'NO')})"
         rhs_content_w = S(rhs_raw_w, scale_rhs)
-        start_x2 = int((Inches(final_slide_w) - rhs_content_w) / 2)
+        start_x2 = area_x + int((area_w - rhs_content_w) / 2)
+        if len(sections) == 1: rhs_groups = [(rhs_fds, "")]
+        else: rhs_groups = [(fds, f"INCOMING {r_i + 2}\n({voltage})") for r_i, fds in enumerate(sections[1:])]
+        bodies = [(draw_sheet_lhs, (voltage, lhs_fds, *subset(lhs_fds), bc_label, start_x1, dims, scale_lhs)),
+                  (draw_sheet_rhs, (voltage, rhs_groups, *subset(sum((fds for fds, _ in rhs_groups), [])),
+                                    msb_bc_status, start_x2, dims, scale_rhs))]
+        # Sheets not in the session's last build are drawn side by side in worker processes
+        drawn = draw_sheet_bodies([(draw, args) for draw, args in bodies
+                                   if memo is None or _digest(draw.__name__, *args) not in memo[0]])
+        if drawn:
+            last, kept = memo or ({}, {})
+            memo = ({**last, **drawn}, kept)
         
-        if len(sections) == 1:
-             c2, _, bus_end_x2, sb2, l2, f2 = draw_feeder_group_on_slide(slide2, voltage, rhs_fds, swg_configs, swg_names, 
-                                            start_x2, dims, {"label": ""}, 
-                                            True, False, "", scale_rhs)
-             for idx, data in c2.items(): 
-                 data['slide'] = slide2
-                 data['scale'] = scale_rhs
-                 global_lv_map[idx] = data
-             for k, v in sb2.items(): global_sub_bus_map[k] = {'coords': v, 'slide': slide2, 'scale': scale_rhs}
-             for k, v in l2.items(): global_last_sub[k] = {'coords': v, 'slide': slide2, 'scale': scale_rhs}
-             for k, v in f2.items(): global_first_sub[k] = {'coords': v, 'slide': slide2, 'scale': scale_rhs}
-             
-             tb = slide2.shapes.add_textbox(int(bus_end_x2 + S(0.1, scale_rhs)), int(S(Y_MAIN_BUS_CONST, scale_rhs) - S(0.3, scale_rhs)), int(S(1.5, scale_rhs)), int(S(0.6, scale_rhs)))
-             tb.text_frame.text = voltage
-             p = tb.text_frame.paragraphs[0]
-             p.font.size = Pt(max(10, 20*scale_rhs)) 
-             p.font.bold = True
-             p.font.color.rgb = RGBColor(0, 112, 192)
-             p.alignment = PP_ALIGN.LEFT
-
-        else:
-             curr_x = start_x2
-             rhs_indices_groups = sections[1:]
-             for r_i, r_feeders in enumerate(rhs_indices_groups):
-                is_first = (r_i == 0)
-                real_inc_idx = r_i + 2 
-                lbl = f"INCOMING {real_inc_idx}\n({voltage})"
-                
-                c_out, w_used, bus_end_x, sb_out, l_out, f_out = draw_feeder_group_on_slide(slide2, voltage, r_feeders, swg_configs, swg_names, 
-                                                    curr_x, dims, {"label": lbl},
-                                                    is_first, False, "", scale_rhs)
-                for idx, data in c_out.items(): 
-                    data['slide'] = slide2
-                    data['scale'] = scale_rhs
-                    global_lv_map[idx] = data
-                for k, v in sb_out.items(): global_sub_bus_map[k] = {'coords': v, 'slide': slide2, 'scale': scale_rhs}
-                for k, v in l_out.items(): global_last_sub[k] = {'coords': v, 'slide': slide2, 'scale': scale_rhs}
-                for k, v in f_out.items(): global_first_sub[k] = {'coords': v, 'slide': slide2, 'scale': scale_rhs}
-                
-                if r_i < len(rhs_indices_groups) - 1:
-                    curr_x += w_used
-                    add_line(slide2, curr_x - int(S(GAP_RAW, scale_rhs)), int(S(6.0, scale_rhs)), curr_x + int(S(1.0, scale_rhs)), int(S(6.0, scale_rhs)), 3, RGBColor(255,0,0))
-                    mid_x = (curr_x + int(S(1.0, scale_rhs)) // 2 - int(S(GAP_RAW, scale_rhs)) // 2)
-                    add_breaker_x(slide2, mid_x, int(S(6.0, scale_rhs)), scale_rhs, 0.25, RGBColor(255,0,0))
-                    bc_text = f"BC-{r_i+2}\n({msb_bc_status.get(r_i+1, 'NO')})"
-                    tb_bc = slide2.shapes.add_textbox(int(mid_x - S(0.5, scale_rhs)), int(S(6.0, scale_rhs) - S(1.2, scale_rhs)), int(S(3.0, scale_rhs)), int(S(0.8, scale_rhs)))
-                    tb_bc.text_frame.text = bc_text
-                    for p in tb_bc.text_frame.paragraphs:
-                        p.alignment = PP_ALIGN.CENTER
-                        p.font.color.rgb = RGBColor(255,0,0)
-                        p.font.size = Pt(max(10, 20*scale_rhs)) 
-
-                    curr_x += int(S(1.0, scale_rhs))
-                else:
-                    tb = slide2.shapes.add_textbox(int(bus_end_x + S(0.1, scale_rhs)), int(S(Y_MAIN_BUS_CONST, scale_rhs) - S(0.3, scale_rhs)), int(S(1.5, scale_rhs)), int(S(0.6, scale_rhs)))
-                    tb.text_frame.text = voltage
-                    p = tb.text_frame.paragraphs[0]
-                    p.font.size = Pt(max(10, 20*scale_rhs)) 
-                    p.font.bold = True
-                    p.font.color.rgb = RGBColor(0, 112, 192)
-                    p.alignment = PP_ALIGN.LEFT
+        for (draw, args), scale_sheet in zip(bodies, (scale_lhs, scale_rhs)):
+            slide = add_sheet(prs, blank, sheets)
+            keep_anchors(place_sheet_body(slide, memo, draw, *args), slide, scale_sheet)
 
     # 5. 11kV Sub-Board Couplers
     for pair_idx in inter_sub_bus_couplers:
@@ -1270,9 +2136,7 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
                  # Text
                  tb = sl.shapes.add_textbox(int(mid_x - S(1.0, sc)), int(mid_y + S(0.2, sc)), int(S(2.0, sc)), int(S(0.8, sc)))
                  tb.text_frame.text = "BC (11kV)"
-                 tb.text_frame.paragraphs[0].font.color.rgb = RGBColor(255,0,0)
-                 tb.text_frame.paragraphs[0].font.size = Pt(max(10, 14*sc))
-                 tb.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
+                 style_paragraph(tb.text_frame.paragraphs[0], max(10, 14*sc), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
              else:
                  # Split case
                  sl1 = d1['slide']; sl2 = d2['slide']
@@ -1287,9 +2151,7 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
                  
                  tb1 = sl1.shapes.add_textbox(int(mid_x1 - S(1.0, sc)), int(y1 + S(0.2, sc)), int(S(2.0, sc)), int(S(0.8, sc)))
                  tb1.text_frame.text = "BC"
-                 tb1.text_frame.paragraphs[0].font.color.rgb = RGBColor(255,0,0)
-                 tb1.text_frame.paragraphs[0].font.size = Pt(max(10, 14*sc))
-                 tb1.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
+                 style_paragraph(tb1.text_frame.paragraphs[0], max(10, 14*sc), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
 
                  # Slide 2: Arrow -> Line
                  sc2 = d2['scale']
@@ -1325,9 +2187,7 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
 
                  tb = sl.shapes.add_textbox(int(mid_x - S(1.0, sc)), int(mid_y + S(0.2, sc)), int(S(2.0, sc)), int(S(0.8, sc)))
                  tb.text_frame.text = "LV-BC"
-                 tb.text_frame.paragraphs[0].font.color.rgb = RGBColor(255,0,0)
-                 tb.text_frame.paragraphs[0].font.size = Pt(max(10, 14*sc))
-                 tb.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
+                 style_paragraph(tb.text_frame.paragraphs[0], max(10, 14*sc), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
              else:
                  # Split case
                  sl1 = d1['slide']; sl2 = d2['slide']
@@ -1342,9 +2202,7 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
                  
                  tb1 = sl1.shapes.add_textbox(int(mid_x1 - S(1.0, sc)), int(y1 + S(0.2, sc)), int(S(2.0, sc)), int(S(0.8, sc)))
                  tb1.text_frame.text = "LV-BC"
-                 tb1.text_frame.paragraphs[0].font.color.rgb = RGBColor(255,0,0)
-                 tb1.text_frame.paragraphs[0].font.size = Pt(max(10, 14*sc))
-                 tb1.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
+                 style_paragraph(tb1.text_frame.paragraphs[0], max(10, 14*sc), color=RGBColor(255,0,0), align=PP_ALIGN.CENTER)
 
                  # Slide 2: Arrow -> Line
                  sc2 = d2['scale']
@@ -1352,11 +2210,37 @@ def generate_pptx(voltage, num_in, num_swg, section_distribution, inc_bc_status,
                  add_continuation_arrow(sl2, start_x2, y2, "prev", "From Prev LV", sc2)
                  add_line(sl2, start_x2, y2, x2, y2, 3, RGBColor(255,0,0))
 
-    buf = io.BytesIO()
-    prs.save(buf)
-    buf.seek(0)
-    return buf.getvalue()
-
+    apply_text_styles(prs, theme=frame is None)
+    fields = {k: "" for k in TITLE_BLOCK_FIELDS}
+    fields.update(title_block or {})
+    last = reuse.get("slides", {}) if reuse is not None else {}
+    saved = {}
+    # Sheets are finished before the package is written, not one by one as the
+    # writer reaches them: a deck has at most two sheets, cross-sheet couplers
+    # need both drawn before either is finished, and presentation.xml and the
+    # master, written ahead of the slides, need every sheet's text levels.
+    # Streaming the slides would not lower peak memory.
+    for n, (sl, keep) in enumerate(sheets, start=1):
+        sheet_fields = {**fields, "sheet": n, "sheets": len(sheets)}
+        # Finishing is a pure function of the drawn XML and these, so equal digests mean equal parts
+        digest = hashlib.sha256(etree.tostring(sl._element) + _digest(frame, sheet_fields).encode()).hexdigest()
+        hit = last.get(sl.part.partname)
+        if hit is not None and hit[0] == digest:
+            saved[sl.part.partname] = hit
+            continue
+        localize_groups(sl, keep)
+        if frame is not None:
+            shift_shapes(sl, frame[1], keep)
+            fill_title_block(sl, sheet_fields, keep)
+            inline_theme_strokes(sl, keep)
+        name_shapes(sl, keep); renumber_shape_ids(sl)
+        if reuse is not None: saved[sl.part.partname] = (digest, sl.part.blob)
+    if reuse is not None:
+        reuse["slides"] = saved; reuse["bodies"] = memo[1]
+        reuse["bytes"] = reuse_bytes(reuse)
+    return save_presentation(prs, out, return_as, {name: blob for name, (_, blob) in saved.items()})
+
+@merges_lines(merge_mpl_lines)
 def draw_preview_mpl(voltage, num_in, num_swg, section_distribution, inc_bc_status, 
                      msb_bc_status, lv_couplers, lv_bc_status, swg_names, swg_configs, 
                      inter_sub_bus_couplers=None, inter_lv_couplers=None):
@@ -1398,13 +2282,13 @@ def draw_preview_mpl(voltage, num_in, num_swg, section_distribution, inc_bc_stat
         width, centers, _, sub_w_map = calculate_section_layout(indices, swg_configs, current_x_start, is_pptx=False)
         
         bus_min = min(centers) - 3.0; bus_max = max(centers) + 3.0
-        ax.hlines(Y_MAIN_BUS, bus_min, bus_max, lw=6, color="tab:blue")
+        plot_segment(ax, bus_min, Y_MAIN_BUS, bus_max, Y_MAIN_BUS, "tab:blue", 6, "butt", 1)
         bus_endpoints.append((bus_min, bus_max))
         
         inc_x = (bus_min + bus_max) / 2 if num_in == 1 else (bus_max - 1.5 if s_idx == 0 else bus_min + 1.5)
-        ax.plot([inc_x, inc_x], [Y_INC_TOP, Y_MAIN_BUS], color="tab:blue", lw=3)
-        ax.plot([inc_x-0.2, inc_x+0.2], [Y_INC_BRK-0.2, Y_INC_BRK+0.2], color="tab:blue", lw=3)
-        ax.plot([inc_x-0.2, inc_x+0.2], [Y_INC_BRK+0.2, Y_INC_BRK-0.2], color="tab:blue", lw=3)
+        plot_segment(ax, inc_x, Y_INC_TOP, inc_x, Y_MAIN_BUS, "tab:blue", 3)
+        plot_segment(ax, inc_x-0.2, Y_INC_BRK-0.2, inc_x+0.2, Y_INC_BRK+0.2, "tab:blue", 3)
+        plot_segment(ax, inc_x-0.2, Y_INC_BRK+0.2, inc_x+0.2, Y_INC_BRK-0.2, "tab:blue", 3)
         ax.text(inc_x, Y_INC_TOP + 0.2, f"INCOMING {s_idx+1}\n({voltage})", ha="center", fontweight="bold")
         
         if s_idx == len(section_distribution) - 1:
@@ -1426,10 +2310,10 @@ def draw_preview_mpl(voltage, num_in, num_swg, section_distribution, inc_bc_stat
         left_sect = bus_endpoints[s_idx]
         right_sect = bus_endpoints[s_idx+1]
         if left_sect[1] is not None and right_sect[0] is not None:
-            ax.plot([left_sect[1], right_sect[0]], [Y_MAIN_BUS, Y_MAIN_BUS], color="tab:red", lw=3)
+            plot_segment(ax, left_sect[1], Y_MAIN_BUS, right_sect[0], Y_MAIN_BUS, "tab:red", 3)
             mid_c = (left_sect[1] + right_sect[0]) / 2
-            ax.plot([mid_c-0.2, mid_c+0.2], [Y_MAIN_BUS-0.2, Y_MAIN_BUS+0.2], color="tab:red", lw=3)
-            ax.plot([mid_c-0.2, mid_c+0.2], [Y_MAIN_BUS+0.2, Y_MAIN_BUS-0.2], color="tab:red", lw=3)
+            plot_segment(ax, mid_c-0.2, Y_MAIN_BUS-0.2, mid_c+0.2, Y_MAIN_BUS+0.2, "tab:red", 3)
+            plot_segment(ax, mid_c-0.2, Y_MAIN_BUS+0.2, mid_c+0.2, Y_MAIN_BUS-0.2, "tab:red", 3)
             ax.text(mid_c, Y_MAIN_BUS + 0.5, f"BC-{s_idx+1}\n({msb_bc_status.get(s_idx, 'NO')})", color="tab:red", ha="center", fontweight="bold")
 
     # Draw Inter-Feeder Bus Couplers (11kV / 33kV)
@@ -1440,13 +2324,13 @@ def draw_preview_mpl(voltage, num_in, num_swg, section_distribution, inc_bc_stat
             mid_y = (y1+y2)/2
             
             # Draw vertical segments if heights differ
-            ax.plot([right_edge_1, right_edge_1], [y1, mid_y], color="tab:red", lw=3)
-            ax.plot([right_edge_1, left_edge_2], [mid_y, mid_y], color="tab:red", lw=3)
-            ax.plot([left_edge_2, left_edge_2], [mid_y, y2], color="tab:red", lw=3)
+            plot_segment(ax, right_edge_1, y1, right_edge_1, mid_y, "tab:red", 3)
+            plot_segment(ax, right_edge_1, mid_y, left_edge_2, mid_y, "tab:red", 3)
+            plot_segment(ax, left_edge_2, mid_y, left_edge_2, y2, "tab:red", 3)
             
             mid_x = (right_edge_1 + left_edge_2)/2
-            ax.plot([mid_x-0.2, mid_x+0.2], [mid_y-0.2, mid_y+0.2], color="tab:red", lw=3)
-            ax.plot([mid_x-0.2, mid_x+0.2], [mid_y+0.2, mid_y-0.2], color="tab:red", lw=3)
+            plot_segment(ax, mid_x-0.2, mid_y-0.2, mid_x+0.2, mid_y+0.2, "tab:red", 3)
+            plot_segment(ax, mid_x-0.2, mid_y+0.2, mid_x+0.2, mid_y-0.2, "tab:red", 3)
             ax.text(mid_x, mid_y+0.5, "BC (11kV)", color="tab:red", ha="center", fontsize=8, fontweight="bold")
 
     # Draw Inter-Feeder LV Couplers (0.4kV)
@@ -1456,18 +2340,635 @@ def draw_preview_mpl(voltage, num_in, num_swg, section_distribution, inc_bc_stat
             x2, y2 = global_first_sub_coords[idx+1]
             mid_y = (y1+y2)/2
             
-            ax.plot([x1, x1], [y1, mid_y], color="tab:red", lw=3)
-            ax.plot([x1, x2], [mid_y, mid_y], color="tab:red", lw=3)
-            ax.plot([x2, x2], [mid_y, y2], color="tab:red", lw=3)
+            plot_segment(ax, x1, y1, x1, mid_y, "tab:red", 3)
+            plot_segment(ax, x1, mid_y, x2, mid_y, "tab:red", 3)
+            plot_segment(ax, x2, mid_y, x2, y2, "tab:red", 3)
             
             mid_x = (x1+x2)/2
-            ax.plot([mid_x-0.2, mid_x+0.2], [mid_y-0.2, mid_y+0.2], color="tab:red", lw=3)
-            ax.plot([mid_x-0.2, mid_x+0.2], [mid_y+0.2, mid_y-0.2], color="tab:red", lw=3)
+            plot_segment(ax, mid_x-0.2, mid_y-0.2, mid_x+0.2, mid_y+0.2, "tab:red", 3)
+            plot_segment(ax, mid_x-0.2, mid_y+0.2, mid_x+0.2, mid_y-0.2, "tab:red", 3)
             ax.text(mid_x, mid_y+0.5, "LV-BC", color="tab:red", ha="center", fontsize=8, fontweight="bold")
 
     ax.axis('off'); ax.set_ylim(-8, 14); ax.set_xlim(0, fig_w)
     return fig
 
+# ============================================================
+# 4. EXPORT BUNDLE
+# ============================================================
+
+CONFIG_SCHEMA_VERSION = 1
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+def board_to_json(board):
+    # Int dict keys (feeder / sub-feeder indices) become strings in JSON
+    return json.dumps({"schema": CONFIG_SCHEMA_VERSION, "board": board}, sort_keys=True, separators=(",", ":"))
+
+def write_export_bundle(board, out, deck=None):
+    """
+    Writes PPTX, PNG/SVG/PDF preview and the JSON config into one ZIP.
+    deck: extra generate_pptx options (template, title_block).
+    The preview figure is laid out once for all image formats. Artifacts are
+    made one after another, each written straight into its ZIP entry, so at
+    most one is in memory at a time.
+    """
+    stem = f"SLD_{board['voltage']}"
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        def entry(name, ctype):
+            info = zipfile.ZipInfo(name, time.localtime()[:6]); info.compress_type = ctype
+            return zf.open(info, "w")
+        zf.writestr(f"{stem}.json", board_to_json(board))
+        with entry(f"{stem}.pptx", zipfile.ZIP_STORED) as fh: # Already deflated
+            generate_pptx(**board, **(deck or {}), out=fh)
+        fig = draw_preview_mpl(**board)
+        try:
+            for fmt in ("png", "svg", "pdf"):
+                with entry(f"{stem}_preview.{fmt}", zipfile.ZIP_STORED if fmt == "png" else zipfile.ZIP_DEFLATED) as fh:
+                    fig.savefig(fh, format=fmt, bbox_inches="tight")
+        finally:
+            plt.close(fig)
+    return out
+
+def export_bundle_file(board, deck=None):
+    return spooled_reader(lambda f: write_export_bundle(board, f, deck), ".zip")
+
+# ============================================================
+# 5. RENDER CACHE (content-hashed files, shared SQLite index)
+# ============================================================
+
+DECK_CACHE_DIR = os.environ.get("SLD_DECK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sld_deck_cache"))
+DECK_CACHE_MAX_BYTES = int(os.environ.get("SLD_DECK_CACHE_MAX_MB", "512")) * 1024 * 1024
+DECK_CACHE_MAX_AGE_S = int(os.environ.get("SLD_DECK_CACHE_MAX_AGE_H", "24")) * 3600
+DECK_CACHE_EVICT_INTERVAL_S = 60
+
+_deck_cache_lock = threading.Lock()
+_deck_cache_last_evict = [0.0]
+
+def deck_cache_path(etag, ext="pptx"):
+    return os.path.join(DECK_CACHE_DIR, f"{etag}.{ext}")
+
+def deck_cache_put(write, ext="pptx"):
+    """
+    Runs write(f) into a temp file inside the cache and stores it under its
+    sha256 (the etag). Identical files from any session share one file.
+    Returns (etag, path).
+    """
+    os.makedirs(DECK_CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=DECK_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w+b") as f:
+            write(f)
+            f.seek(0)
+            etag = hashlib.file_digest(f, "sha256").hexdigest()
+        path = deck_cache_path(etag, ext)
+        if os.path.exists(path):
+            os.utime(path) # Hit: refresh age, drop the duplicate
+        else:
+            os.replace(tmp, path) # Atomic, so readers never see a partial deck
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    deck_cache_evict()
+    return etag, path
+
+def deck_cache_open(etag, ext="pptx"):
+    """Opens a cached file for reading, or returns None if it has been evicted."""
+    path = deck_cache_path(etag, ext)
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    os.utime(path)
+    return fh
+
+def deck_cache_evict(force=False):
+    """Drops files older than DECK_CACHE_MAX_AGE_S, then least recently used first down to DECK_CACHE_MAX_BYTES."""
+    now = time.time()
+    with _deck_cache_lock:
+        if not force and now - _deck_cache_last_evict[0] < DECK_CACHE_EVICT_INTERVAL_S:
+            return
+        _deck_cache_last_evict[0] = now
+
+    entries = []
+    for entry in os.scandir(DECK_CACHE_DIR):
+        if not entry.name.endswith((".pptx", ".png")): continue
+        try:
+            info = entry.stat()
+        except FileNotFoundError:
+            continue # Evicted by another worker
+        entries.append((info.st_mtime, info.st_size, entry.path))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    evicted = []
+    for mtime, size, path in entries:
+        if now - mtime <= DECK_CACHE_MAX_AGE_S and total <= DECK_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted.append((os.path.basename(path).split(".")[0],))
+    if evicted:
+        render_index().executemany("DELETE FROM renders WHERE etag = ?", evicted)
+
+# --- Render index ---
+# Maps a render key (renderer version, artifact kind, board, deck options) to
+# the etag of its cached file, so a board that any server process rendered
+# before, in this run or an earlier one, is served without rendering it
+# again. The index is SQLite in WAL mode, so processes read while one writes;
+# file mtimes stay the LRU clock for eviction.
+
+RENDER_INDEX_PATH = os.path.join(DECK_CACHE_DIR, "index.sqlite3")
+# Any change to this file or the renderers misses every earlier entry
+with open(__file__, "rb") as _src:
+    RENDERER_VERSION = _digest(hashlib.sha256(_src.read()).hexdigest(), metadata.version("python-pptx"), metadata.version("matplotlib"))[:16]
+
+_render_index = threading.local()
+
+def render_index():
+    """This thread's connection to the render index (sqlite3 connections stay on one thread)."""
+    db = getattr(_render_index, "db", None)
+    if db is None:
+        os.makedirs(DECK_CACHE_DIR, exist_ok=True)
+        db = sqlite3.connect(RENDER_INDEX_PATH, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS renders (key TEXT PRIMARY KEY, etag TEXT NOT NULL)")
+        db.execute("CREATE INDEX IF NOT EXISTS renders_etag ON renders (etag)")
+        _render_index.db = db
+    return db
+
+def render_key(kind, board, deck=None):
+    """Index key of one artifact of a board; templates count by content (bytes) or path, mtime and size."""
+    opts = {}
+    for k, v in (deck or {}).items():
+        if isinstance(v, (bytes, bytearray, memoryview)): v = hashlib.sha256(v).hexdigest()
+        elif k == "template" and v: info = os.stat(v); v = (v, info.st_mtime_ns, info.st_size)
+        opts[k] = v
+    return _digest(RENDERER_VERSION, kind, board_to_json(board), opts)
+
+def cached_render(key, ext, write):
+    """Returns (etag, path) of the cached artifact for `key`; write(f) renders it only on a miss."""
+    db = render_index()
+    row = db.execute("SELECT etag FROM renders WHERE key = ?", (key,)).fetchone()
+    if row is not None:
+        path = deck_cache_path(row[0], ext)
+        try:
+            os.utime(path)
+            return row[0], path
+        except FileNotFoundError:
+            pass # Evicted: render it again
+    etag, path = deck_cache_put(write, ext)
+    db.execute("INSERT OR REPLACE INTO renders (key, etag) VALUES (?, ?)", (key, etag))
+    return etag, path
+
+def write_preview_png(board, f):
+    """Renders the preview as PNG into file object f, the way st.pyplot() does."""
+    fig = draw_preview_mpl(**board)
+    # Saved on an Agg canvas of our own: the one savefig() would switch in is
+    # left in a reference cycle with pyplot's figure manager
+    FigureCanvasAgg(fig)
+    try:
+        fig.savefig(f, format="png", bbox_inches="tight", dpi=200)
+    finally:
+        plt.close(fig)
+        # Every drawn Text keeps the renderer, whose buffer is hundreds of MB for a
+        # wide board; drop those and the canvas so it is freed now, without a GC pass
+        for text in fig.findobj(Text): text._renderer = None
+        FigureCanvasBase(fig)
+
+def cached_preview_png(board):
+    """The preview as PNG bytes, from the render cache when it has it."""
+    write = functools.partial(write_preview_png, board)
+    etag, _ = cached_render(render_key("png", board), "png", write)
+    fh = deck_cache_open(etag, "png")
+    if fh is None: # Evicted between the lookup and here
+        buf = io.BytesIO(); write(buf)
+        return buf.getvalue()
+    with fh:
+        return fh.read()
+
+def cached_deck_download_data(board, deck=None, reuse=None):
+    """
+    Stores the deck on disk and returns a deferred loader for st.download_button.
+    reuse: the session's dict of parts from its last build, see generate_pptx().
+    """
+    deck = deck or {}
+    etag, _ = cached_render(render_key("pptx", board, deck), "pptx",
+                            lambda f: generate_pptx(**board, **deck, reuse=reuse, out=f))
+    # Rebuild if the file was evicted between this rerun and the click
+    return lambda: deck_cache_open(etag) or generate_pptx(**board, **deck, return_as="file")
+
+# ============================================================
+# 6. PROJECT STORE (named projects, revision history)
+# ============================================================
+# Every save is a new revision: the board and title block as zlib-compressed
+# JSON. Loading turns a revision back into the sidebar's widget state, which
+# main() applies before the widgets are created, so a board comes back in
+# one rerun instead of being entered again.
+
+PROJECT_DB_PATH = os.environ.get("SLD_PROJECT_DB", os.path.join(os.path.expanduser("~"), ".sld_generator", "projects.sqlite3"))
+
+_project_db = threading.local()
+
+def project_db():
+    """This thread's connection to the project store."""
+    db = getattr(_project_db, "db", None)
+    if db is None:
+        os.makedirs(os.path.dirname(PROJECT_DB_PATH) or ".", exist_ok=True)
+        db = sqlite3.connect(PROJECT_DB_PATH, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, created REAL NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS revisions (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL REFERENCES projects (id), "
+                       "saved REAL NOT NULL, config BLOB NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS revisions_project ON revisions (project_id, saved)")
+            db.execute("CREATE TABLE IF NOT EXISTS drafts (id TEXT PRIMARY KEY, saved REAL NOT NULL, config BLOB NOT NULL)")
+        _project_db.db = db
+    return db
+
+def save_revision(name, board, title_block=None):
+    """Stores the board as a new revision of project `name`, creating the project on first save. Returns the revision id."""
+    now = time.time()
+    db = project_db()
+    with db:
+        db.execute("INSERT OR IGNORE INTO projects (name, created) VALUES (?, ?)", (name, now))
+        (project_id,) = db.execute("SELECT id FROM projects WHERE name = ?", (name,)).fetchone()
+        return db.execute("INSERT INTO revisions (project_id, saved, config) VALUES (?, ?, ?)",
+                          (project_id, now, _pack_config(board, title_block))).lastrowid
+
+def list_projects():
+    """[(name, revision count, last saved)], most recently saved first."""
+    return project_db().execute("SELECT p.name, COUNT(r.id), MAX(r.saved) FROM projects p JOIN revisions r ON r.project_id = p.id "
+                                "GROUP BY p.id ORDER BY MAX(r.saved) DESC").fetchall()
+
+def list_revisions(name):
+    """[(revision id, saved)] of a project, newest first."""
+    return project_db().execute("SELECT r.id, r.saved FROM revisions r JOIN projects p ON r.project_id = p.id "
+                                "WHERE p.name = ? ORDER BY r.saved DESC, r.id DESC", (name,)).fetchall()
+
+def load_revision(rev_id):
+    """Returns (board, title_block) of a stored revision."""
+    (config,) = project_db().execute("SELECT config FROM revisions WHERE id = ?", (rev_id,)).fetchone()
+    return _unpack_config(config)
+
+# --- Drafts ---
+# Each browser tab autosaves its config as a draft, whose id rides in the URL
+# (?draft=...), so a refresh brings the board back. Reruns only hand the config
+# to a write-behind thread; it waits DRAFT_INTERVAL_S so a burst of edits is
+# written once, with the latest config of every draft in one transaction.
+
+DRAFT_INTERVAL_S = 3.0
+DRAFT_MAX_AGE_S = 30 * 24 * 3600
+
+_drafts_pending = {} # draft id -> (board, title_block), latest wins
+_drafts_cond = threading.Condition()
+_drafts_writer = [None]
+_log = logging.getLogger(__name__)
+
+def _pack_config(board, title_block):
+    config = json.dumps({"schema": CONFIG_SCHEMA_VERSION, "board": board, "title_block": title_block or {}},
+                        sort_keys=True, separators=(",", ":"))
+    return zlib.compress(config.encode(), 9)
+
+def _unpack_config(config):
+    data = json.loads(zlib.decompress(config))
+    return board_from_json(data["board"]), data.get("title_block", {})
+
+def queue_draft(draft_id, board, title_block=None):
+    """Hands a draft to the autosave thread; never waits on disk."""
+    with _drafts_cond:
+        _drafts_pending[draft_id] = (board, title_block)
+        if _drafts_writer[0] is None:
+            _drafts_writer[0] = threading.Thread(target=_write_drafts, name="sld-draft-writer", daemon=True)
+            _drafts_writer[0].start()
+            atexit.register(flush_drafts) # The writer is a daemon thread; don't lose its last batch
+        _drafts_cond.notify()
+
+def flush_drafts():
+    """Writes every queued draft now; if the store fails, the batch is queued again and the error raised."""
+    with _drafts_cond:
+        batch = dict(_drafts_pending); _drafts_pending.clear()
+    if not batch: return
+    now = time.time(); rows = []
+    for draft_id, conf in batch.items():
+        try:
+            rows.append((draft_id, now, _pack_config(*conf)))
+        except Exception: # Retrying won't pack it either; the draft's next edit queues it again
+            _log.exception("Dropped draft %s: its config could not be packed", draft_id)
+    try:
+        db = project_db()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO drafts (id, saved, config) VALUES (?, ?, ?)", rows)
+            db.execute("DELETE FROM drafts WHERE saved < ?", (now - DRAFT_MAX_AGE_S,))
+    except Exception:
+        with _drafts_cond: # Unless newer edits replaced them meanwhile
+            for draft_id, _, _ in rows: _drafts_pending.setdefault(draft_id, batch[draft_id])
+        raise
+
+def _write_drafts():
+    while True:
+        with _drafts_cond:
+            while not _drafts_pending: _drafts_cond.wait()
+        time.sleep(DRAFT_INTERVAL_S) # Edits made meanwhile replace the queued draft
+        try:
+            flush_drafts()
+        except Exception: # The thread must outlive any failure, or autosave stops for every session
+            _log.exception("Autosaving drafts failed; retrying in %.0f s", DRAFT_INTERVAL_S)
+
+def load_draft(draft_id):
+    """Returns (board, title_block) of a draft, or None if there is none."""
+    row = project_db().execute("SELECT config FROM drafts WHERE id = ?", (draft_id,)).fetchone()
+    return _unpack_config(row[0]) if row is not None else None
+
+# --- Share links ---
+# The page URL carries the config as ?cfg=<token>, kept current as the board
+# changes, so a copied link opens the same board. A token is the version,
+# then base64url of the raw-deflated JSON; a 20-feeder board with nested
+# extensions comes to about 1 KB.
+
+CONFIG_TOKEN_VERSION = "v1"
+
+def config_token(board, title_block=None):
+    config = json.dumps({"board": board, "title_block": title_block or {}}, sort_keys=True, separators=(",", ":"))
+    packed = zlib.compress(config.encode(), 9, wbits=-15)
+    return f"{CONFIG_TOKEN_VERSION}.{base64.urlsafe_b64encode(packed).rstrip(b'=').decode()}"
+
+def config_from_token(token):
+    """(board, title_block) of a config_token(), or None if it is not one this version reads."""
+    version, _, body = token.partition(".")
+    if version != CONFIG_TOKEN_VERSION: return None
+    try:
+        data = json.loads(zlib.decompress(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)), wbits=-15))
+        return board_from_json(data["board"]), data.get("title_block", {})
+    except (ValueError, KeyError, TypeError, AttributeError, zlib.error):
+        return None
+
+def board_from_json(board):
+    """Restores the int dict keys board_to_json() turned into strings."""
+    ints = lambda d: {int(k): v for k, v in d.items()}
+    configs = {}
+    for i, conf in ints(board["swg_configs"]).items():
+        if "sub_feeders" in conf:
+            subs = ints(conf["sub_feeders"])
+            for j, sf in subs.items():
+                if "extension_feeders" in sf: subs[j] = {**sf, "extension_feeders": ints(sf["extension_feeders"])}
+            conf = {**conf, "sub_feeders": subs}
+        configs[i] = conf
+    return {**board, "swg_configs": configs, "msb_bc_status": ints(board["msb_bc_status"]),
+            "lv_bc_status": ints(board["lv_bc_status"])}
+
+def check_config(board, title_block=None):
+    """Raises ValueError unless `board` is one the sidebar could have built: counts, indices and choices within its widgets' limits."""
+    def need(ok, what):
+        if not ok: raise ValueError(f"bad board: {what}")
+    def count(n, lo, hi, what): need(isinstance(n, int) and lo <= n <= hi, what)
+    def keyed(d, n, what): need(isinstance(d, dict) and sorted(d) == list(range(n)), what)
+    def gens(gs, what):
+        need(isinstance(gs, list) and len(gs) <= 2, what)
+        for g in gs:
+            need(g.get("type") in ("Solar", "BESS"), what)
+            count(g.get("kWac"), 0, 99999, what); count(g.get("cap_val"), 0, 99999, what)
+    def pairs(ps, n, what): need(isinstance(ps, list) and all(isinstance(p, int) and 0 <= p < n - 1 for p in ps), what)
+
+    need(board.get("voltage") in ("400V", "11kV", "33kV", "132kV"), "voltage")
+    count(board.get("num_in"), 1, 3, "incomers"); count(board.get("num_swg"), 1, 20, "feeder count")
+    n = board["num_swg"]; dist = board.get("section_distribution")
+    need(isinstance(dist, list) and len(dist) == board["num_in"] and all(isinstance(d, int) and d >= 0 for d in dist)
+         and sum(dist) == n, "bus sections")
+    need(isinstance(board.get("msb_bc_status"), dict) and all(0 <= i < board["num_in"] - 1 and v in ("NO", "NC")
+                                                              for i, v in board["msb_bc_status"].items()), "bus couplers")
+    need(isinstance(board.get("swg_names"), list) and len(board["swg_names"]) == n
+         and all(isinstance(name, str) for name in board["swg_names"]), "feeder names")
+    keyed(board.get("swg_configs"), n, "feeders")
+    for i, conf in board["swg_configs"].items():
+        need(conf.get("type") in ("Standard", "MV Gen", "Sub-Board"), f"feeder {i+1} type")
+        gens(conf.get("gens"), f"feeder {i+1} generation")
+        if conf["type"] != "Sub-Board": continue
+        need(conf.get("sub_voltage") in ("11kV", "6.6kV", board["voltage"]), f"feeder {i+1} sub voltage")
+        subs = conf.get("sub_feeders"); need(isinstance(subs, dict), f"feeder {i+1} sub-feeders")
+        count(len(subs), 1, 10, f"feeder {i+1} sub-feeder count"); keyed(subs, len(subs), f"feeder {i+1} sub-feeders")
+        pairs(conf.get("sub_couplers", []), len(subs), f"feeder {i+1} couplers")
+        for j, sf in subs.items():
+            need(sf.get("type") in ("Standard", "MV Gen", "Extension") and isinstance(sf.get("name"), str), f"sub-feeder {i+1}.{j+1}")
+            gens(sf.get("gens"), f"sub-feeder {i+1}.{j+1} generation")
+            if sf["type"] != "Extension": continue
+            exts = sf.get("extension_feeders"); need(isinstance(exts, dict), f"sub-feeder {i+1}.{j+1} extension")
+            count(len(exts), 1, 10, f"sub-feeder {i+1}.{j+1} extension count"); keyed(exts, len(exts), f"sub-feeder {i+1}.{j+1} extension")
+            pairs(sf.get("extension_couplers", []), len(exts), f"sub-feeder {i+1}.{j+1} couplers")
+            for k, ef in exts.items():
+                need(ef.get("type") in ("Standard", "MV Gen") and isinstance(ef.get("name"), str), f"extension feeder {i+1}.{j+1}.{k+1}")
+                gens(ef.get("gens"), f"extension feeder {i+1}.{j+1}.{k+1} generation")
+    for key in ("lv_couplers", "inter_sub_bus_couplers", "inter_lv_couplers"): pairs(board.get(key), n, key)
+    need(isinstance(board.get("lv_bc_status"), dict) and all(v in ("NO", "NC") for v in board["lv_bc_status"].values()), "LV couplers")
+    need(isinstance(title_block or {}, dict) and all(k in TITLE_BLOCK_FIELDS and isinstance(v, str)
+                                                     for k, v in (title_block or {}).items()), "title block")
+
+def _gen_widget_state(prefix, gens, has_emsb=None):
+    """Widget values of get_lv_gen_inputs() (has_emsb given) or get_mv_gen_inputs() (None) under `prefix`."""
+    state = {}
+    if has_emsb is None:
+        for g in gens[:1]:
+            if g["type"] == "Solar":
+                state.update({f"{prefix}_type": "Solar PV", f"{prefix}_mv_skwa": g["kWac"], f"{prefix}_mv_skwp": g["cap_val"]})
+            else:
+                state.update({f"{prefix}_type": "BESS", f"{prefix}_mv_bkwa": g["kWac"], f"{prefix}_mv_bkwh": g["cap_val"]})
+        return state
+    state.update({f"{prefix}_sol": False, f"{prefix}_bess": False, f"{prefix}_emsb": bool(has_emsb)})
+    for g in gens:
+        if g["type"] == "Solar":
+            state.update({f"{prefix}_sol": True, f"{prefix}_skwa": g["kWac"], f"{prefix}_skwp": g["cap_val"]})
+        else:
+            state.update({f"{prefix}_bess": True, f"{prefix}_bkwa": g["kWac"], f"{prefix}_bkwh": g["cap_val"]})
+    return state
+
+def board_to_widget_state(board, title_block=None):
+    """The sidebar widget values (by key) that make main() build `board` again."""
+    voltage = board["voltage"]; configs = board["swg_configs"]
+    state = {"sys_v": voltage, "sys_in": board["num_in"], "sys_nswg": board["num_swg"]}
+    for i in range(board["num_in"] - 1):
+        state[f"sec_{i}"] = board["section_distribution"][i]
+        state[f"mbc_{i}"] = board["msb_bc_status"].get(i, "NO")
+
+    for i in range(board["num_swg"]):
+        conf = configs[i]
+        state[f"n_{i}"] = board["swg_names"][i]
+        # Extensions are stored as sub-boards at the system voltage
+        ctype = "Extension" if conf["type"] == "Sub-Board" and conf.get("sub_voltage") == voltage else conf["type"]
+        if voltage != "400V": state[f"t_{i}"] = ctype
+        if ctype == "Standard":
+            state.update(_gen_widget_state(f"g_{i}", conf["gens"], conf["emsb"]["has"]))
+        elif ctype == "MV Gen":
+            state.update(_gen_widget_state(f"g_{i}", conf["gens"]))
+        elif ctype == "Sub-Board":
+            subs = conf["sub_feeders"]
+            state.update({f"sv_{i}": conf["sub_voltage"], f"nsf_{i}": len(subs),
+                          f"ssc_{i}": [f"SF-{p+1} & SF-{p+2}" for p in conf.get("sub_couplers", [])]})
+            for j, sf in subs.items():
+                state.update({f"sfn_{i}_{j}": sf["name"], f"sft_{i}_{j}": sf["type"]})
+                if sf["type"] == "Standard": state.update(_gen_widget_state(f"sfg_{i}_{j}", sf["gens"], sf["has_emsb"]))
+                elif sf["type"] == "MV Gen": state.update(_gen_widget_state(f"sfg_{i}_{j}", sf["gens"]))
+                else:
+                    exts = sf["extension_feeders"]
+                    state.update({f"next_{i}_{j}": len(exts),
+                                  f"ie_c_{i}_{j}": [f"EF-{p+1} & EF-{p+2}" for p in sf.get("extension_couplers", [])]})
+                    for k, ef in exts.items():
+                        state.update({f"efn_{i}_{j}_{k}": ef["name"], f"eft_{i}_{j}_{k}": ef["type"]})
+                        state.update(_gen_widget_state(f"efg_{i}_{j}_{k}", ef["gens"], ef["has_emsb"] if ef["type"] == "Standard" else None))
+        else:
+            subs = conf["sub_feeders"]
+            state.update({f"nef_{i}": len(subs), f"ext_bc_{i}": [f"EF-{p+1} & EF-{p+2}" for p in conf.get("sub_couplers", [])]})
+            for j, sf in subs.items():
+                state.update({f"efn_{i}_{j}": sf["name"], f"eft_{i}_{j}": sf["type"]})
+                state.update(_gen_widget_state(f"efg_{i}_{j}", sf["gens"], sf["has_emsb"] if sf["type"] == "Standard" else None))
+
+    state["lv_c_sel"] = [f"#{p+1} & #{p+2}" for p in board["lv_couplers"]]
+    for p in board["lv_couplers"]: state[f"lvbc_{p}"] = board["lv_bc_status"].get(p, "NO")
+    if voltage != "400V":
+        state["inter_sb_c"] = [f"F-{p+1} & F-{p+2} ({configs[p].get('sub_voltage')})" for p in board["inter_sub_bus_couplers"]]
+        state["inter_lv_c"] = [f"F-{p+1} & F-{p+2} (0.4kV)" for p in board["inter_lv_couplers"]]
+    for k, v in (title_block or {}).items(): state[f"tb_{k}"] = v
+    return state
+
+# ============================================================
+# 7. SESSION MEMORY
+# ============================================================
+# What each session holds on the server on its own: its deck reuse memo, its
+# preview image and its config. st.image() keeps a copy of the PNG in
+# Streamlit's media store for every session showing it; the cached files
+# behind it and the decks are shared and not charged to anyone. Sizes are of
+# the serialized data, a steady proxy for the objects behind it, recorded as
+# the memo is built. A session over SLD_SESSION_MEM_CAP_MB drops its reuse
+# memo. Sessions leave the account when they disconnect.
+
+SESSION_MEM_CAP_BYTES = int(float(os.environ.get("SLD_SESSION_MEM_CAP_MB", "64")) * 2**20)
+SESSION_IDLE_S = 3600 # Backstop without a runtime to ask: sessions not seen for this long no longer count
+
+_sessions = {} # session id -> (last seen, bytes)
+_sessions_lock = threading.Lock()
+
+def reuse_bytes(reuse):
+    """Size of a deck reuse memo: its saved slide parts plus the XML of its saved sheet bodies."""
+    total = sum(len(blob) for _, blob in reuse.get("slides", {}).values())
+    return total + sum(body[-1] for body in reuse.get("bodies", {}).values())
+
+def account_session(session_id, usage):
+    """Records a session's memory by part; returns (connected sessions, their total bytes)."""
+    now = time.time()
+    rt = runtime.get_instance() if runtime.exists() else None
+    with _sessions_lock:
+        _sessions[session_id] = (now, sum(usage.values()))
+        for sid in [sid for sid, (seen, _) in _sessions.items()
+                    if now - seen > SESSION_IDLE_S or sid != session_id and rt is not None and not rt.is_active_session(sid)]:
+            del _sessions[sid]
+        return len(_sessions), sum(n for _, n in _sessions.values())
+
+def process_rss():
+    """Resident set size of this server process in bytes, or None without /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+# ============================================================
+# 8. RERUN TRACES
+# ============================================================
+# With SLD_TRACE_DIR set, each session appends one JSON line per rerun to a
+# file of its own: the sidebar values that changed (by plain widget key),
+# resets and loads, a digest of the resulting board and the rerun's phase
+# times. replay.py plays a trace back against main().
+
+TRACE_VERSION = 1
+TRACE_DIR = os.environ.get("SLD_TRACE_DIR", "") # Empty: no traces
+
+def trace_event(*event):
+    """Notes a reset or load for this rerun's trace line."""
+    if TRACE_DIR: st.session_state.setdefault("trace_events", []).append(list(event))
+
+def trace_rerun(state, board_sig, ms, loaded=False):
+    """Appends this rerun to the session's trace: what changed in the sidebar state since the last one."""
+    ss = st.session_state
+    if "trace_path" not in ss:
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{get_script_run_ctx().session_id[:8]}.jsonl"
+        ss.trace_path, ss.trace_start, ss.trace_step = os.path.join(TRACE_DIR, name), time.time(), 0
+        header = {"trace": TRACE_VERSION, "started": ss.trace_start}
+    else:
+        header = None
+    prev = ss.get("trace_state", {})
+    line = {"step": ss.trace_step, "t": round(time.time() - ss.trace_start, 3), "events": ss.pop("trace_events", []),
+            "board": board_sig, "ms": ms}
+    # A load replaces the whole state, so it is replayed as a load, not as edits
+    if loaded: line["load"] = state
+    else: line["set"] = {k: v for k, v in state.items() if prev.get(k) != v}
+    ss.trace_state, ss.trace_step = state, ss.trace_step + 1
+    try:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        with open(ss.trace_path, "a") as f:
+            if header: f.write(json.dumps(header) + "\n")
+            f.write(json.dumps(line, separators=(",", ":")) + "\n")
+    except OSError:
+        pass # Tracing is diagnostics; never fail the rerun over it
+
+# ============================================================
+# 9. CONFIG CORPUS
+# ============================================================
+# With SLD_CORPUS_PATH set, boards that are downloaded or saved are appended
+# to a JSON lines corpus for bench_corpus.py, anonymized: names go back to
+# their defaults and generator ratings to the widget defaults, while feeder
+# types, nesting, generator types and counts and every coupler stay. No title
+# block, no time finer than the day. Each distinct shape is kept once.
+
+CORPUS_VERSION = 1 # Bump when what is kept or stripped changes
+CORPUS_PATH = os.environ.get("SLD_CORPUS_PATH", "") # Empty: no capture
+
+_corpus_ids = None # Shape ids already in the corpus, read on first capture
+_corpus_lock = threading.Lock()
+
+def anonymize_board(board):
+    """A copy of `board` with names and generator ratings replaced by the sidebar defaults."""
+    def gens(gs, mv):
+        return [{"type": g["type"], "kWac": 1000 if mv else 100,
+                 "cap_val": (1200 if mv else 120) if g["type"] == "Solar" else (2000 if mv else 200)} for g in gs]
+    board = copy.deepcopy(board)
+    board["swg_names"] = [f"F-{i+1}" for i in range(board["num_swg"])]
+    for i, conf in board["swg_configs"].items():
+        conf["msb_name"] = board["swg_names"][i]
+        conf["gens"] = gens(conf["gens"], conf["type"] == "MV Gen")
+        # Extensions are stored as sub-boards at the system voltage, with EF- names
+        prefix = "EF" if conf.get("sub_voltage") == board["voltage"] else "SF"
+        for j, sf in conf.get("sub_feeders", {}).items():
+            sf["name"] = f"{prefix}-{j+1}"; sf["gens"] = gens(sf["gens"], sf["type"] == "MV Gen")
+            for k, ef in sf.get("extension_feeders", {}).items():
+                ef["name"] = f"EF-{k+1}"; ef["gens"] = gens(ef["gens"], ef["type"] == "MV Gen")
+    return board
+
+def capture_config(board):
+    """Adds the anonymized board to the corpus unless its shape is there already."""
+    global _corpus_ids
+    if not CORPUS_PATH: return
+    config = json.loads(board_to_json(anonymize_board(board)))
+    shape = _digest(config)[:16]
+    with _corpus_lock:
+        try:
+            if _corpus_ids is None:
+                _corpus_ids = {entry["id"] for entry in read_corpus(CORPUS_PATH)} if os.path.exists(CORPUS_PATH) else set()
+            if shape in _corpus_ids: return
+            os.makedirs(os.path.dirname(os.path.abspath(CORPUS_PATH)), exist_ok=True)
+            with open(CORPUS_PATH, "a") as f:
+                f.write(json.dumps({"corpus": CORPUS_VERSION, "id": shape, "day": time.strftime("%Y-%m-%d"),
+                                    "config": config}, separators=(",", ":")) + "\n")
+            _corpus_ids.add(shape)
+        except OSError:
+            pass # Capture is best effort; never fail the click over it
+
+def read_corpus(path):
+    """The entries of a corpus file written by this CORPUS_VERSION; boards restored with board_from_json()."""
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return [{**e, "board": board_from_json(e["config"]["board"])} for e in entries
+            if e.get("corpus") == CORPUS_VERSION and e["config"].get("schema") == CONFIG_SCHEMA_VERSION]
+
 def main():
     st.set_page_config(layout="wide", page_title="SLD Generator")
     
@@ -1485,19 +2986,46 @@ def main():
                 st.error("Incorrect Passcode")
         return 
 
+    t0 = time.perf_counter(); ms = {}
     st.title("⚡ SLD Generator")
 
+    # On a new session the board comes from this tab's autosaved draft, else
+    # from the URL's config token. After a tab's first rerun its URL carries
+    # both, so only a token whose draft isn't in the store is a shared link;
+    # that starts a draft of its own. Either is checked before it becomes state.
+    draft_id = st.query_params.get("draft")
+    if "draft_restored" not in st.session_state:
+        st.session_state.draft_restored = True
+        token = st.query_params.get("cfg")
+        draft = load_draft(draft_id) if draft_id else None
+        if draft is None and token:
+            draft = config_from_token(token); draft_id = None
+        state = None
+        if draft is not None:
+            try:
+                check_config(*draft); state = board_to_widget_state(*draft)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                pass
+        if state is None and (draft is not None or token):
+            st.warning("This link's board could not be read; starting from defaults.")
+        if state is not None and "project_load" not in st.session_state:
+            st.session_state.project_load = state
+    if not draft_id:
+        draft_id = st.query_params["draft"] = uuid.uuid4().hex
+
+    # A loaded project becomes the widget state of a fresh generation before any widget is created
+    loaded = st.session_state.pop("project_load", None)
+    if loaded is not None:
+        reset_widgets()
+        st.session_state.update({wkey(key): v for key, v in loaded.items()})
+
     with st.sidebar:
         st.subheader("System Configuration")
-        if st.button("Reset All", type="secondary"):
-            for key in list(st.session_state.keys()):
-                if key != "authenticated":
-                    del st.session_state[key]
-            st.rerun()
-
-        voltage = st.selectbox("Voltage", ["400V", "11kV", "33kV", "132kV"], key="sys_v")
-        num_in = st.selectbox("Incomers", [1, 2, 3], index=1, key="sys_in")
-        n_swg = st.number_input("Total Number of Feeders", 1, 20, 4)
+        st.button("Reset All", type="secondary", on_click=reset_widgets)
+
+        voltage = st.selectbox("Voltage", ["400V", "11kV", "33kV", "132kV"], key=wkey("sys_v"))
+        num_in = st.selectbox("Incomers", [1, 2, 3], index=1, key=wkey("sys_in"))
+        n_swg = st.number_input("Total Number of Feeders", 1, 20, 4, key=wkey("sys_nswg"))
         
         section_distribution = []
         if num_in == 1:
@@ -1506,7 +3034,7 @@ def main():
             st.markdown("### Bus Section Configuration")
             remaining = n_swg
             for i in range(num_in - 1):
-                val = st.number_input(f"Feeders on Bus Section {i+1}", 0, remaining, max(1, remaining//2), key=f"sec_{i}")
+                val = st.number_input(f"Feeders on Bus Section {i+1}", 0, remaining, max(1, remaining//2), key=wkey(f"sec_{i}"))
                 section_distribution.append(val); remaining -= val
             section_distribution.append(remaining)
             st.info(f"Feeders on Bus Section {num_in}: {remaining}")
@@ -1517,14 +3045,15 @@ def main():
         if num_in > 1:
             st.markdown("### Bus Coupler Status")
             for i in range(num_in - 1):
-                msb_bc_status[i] = st.selectbox(f"Bus Coupler {i+1}-{i+2}", ["NO", "NC"], key=f"mbc_{i}")
+                msb_bc_status[i] = st.selectbox(f"Bus Coupler {i+1}-{i+2}", ["NO", "NC"], key=wkey(f"mbc_{i}"))
 
         swg_configs = {}; swg_names = []
         
         st.markdown("### Feeder Details")
         for i in range(n_swg):
             with st.expander(f"Feeder {i+1}", expanded=False):
-                name = st.text_input("Name", f"F-{i+1}", key=f"n_{i}")
+                st.button("Reset feeder", key=wkey(f"reset_{i}", i), on_click=reset_widgets, args=(i,))
+                name = st.text_input("Name", f"F-{i+1}", key=wkey(f"n_{i}", i))
                 swg_names.append(name)
                 
                 valid_types = ["Standard", "MV Gen"]
@@ -1532,14 +3061,14 @@ def main():
                 if voltage != "400V": valid_types.append("Extension")
                 
                 ctype = "Standard"
-                if voltage != "400V": ctype = st.selectbox("Type", valid_types, key=f"t_{i}")
+                if voltage != "400V": ctype = st.selectbox("Type", valid_types, key=wkey(f"t_{i}", i))
                 
                 gens = []; has_emsb = False
                 
                 if ctype == "MV Gen":
-                    gens, has_emsb = get_mv_gen_inputs(f"g_{i}"), False
+                    gens, has_emsb = get_mv_gen_inputs(wkey(f"g_{i}", i)), False
                 elif ctype == "Standard":
-                    gens, has_emsb = get_lv_gen_inputs(f"g_{i}", include_emsb=True)
+                    gens, has_emsb = get_lv_gen_inputs(wkey(f"g_{i}", i), include_emsb=True)
                 
                 conf = {"type": ctype, "msb_name": name, "gens": gens, "emsb": {"has": has_emsb, "name": "EMSB"}}
                 
@@ -1547,52 +3076,52 @@ def main():
                     conf["tx_scheme"] = f"{voltage}/0.4 kV"
                     
                 elif ctype == "Sub-Board":
-                    conf["sub_voltage"] = st.selectbox("Sub Voltage", ["11kV", "6.6kV"], key=f"sv_{i}")
-                    n_sub_feeders = st.number_input(f"No. of {conf['sub_voltage']} Feeders", 1, 10, 2, key=f"nsf_{i}")
+                    conf["sub_voltage"] = st.selectbox("Sub Voltage", ["11kV", "6.6kV"], key=wkey(f"sv_{i}", i))
+                    n_sub_feeders = st.number_input(f"No. of {conf['sub_voltage']} Feeders", 1, 10, 2, key=wkey(f"nsf_{i}", i))
                     
                     if n_sub_feeders > 1:
                         valid_s_pairs = list(range(n_sub_feeders - 1))
                         s_labels = [f"SF-{p+1} & SF-{p+2}" for p in valid_s_pairs]
-                        sel_s_couplers = st.multiselect("Add LV Coupler between:", s_labels, key=f"ssc_{i}")
+                        sel_s_couplers = st.multiselect("Add LV Coupler between:", s_labels, key=wkey(f"ssc_{i}", i))
                         conf["sub_couplers"] = [valid_s_pairs[s_labels.index(l)] for l in sel_s_couplers]
                     
                     conf["sub_feeders"] = {}
                     for j in range(n_sub_feeders):
                         st.caption(f"Sub-Feeder {j+1}")
-                        sf_name = st.text_input(f"Name", f"SF-{j+1}", key=f"sfn_{i}_{j}")
+                        sf_name = st.text_input(f"Name", f"SF-{j+1}", key=wkey(f"sfn_{i}_{j}", i))
                         
                         sf_type_options = ["Standard", "MV Gen", "Extension"]
-                        sf_type = st.selectbox("Sub-Feeder Type", sf_type_options, key=f"sft_{i}_{j}")
+                        sf_type = st.selectbox("Sub-Feeder Type", sf_type_options, key=wkey(f"sft_{i}_{j}", i))
                         
                         sf_gens = []
                         sf_emsb = False
                         
                         if sf_type == "Standard":
-                            sf_gens, sf_emsb = get_lv_gen_inputs(f"sfg_{i}_{j}", include_emsb=True)
+                            sf_gens, sf_emsb = get_lv_gen_inputs(wkey(f"sfg_{i}_{j}", i), include_emsb=True)
                         elif sf_type == "MV Gen":
-                            sf_gens, sf_emsb = get_mv_gen_inputs(f"sfg_{i}_{j}"), False
+                            sf_gens, sf_emsb = get_mv_gen_inputs(wkey(f"sfg_{i}_{j}", i)), False
                         
                         ext_feeders_data = {}
                         ext_couplers = [] # Initialize here
                         if sf_type == "Extension":
-                            n_ext = st.number_input(f"No. of Feeders on Ext {j+1}", 1, 10, 2, key=f"next_{i}_{j}")
+                            n_ext = st.number_input(f"No. of Feeders on Ext {j+1}", 1, 10, 2, key=wkey(f"next_{i}_{j}", i))
                             
                             if n_ext > 1:
                                 valid_ie_pairs = list(range(n_ext - 1))
                                 ie_labels = [f"EF-{p+1} & EF-{p+2}" for p in valid_ie_pairs]
-                                sel_ie_couplers = st.multiselect("Add Coupler Inside Extension:", ie_labels, key=f"ie_c_{i}_{j}")
+                                sel_ie_couplers = st.multiselect("Add Coupler Inside Extension:", ie_labels, key=wkey(f"ie_c_{i}_{j}", i))
                                 ext_couplers = [valid_ie_pairs[ie_labels.index(l)] for l in sel_ie_couplers]
 
                             for k in range(n_ext):
                                 st.markdown(f"**Ext Feeder {k+1}**")
-                                ef_name = st.text_input(f"Name", f"EF-{k+1}", key=f"efn_{i}_{j}_{k}")
-                                ef_type = st.selectbox("Type", ["Standard", "MV Gen"], key=f"eft_{i}_{j}_{k}")
+                                ef_name = st.text_input(f"Name", f"EF-{k+1}", key=wkey(f"efn_{i}_{j}_{k}", i))
+                                ef_type = st.selectbox("Type", ["Standard", "MV Gen"], key=wkey(f"eft_{i}_{j}_{k}", i))
                                 ef_gens = []
                                 ef_emsb = False
                                 if ef_type == "Standard":
-                                    ef_gens, ef_emsb = get_lv_gen_inputs(f"efg_{i}_{j}_{k}", True)
+                                    ef_gens, ef_emsb = get_lv_gen_inputs(wkey(f"efg_{i}_{j}_{k}", i), True)
                                 else:
-                                    ef_gens, ef_emsb = get_mv_gen_inputs(f"efg_{i}_{j}_{k}"), False
+                                    ef_gens, ef_emsb = get_mv_gen_inputs(wkey(f"efg_{i}_{j}_{k}", i)), False
                                 ext_feeders_data[k] = {"type": ef_type, "name": ef_name, "gens": ef_gens, "has_emsb": ef_emsb}
 
                         conf["sub_feeders"][j] = {"type": sf_type, "name": sf_name, "gens": sf_gens, "has_emsb": sf_emsb, "extension_feeders": ext_feeders_data, "extension_couplers": ext_couplers}
@@ -1602,28 +3131,28 @@ def main():
                     conf["sub_voltage"] = voltage
                     
                     st.info(f"Extension at {voltage}")
-                    n_sub_feeders = st.number_input(f"No. of Feeders on Extension", 1, 10, 2, key=f"nef_{i}")
+                    n_sub_feeders = st.number_input(f"No. of Feeders on Extension", 1, 10, 2, key=wkey(f"nef_{i}", i))
                     
                     if n_sub_feeders > 1:
                         valid_e_pairs = list(range(n_sub_feeders - 1))
                         e_labels = [f"EF-{p+1} & EF-{p+2}" for p in valid_e_pairs]
-                        sel_e_couplers = st.multiselect("Add Bus Coupler between:", e_labels, key=f"ext_bc_{i}")
+                        sel_e_couplers = st.multiselect("Add Bus Coupler between:", e_labels, key=wkey(f"ext_bc_{i}", i))
                         conf["sub_couplers"] = [valid_e_pairs[e_labels.index(l)] for l in sel_e_couplers]
                     
                     conf["sub_feeders"] = {}
                     for j in range(n_sub_feeders):
                         st.caption(f"Extension Feeder {j+1}")
-                        sf_name = st.text_input(f"Name", f"EF-{j+1}", key=f"efn_{i}_{j}")
+                        sf_name = st.text_input(f"Name", f"EF-{j+1}", key=wkey(f"efn_{i}_{j}", i))
                         
-                        sf_type = st.selectbox("Type", ["Standard", "MV Gen"], key=f"eft_{i}_{j}")
+                        sf_type = st.selectbox("Type", ["Standard", "MV Gen"], key=wkey(f"eft_{i}_{j}", i))
                         
                         sf_gens = []
                         sf_emsb = False
                         
                         if sf_type == "Standard":
-                             sf_gens, sf_emsb = get_lv_gen_inputs(f"efg_{i}_{j}", include_emsb=True)
+                             sf_gens, sf_emsb = get_lv_gen_inputs(wkey(f"efg_{i}_{j}", i), include_emsb=True)
                         else:
-                             sf_gens, sf_emsb = get_mv_gen_inputs(f"efg_{i}_{j}"), False
+                             sf_gens, sf_emsb = get_mv_gen_inputs(wkey(f"efg_{i}_{j}", i)), False
                              
                         conf["sub_feeders"][j] = {"type": sf_type, "name": sf_name, "gens": sf_gens, "has_emsb": sf_emsb}
 
@@ -1637,10 +3166,10 @@ def main():
                     valid_pairs.append(i)
             if valid_pairs:
                 pair_lbls = [f"#{p+1} & #{p+2}" for p in valid_pairs]
-                sel_lv = st.multiselect("Couples", pair_lbls, key="lv_c_sel")
+                sel_lv = st.multiselect("Couples", pair_lbls, key=wkey("lv_c_sel"))
                 for s in sel_lv:
                     idx = pair_lbls.index(s); real_idx = valid_pairs[idx]
-                    lv_couplers.append(real_idx); lv_bc_status[real_idx] = st.selectbox(f"Status {s}", ["NO", "NC"], key=f"lvbc_{real_idx}")
+                    lv_couplers.append(real_idx); lv_bc_status[real_idx] = st.selectbox(f"Status {s}", ["NO", "NC"], key=wkey(f"lvbc_{real_idx}"))
             else:
                 st.write("No adjacent standard feeders available for coupling.")
 
@@ -1658,7 +3187,7 @@ def main():
                 
                 if sb_pairs:
                     sb_labels = [f"F-{p+1} & F-{p+2} ({swg_configs[p].get('sub_voltage')})" for p in sb_pairs]
-                    sel_sb = st.multiselect("Select Intermediate Bus Couplers", sb_labels, key="inter_sb_c")
+                    sel_sb = st.multiselect("Select Intermediate Bus Couplers", sb_labels, key=wkey("inter_sb_c"))
                     for s in sel_sb:
                         idx = sb_labels.index(s)
                         inter_sub_bus_couplers.append(sb_pairs[idx])
@@ -1688,28 +3217,112 @@ def main():
                          
                 if ilv_pairs:
                     ilv_labels = [f"F-{p+1} & F-{p+2} (0.4kV)" for p in ilv_pairs]
-                    sel_ilv = st.multiselect("Select Inter-Feeder LV Couplers", ilv_labels, key="inter_lv_c")
+                    sel_ilv = st.multiselect("Select Inter-Feeder LV Couplers", ilv_labels, key=wkey("inter_lv_c"))
                     for s in sel_ilv:
                         idx = ilv_labels.index(s)
                         inter_lv_couplers.append(ilv_pairs[idx])
 
+        with st.expander("Drawing Template & Title Block"):
+            tpl_file = st.file_uploader("Template deck (.pptx)", type=["pptx"], key=wkey("tpl_file"),
+                                        help='First slide is the sheet; a shape named "Drawing Frame" sets the drawing area. '
+                                             "Text may use {project}, {drawing_no}, {revision}, {date}, {sheet}, {sheets}.")
+            template = tpl_file.getvalue() if tpl_file is not None else (SLD_TEMPLATE_PATH or None)
+            if tpl_file is None and SLD_TEMPLATE_PATH: st.caption(f"Using {os.path.basename(SLD_TEMPLATE_PATH)}")
+            title_block = {
+                "project": st.text_input("Project", "", key=wkey("tb_project")),
+                "drawing_no": st.text_input("Drawing No.", "", key=wkey("tb_drawing_no")),
+                "revision": st.text_input("Revision", "A", key=wkey("tb_revision")),
+                "date": st.text_input("Date", time.strftime("%Y-%m-%d"), key=wkey("tb_date")),
+            }
+
+    prune_widget_generations(n_swg)
+
+    board = dict(voltage=voltage, num_in=num_in, num_swg=n_swg, section_distribution=section_distribution,
+                 inc_bc_status=inc_bc_status, msb_bc_status=msb_bc_status, lv_couplers=lv_couplers,
+                 lv_bc_status=lv_bc_status, swg_names=swg_names, swg_configs=swg_configs,
+                 inter_sub_bus_couplers=inter_sub_bus_couplers, inter_lv_couplers=inter_lv_couplers)
+
+    with st.sidebar:
+        with st.expander("Projects"):
+            proj_name = st.text_input("Project name", key="proj_name")
+            if st.button("Save revision", disabled=not proj_name.strip()):
+                save_revision(proj_name.strip(), board, title_block); capture_config(board)
+                st.success(f"Saved {proj_name.strip()}")
+            projects = [name for name, _, _ in list_projects()]
+            if projects:
+                proj = st.selectbox("Saved projects", projects, key="proj_sel")
+                revisions = list_revisions(proj)
+                rev_id = st.selectbox("Revision", [r for r, _ in revisions], key="proj_rev",
+                                      format_func=lambda r: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(dict(revisions)[r])))
+                def load_project():
+                    st.session_state.project_load = board_to_widget_state(*load_revision(rev_id))
+                    st.session_state.proj_name = proj
+                st.button("Load", on_click=load_project)
+
+    ms["sidebar"] = time.perf_counter() - t0
+
+    # Autosave and update the share link only when the config changed since the last rerun
+    draft_sig = _digest(board, title_block)
+    if st.session_state.get("draft_sig") != draft_sig:
+        st.session_state.draft_sig = draft_sig
+        queue_draft(draft_id, board, title_block)
+        st.query_params["cfg"] = config_token(board, title_block)
 
     st.subheader("Preview")
-    fig = draw_preview_mpl(voltage, num_in, n_swg, section_distribution, inc_bc_status, 
-                           msb_bc_status, lv_couplers, lv_bc_status, swg_names, swg_configs, 
-                           inter_sub_bus_couplers, inter_lv_couplers)
-    st.pyplot(fig, use_container_width=True)
-    
-    plt.close(fig)
-    
-    pptx_data = generate_pptx(voltage, num_in, n_swg, section_distribution, inc_bc_status, msb_bc_status, 
-                              lv_couplers, lv_bc_status, swg_names, swg_configs,
-                              inter_sub_bus_couplers, inter_lv_couplers)
+    t = time.perf_counter()
+    preview = cached_preview_png(board)
+    st.image(preview, use_container_width=True)
+    ms["preview"] = time.perf_counter() - t
     
+    # A template that can't be read is left out up front; errors building the deck itself surface
+    if template is not None:
+        try:
+            load_template(template)
+        except Exception as e:
+            st.warning(f"Template not used: {e}")
+            template = None
+
+    # Served from the on-disk deck cache; bytes are only loaded when clicked
+    deck = dict(template=template, title_block=title_block)
+    # Sheets unchanged since this session's last build are copied, not redrawn
+    reuse = st.session_state.setdefault("deck_reuse", {})
+    t = time.perf_counter()
+    pptx_data = cached_deck_download_data(board, deck, reuse)
+    ms["pptx"] = time.perf_counter() - t
+
     st.download_button("📥 Download PowerPoint", pptx_data, 
                        f"SLD_{voltage}.pptx", 
-                       "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                       PPTX_MIME, on_click=capture_config, args=(board,),
                        type="primary", use_container_width=True)
+    
+    # Built only when clicked
+    st.download_button("🗂️ Download Export Bundle (PPTX, PNG, SVG, PDF, JSON)", lambda: export_bundle_file(board, deck),
+                       f"SLD_{voltage}_bundle.zip", "application/zip", on_click=capture_config, args=(board,),
+                       use_container_width=True)
+
+    usage = {"Deck reuse": reuse.get("bytes", 0), "Preview image": len(preview),
+             "Config": len(board_to_json(board)) + len(json.dumps(title_block))}
+    # Over the cap, the session's caches go first; that costs rebuild speed, nothing else
+    if sum(usage.values()) > SESSION_MEM_CAP_BYTES and reuse:
+        reuse.clear(); usage["Deck reuse"] = 0
+    sessions, total = account_session(get_script_run_ctx().session_id, usage)
+    with st.expander("Debug: memory"):
+        mb = lambda n: f"{n / 2**20:.2f} MB"
+        st.markdown("\n".join(f"- {part}: {mb(n)}" for part, n in usage.items()))
+        st.caption(f"This session {mb(sum(usage.values()))} of {mb(SESSION_MEM_CAP_BYTES)} cap · "
+                   f"{sessions} connected sessions {mb(total)} · {len(_fragments)} cached feeders · "
+                   f"process RSS {mb(process_rss() or 0)} · rendered files are in the shared render cache")
+
+    # Phase times in ms, kept for replay.py and written to the trace if on
+    ms["total"] = time.perf_counter() - t0
+    ms = {phase: round(v * 1e3, 1) for phase, v in ms.items()}
+    board_sig = _digest(board)[:16]
+    st.session_state.rerun_stats = {"ms": ms, "board": board_sig}
+    if TRACE_DIR: trace_rerun(board_to_widget_state(board, title_block), board_sig, ms, loaded is not None)
 
 if __name__ == "__main__":
-    main()
+    # Streamlit runs this file as a fresh __main__ on every rerun. main() of the
+    # imported module keeps the caches, sheet pool and autosave thread above
+    # alive across reruns and sessions; a changed file is reimported.
+    import deploycode
+    deploycode.main()
@@ -0,0 +1,177 @@
+"""Load test for deploycode.py: many simulated sessions, no browser.
+
+    python loadtest.py --sessions 1,2,4,8
+
+Each session logs in through streamlit.testing.v1.AppTest and walks the
+edits an engineer makes building a board: feeders added, Sub-Boards and
+Extensions set up, couplers toggled. Every edit is one rerun. The sessions
+of a level run as threads of this process, as a Streamlit server runs them,
+so they share its caches, sheet workers and GIL. For each concurrency level
+it prints rerun latency percentiles, CPU used and peak memory.
+"""
+import os
+import sys
+import math
+import time
+import argparse
+import tempfile
+import threading
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "deploycode.py")
+
+# (widget kind, key, value); "toggle" flips the first option of a multiselect.
+# "{s}" in a value becomes the session number, so sessions build distinct boards.
+WALK = (
+    ("selectbox", "sys_v", "33kV"),
+    ("number_input", "sys_nswg", 6),
+    ("text_input", "n_0", "S{s} Main"),
+    ("selectbox", "t_1", "Sub-Board"),
+    ("number_input", "nsf_1", 4),
+    ("selectbox", "sft_1_0", "Extension"),
+    ("number_input", "next_1_0", 3),
+    ("toggle", "ssc_1", None),
+    ("selectbox", "t_2", "Sub-Board"),
+    ("toggle", "inter_sb_c", None),
+    ("selectbox", "t_3", "Extension"),
+    ("number_input", "nef_3", 3),
+    ("toggle", "ext_bc_3", None),
+    ("selectbox", "t_4", "MV Gen"),
+    ("selectbox", "mbc_0", "NC"),
+    ("number_input", "sys_nswg", 8),
+    ("toggle", "lv_c_sel", None),
+    ("text_input", "n_7", "S{s} Chiller"),
+    ("toggle", "inter_sb_c", None),
+)
+
+def find_widget(at, kind, key):
+    """The sidebar widget whose key is `key` in any widget generation, or None."""
+    for w in getattr(at.sidebar, kind):
+        if w.key == key or (w.key or "").endswith("/" + key): return w
+    return None
+
+def apply_edit(at, kind, key, value, session):
+    """Sets one widget; returns False if it is not on the page."""
+    w = find_widget(at, "multiselect" if kind == "toggle" else kind, key)
+    if w is None: return False
+    if kind == "toggle":
+        opt = w.options[0]
+        (w.unselect if opt in w.value else w.select)(opt)
+    elif kind == "text_input":
+        w.input(value.format(s=session))
+    else:
+        w.set_value(value)
+    return True
+
+def share_script_cache():
+    """Compiles the script once for all sessions, as a server does.
+
+    AppTest gives every run a new ScriptCache, which recompiles the script
+    (half a second here) and breaks when threads compile at once.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    shared, get_bytecode = ScriptCache(), ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, path: get_bytecode(shared, path)
+
+# --- Process usage ---
+# CPU and memory of this process plus its children (the sheet workers), from
+# /proc. Memory is the proportional set size, so pages the workers share with
+# the server after the fork count once.
+
+def _pids():
+    pids = [os.getpid()]
+    try:
+        for task in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{task}/children") as f: pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    return pids
+
+def proc_usage():
+    """(CPU seconds, memory bytes) of this process and its live children; (None, None) without /proc."""
+    cpu = mem = 0
+    tick = os.sysconf("SC_CLK_TCK")
+    for pid in _pids():
+        try:
+            with open(f"/proc/{pid}/stat") as f: fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                mem += next(int(line.split()[1]) * 1024 for line in f if line.startswith("Pss:"))
+        except (OSError, StopIteration):
+            if pid == os.getpid(): return None, None
+            continue # Worker exited meanwhile
+        cpu += (int(fields[11]) + int(fields[12])) / tick
+    return cpu, mem
+
+def percentile(xs, p):
+    """Nearest-rank percentile of a sorted list."""
+    return xs[max(0, math.ceil(p / 100 * len(xs)) - 1)]
+
+# --- Sessions ---
+
+def run_session(session, args, start, out):
+    """Walks one session through the edits; fills `out` with its rerun latencies and failures."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.session_state["authenticated"] = True
+    start.wait()
+    steps = [None] + list(WALK) # None: the first page load
+    for _ in range(args.rounds):
+        for step in steps:
+            if step is not None and not apply_edit(at, *step, session):
+                out["skipped"] += 1; continue
+            t0 = time.perf_counter()
+            try:
+                at.run()
+            except Exception: # Timed out or crashed; the rerun still counts
+                out["errors"] += 1
+            out["latency"].append(time.perf_counter() - t0)
+            if at.exception: out["errors"] += 1
+            if args.think: time.sleep(args.think)
+        steps = WALK # Later rounds repeat the edits on the built board; toggles flip back
+
+def run_level(n, args):
+    """Runs n sessions at once; returns their merged stats."""
+    outs = [{"latency": [], "errors": 0, "skipped": 0} for _ in range(n)]
+    start = threading.Barrier(n + 1)
+    threads = [threading.Thread(target=run_session, args=(s, args, start, outs[s]), daemon=True) for s in range(n)]
+    for t in threads: t.start()
+    peak, done = [0], threading.Event()
+    def sample():
+        while not done.wait(0.1): peak[0] = max(peak[0], proc_usage()[1] or 0)
+    sampler = threading.Thread(target=sample, daemon=True); sampler.start()
+    cpu0 = proc_usage()[0]; start.wait(); t0 = time.perf_counter()
+    for t in threads: t.join()
+    wall = time.perf_counter() - t0; cpu1 = proc_usage()[0]
+    done.set(); sampler.join()
+    lat = sorted(x for out in outs for x in out["latency"])
+    return {"sessions": n, "reruns": len(lat), "p50": percentile(lat, 50), "p95": percentile(lat, 95),
+            "p99": percentile(lat, 99), "max": lat[-1], "rate": len(lat) / wall,
+            "cpu": (cpu1 - cpu0) / wall if cpu0 is not None else None, "mem": peak[0],
+            "errors": sum(out["errors"] for out in outs), "skipped": sum(out["skipped"] for out in outs)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sessions", default="1,2,4,8", help="concurrency levels, comma separated")
+    parser.add_argument("--rounds", type=int, default=1, help="times each session walks the edits")
+    parser.add_argument("--think", type=float, default=0.0, help="seconds a session waits between edits")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds before a rerun counts as failed")
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="use the app's deck cache and project store instead of fresh temp ones")
+    args = parser.parse_args()
+    if not args.keep_caches: # Must be set before the app module is first imported
+        tmp = tempfile.mkdtemp(prefix="sld_loadtest_")
+        os.environ["SLD_DECK_CACHE_DIR"] = os.path.join(tmp, "deck_cache")
+        os.environ["SLD_PROJECT_DB"] = os.path.join(tmp, "projects.sqlite3")
+    sys.path.insert(0, os.path.dirname(APP))
+    share_script_cache()
+
+    print(f"{'sessions':>8} {'reruns':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'reruns/s':>8} {'CPU %':>6} {'mem MB':>7} {'errors':>6}")
+    for n in [int(x) for x in args.sessions.split(",")]:
+        r = run_level(n, args)
+        cpu = f"{r['cpu'] * 100:6.0f}" if r["cpu"] is not None else f"{'-':>6}"
+        print(f"{n:>8} {r['reruns']:>6} {r['p50']*1e3:8.0f} {r['p95']*1e3:8.0f} {r['p99']*1e3:8.0f} {r['max']*1e3:8.0f} "
+              f"{r['rate']:8.2f} {cpu} {r['mem'] / 2**20:7.0f} {r['errors']:>6}", flush=True)
+        if r["skipped"]: print(f"{'':>8} {r['skipped']} edits skipped: widget not on the page")
+
+if __name__ == "__main__":
+    main()
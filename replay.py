@@ -0,0 +1,99 @@
+"""Replays a rerun trace of deploycode.py headlessly and times every step.
+
+    SLD_TRACE_DIR=traces streamlit run deploycode.py      # record sessions
+    python replay.py traces/20261019-101500-1a2b3c4d.jsonl
+
+A trace holds one line per rerun of a real session: the sidebar values that
+changed, resets and loads. Each is applied to a fresh AppTest session of
+main() and rerun, so the widget tree grows the way it did for the user.
+Prints every step's latency split into sidebar, preview and PPTX time next
+to the recorded total, marks steps whose board differs from the recorded
+one, then percentiles per phase.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from loadtest import APP, find_widget, percentile, share_script_cache
+
+PHASES = ("sidebar", "preview", "pptx", "total")
+WIDGET_KINDS = ("selectbox", "number_input", "text_input", "multiselect", "checkbox", "radio")
+
+def read_trace(path):
+    """(header, steps) of a trace file."""
+    with open(path) as f: lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("trace") != 1:
+        raise SystemExit(f"{path}: not a version 1 trace")
+    return lines[0], lines[1:]
+
+def apply_step(at, step):
+    """Applies a step's load, resets and widget values; returns how many values had no widget."""
+    if "load" in step: # Its reset is part of the load
+        at.session_state["project_load"] = step["load"]; return 0
+    for kind, feeder in step["events"]:
+        if kind != "reset": continue
+        if feeder is None: next(b for b in at.sidebar.button if b.label == "Reset All").click()
+        elif find_widget(at, "button", f"reset_{feeder}"): find_widget(at, "button", f"reset_{feeder}").click()
+    missing = 0
+    for key, value in step.get("set", {}).items():
+        w = next((w for kind in WIDGET_KINDS for w in [find_widget(at, kind, key)] if w is not None), None)
+        if w is None: missing += 1; continue # Appears with this rerun, at its default
+        (w.input if w.type == "text_input" else w.set_value)(value)
+    return missing
+
+def describe(step):
+    if "load" in step: return "load"
+    what = [f"reset {'all' if f is None else f'F-{f + 1}'}" for _, f in step["events"]]
+    what += [f"{k}={v!r}" for k, v in step.get("set", {}).items()]
+    text = ", ".join(what) or "rerun"
+    return text if len(text) <= 40 else text[:37] + "..."
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("trace", help="trace file (.jsonl) written with SLD_TRACE_DIR")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds before a rerun counts as failed")
+    parser.add_argument("--keep-caches", action="store_true",
+                        help="use the app's deck cache and project store instead of fresh temp ones")
+    parser.add_argument("--json", help="also write the step timings to this file")
+    args = parser.parse_args()
+    _, steps = read_trace(args.trace)
+    if not args.keep_caches: # Must be set before the app module is first imported
+        tmp = tempfile.mkdtemp(prefix="sld_replay_")
+        os.environ["SLD_DECK_CACHE_DIR"] = os.path.join(tmp, "deck_cache")
+        os.environ["SLD_PROJECT_DB"] = os.path.join(tmp, "projects.sqlite3")
+    os.environ.pop("SLD_TRACE_DIR", None) # Don't trace the replay
+    sys.path.insert(0, os.path.dirname(APP))
+    share_script_cache()
+
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.session_state["authenticated"] = True
+    print(f"{'step':>4} {'change':<40} {'wall':>7} {'sidebar':>8} {'preview':>8} {'pptx':>7} {'total':>7} {'rec.':>7}")
+    results, diverged = [], 0
+    for step in steps:
+        # Step 0 is the first page load; it has nothing to apply unless the session began with a load
+        missing = apply_step(at, step) if step["step"] or "load" in step else 0
+        t0 = time.perf_counter()
+        at.run()
+        wall = (time.perf_counter() - t0) * 1e3
+        if at.exception: raise SystemExit(f"step {step['step']}: {at.exception[0].message}")
+        stats = at.session_state["rerun_stats"]
+        same = stats["board"] == step["board"]; diverged += not same
+        results.append({"step": step["step"], "wall": round(wall, 1), "missing": missing, "same_board": same, **stats["ms"]})
+        ms = stats["ms"]
+        print(f"{step['step']:>4} {describe(step):<40} {wall:7.0f} {ms['sidebar']:8.0f} {ms['preview']:8.0f} "
+              f"{ms['pptx']:7.0f} {ms['total']:7.0f} {step['ms'].get('total', 0):7.0f}{'' if same else '  board differs'}")
+
+    print()
+    for phase in PHASES:
+        xs = sorted(r[phase] for r in results)
+        print(f"{phase:>8}: p50 {percentile(xs, 50):7.0f} ms  p95 {percentile(xs, 95):7.0f} ms  max {xs[-1]:7.0f} ms")
+    if diverged: print(f"{diverged} of {len(results)} steps built a different board than recorded")
+    if args.json:
+        with open(args.json, "w") as f: json.dump({"trace": args.trace, "steps": results}, f, indent=1)
+
+if __name__ == "__main__":
+    main()
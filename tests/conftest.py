@@ -0,0 +1,53 @@
+"""Shared fixtures: the app module with its on-disk stores in a temp dir, and a board builder."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope="session")
+def dc(tmp_path_factory):
+    """deploycode, imported with its deck cache and project store under a temp dir."""
+    tmp = tmp_path_factory.mktemp("sld")
+    os.environ["SLD_DECK_CACHE_DIR"] = str(tmp / "deck_cache")
+    os.environ["SLD_PROJECT_DB"] = str(tmp / "projects.sqlite3")
+    for var in ("SLD_TRACE_DIR", "SLD_CORPUS_PATH"): os.environ.pop(var, None)
+    import deploycode
+    return deploycode
+
+def std(name, bess=False, emsb=False):
+    gens = [{"type": "Solar", "kWac": 100, "cap_val": 120}] + ([{"type": "BESS", "kWac": 100, "cap_val": 200}] if bess else [])
+    return {"type": "Standard", "msb_name": name, "gens": gens, "emsb": {"has": emsb, "name": "EMSB"}, "tx_scheme": "33/0.4 kV"}
+
+def sub_board(name):
+    gens = [{"type": "Solar", "kWac": 100, "cap_val": 120}]
+    return {"type": "Sub-Board", "msb_name": name, "gens": [], "emsb": {"has": False, "name": "EMSB"}, "sub_voltage": "11kV",
+            "sub_couplers": [0],
+            "sub_feeders": {0: {"type": "Standard", "name": "SF-1", "gens": gens, "has_emsb": True,
+                                "extension_feeders": {}, "extension_couplers": []},
+                            1: {"type": "Extension", "name": "SF-2", "gens": [], "has_emsb": False, "extension_couplers": [0],
+                                "extension_feeders": {0: {"type": "Standard", "name": "EF-1", "gens": gens, "has_emsb": False},
+                                                      1: {"type": "Standard", "name": "EF-2", "gens": gens, "has_emsb": True}}}}}
+
+def make_board(n=4, num_in=2, subs=(1,)):
+    """A 33kV board of n feeders over num_in incomers; feeders in `subs` are Sub-Boards, the rest Standard."""
+    configs = {i: sub_board(f"F-{i + 1}") if i in subs else std(f"F-{i + 1}", bess=i % 2 == 0, emsb=i % 3 == 0) for i in range(n)}
+    dist = [n // num_in] * (num_in - 1); dist.append(n - sum(dist))
+    return dict(voltage="33kV", num_in=num_in, num_swg=n, section_distribution=dist, inc_bc_status=[],
+                msb_bc_status={s: "NO" for s in range(num_in - 1)}, lv_couplers=[], lv_bc_status={},
+                swg_names=[f"F-{i + 1}" for i in range(n)], swg_configs=configs,
+                inter_sub_bus_couplers=[], inter_lv_couplers=[i for i in range(n - 1) if i not in subs and i + 1 not in subs])
+
+@pytest.fixture
+def board():
+    return make_board
+
+@pytest.fixture
+def store(dc, tmp_path, monkeypatch):
+    """The project store in a fresh SQLite file for this test."""
+    import threading
+    monkeypatch.setattr(dc, "PROJECT_DB_PATH", str(tmp_path / "projects.sqlite3"))
+    monkeypatch.setattr(dc, "_project_db", threading.local())
+    return dc
@@ -0,0 +1,35 @@
+"""Share-link tokens and the checks a restored config must pass."""
+import copy
+
+import pytest
+
+from conftest import make_board
+
+def test_token_round_trip(dc):
+    board, title_block = make_board(6), {"project": "Plant A", "date": "2026-10-19"}
+    token = dc.config_token(board, title_block)
+    assert token.startswith(dc.CONFIG_TOKEN_VERSION + ".")
+    assert dc.config_from_token(token) == (board, title_block)
+    dc.check_config(board, title_block)
+    assert dc.board_to_widget_state(board, title_block)["sys_nswg"] == 6
+
+@pytest.mark.parametrize("token", ["v0.abc", "v1.", "v1.!!!", "v1.eJzLSM3JyVcozy_KSQEAGgQEXQ", "nonsense"])
+def test_unreadable_tokens(dc, token):
+    assert dc.config_from_token(token) is None
+
+def feeders(b): b["num_swg"] = 7; b["section_distribution"][-1] += 1; b["swg_names"].append("F-7")
+def voltage(b): b["voltage"] = "66kV"
+def kwac(b): b["swg_configs"][0]["gens"][0]["kWac"] = 10**6
+def kwac_text(b): b["swg_configs"][0]["gens"][0]["kWac"] = "100"
+def coupler(b): b["inter_lv_couplers"].append(5)
+def sections(b): b["section_distribution"] = [1, 1]
+def sub_feeders(b): del b["swg_configs"][1]["sub_feeders"][0]
+def title_block(b): b["title_block"] = {"author": "x"}
+
+@pytest.mark.parametrize("break_it", [feeders, voltage, kwac, kwac_text, coupler, sections, sub_feeders, title_block])
+def test_check_config_rejects(dc, break_it):
+    board = copy.deepcopy(make_board(6))
+    break_it(board)
+    title = board.pop("title_block", None)
+    restored, title = dc.config_from_token(dc.config_token(board, title))
+    with pytest.raises(ValueError): dc.check_config(restored, title)
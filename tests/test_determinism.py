@@ -0,0 +1,45 @@
+"""Identical configs must give byte-identical decks, across processes and build paths."""
+import os
+import sys
+import subprocess
+
+import pytest
+
+from conftest import ROOT, make_board
+
+# Builds a split board with a Sub-Board, an Extension and couplers in a fresh
+# interpreter; prints the sha256 of its deck and how many sheet bodies came
+# back from the workers through shared memory
+SCRIPT = """
+import hashlib
+import deploycode as dc
+from conftest import make_board
+taken = []
+take = dc.shm_take
+dc.shm_take = lambda *args: taken.append(args[0]) or take(*args)
+board = make_board(12)
+deck = dc.generate_pptx(**board, title_block={"project": "Determinism", "revision": "A"})
+print(hashlib.sha256(bytes(deck)).hexdigest(), len(taken))
+"""
+
+def deck_digest(seed, workers):
+    env = {**os.environ, "PYTHONHASHSEED": str(seed), "SLD_SHEET_WORKERS": str(workers),
+           "PYTHONPATH": os.pathsep.join([ROOT, os.path.dirname(__file__)])}
+    out = subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, env=env, check=True,
+                         capture_output=True, text=True).stdout.split()
+    return out[0], int(out[1])
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_same_board_same_bytes(workers):
+    (first, shm), (second, _) = deck_digest(1, workers), deck_digest(2, workers)
+    assert len(first) == 64 and first == second
+    assert (shm > 0) == (workers > 1) # Two workers hand both sheets back in shared memory
+    assert first == deck_digest(3, 1)[0] # Same deck whichever way its sheets were drawn
+
+def test_reuse_gives_same_bytes(dc, monkeypatch):
+    monkeypatch.setattr(dc, "SHEET_WORKERS", 1)
+    board = make_board(12)
+    reuse = {}
+    first = dc.generate_pptx(**board, reuse=reuse)
+    assert reuse["slides"] and dc.generate_pptx(**board, reuse=reuse) == first
+    assert dc.generate_pptx(**board) == first
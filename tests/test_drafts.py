@@ -0,0 +1,30 @@
+"""Autosaved drafts: the write-behind queue and the drafts table."""
+import sqlite3
+
+import pytest
+
+from conftest import make_board
+
+@pytest.fixture
+def drafts(store, monkeypatch):
+    monkeypatch.setattr(store, "DRAFT_INTERVAL_S", 3600) # Only the test flushes
+    return store
+
+def test_draft_round_trip(drafts):
+    dc = drafts
+    dc.queue_draft("tab1", make_board(4))
+    dc.queue_draft("tab1", make_board(6), {"drawing_no": "D-1"}) # Latest wins
+    assert dc.load_draft("tab1") is None # Not written until flushed
+    dc.flush_drafts()
+    assert dc.load_draft("tab1") == (make_board(6), {"drawing_no": "D-1"})
+    assert dc.load_draft("tab2") is None
+
+def test_failed_batch_is_queued_again(drafts, monkeypatch):
+    dc = drafts
+    def broken(): raise sqlite3.OperationalError("database is locked")
+    dc.queue_draft("tab1", make_board(4))
+    with monkeypatch.context() as m:
+        m.setattr(dc, "project_db", broken)
+        with pytest.raises(sqlite3.OperationalError): dc.flush_drafts()
+    dc.flush_drafts()
+    assert dc.load_draft("tab1") == (make_board(4), {})
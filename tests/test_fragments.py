@@ -0,0 +1,24 @@
+"""A feeder stamped from the fragment cache matches a fresh draw of it."""
+import copy
+
+def build(dc, monkeypatch, board):
+    drawn = []
+    draw = dc.draw_feeder_on_slide
+    monkeypatch.setattr(dc, "draw_feeder_on_slide", lambda *args: drawn.append(args[2]) or draw(*args))
+    return dc.generate_pptx(**board), drawn
+
+def test_cache_hit_same_as_fresh_draw(dc, monkeypatch, board):
+    monkeypatch.setattr(dc, "SHEET_WORKERS", 1)
+    first = board(6)
+    # Widening F-1 moves every later feeder, so their hits are stamped at a new x
+    moved = copy.deepcopy(first); moved["swg_configs"][0] = copy.deepcopy(first["swg_configs"][1])
+    moved["swg_configs"][0]["msb_name"] = "F-1"
+
+    dc._fragments.clear()
+    fresh, drawn = build(dc, monkeypatch, moved)
+    assert drawn == list(range(6))
+    dc._fragments.clear()
+    build(dc, monkeypatch, first)
+    hit, drawn = build(dc, monkeypatch, moved)
+    assert drawn == [0] # Only the changed feeder is drawn again
+    assert hit == fresh
@@ -0,0 +1,21 @@
+"""Merging of touching colinear segments before they are drawn."""
+
+def test_touching_segments_merge(dc):
+    runs = dc.merge_colinear([(0, 0, 0, 1, "s", "a"), (0, 1, 0, 2, "s", "b")])
+    assert runs == [(0, 0, 0, 2, "s", ["a", "b"])]
+
+def test_overlapping_segments_merge(dc):
+    runs = dc.merge_colinear([(1, 5, 3, 5, "s", "a"), (0, 5, 2, 5, "s", "b"), (3, 5, 2, 5, "s", "c")])
+    assert runs == [(0, 5, 3, 5, "s", ["a", "b", "c"])] # Payloads in drawing order
+
+def test_disjoint_segments_stay_apart(dc):
+    runs = dc.merge_colinear([(0, 0, 0, 1, "s", "a"), (0, 2, 0, 3, "s", "b")])
+    assert runs == [(0, 0, 0, 1, "s", ["a"]), (0, 2, 0, 3, "s", ["b"])]
+
+def test_other_style_line_or_slope_stay_apart(dc):
+    segs = [(0, 0, 0, 1, "s", "a"), (0, 1, 0, 2, "t", "b"), (1, 1, 1, 2, "s", "c"), (0, 2, 1, 3, "s", "d")]
+    assert [r[-1] for r in dc.merge_colinear(segs)] == [["a"], ["b"], ["c"], ["d"]]
+
+def test_runs_keep_order_of_first_segment(dc):
+    segs = [(5, 0, 6, 0, "s", "a"), (0, 0, 0, 1, "s", "b"), (6, 0, 7, 0, "s", "c")]
+    assert [r[-1] for r in dc.merge_colinear(segs)] == [["a", "c"], ["b"]]
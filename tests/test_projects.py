@@ -0,0 +1,14 @@
+"""Named projects and their revisions in the SQLite project store."""
+from conftest import make_board
+
+def test_revisions_round_trip(store):
+    dc = store
+    first, second = make_board(4), make_board(6)
+    r1 = dc.save_revision("Plant A", first, {"project": "Plant A", "revision": "A"})
+    r2 = dc.save_revision("Plant A", second)
+    dc.save_revision("Plant B", first)
+    assert sorted(name for name, _, _ in dc.list_projects()) == ["Plant A", "Plant B"]
+    assert dict((name, n) for name, n, _ in dc.list_projects())["Plant A"] == 2
+    assert [rev for rev, _ in dc.list_revisions("Plant A")] == [r2, r1]
+    assert dc.load_revision(r1) == (first, {"project": "Plant A", "revision": "A"})
+    assert dc.load_revision(r2) == (second, {})
@@ -0,0 +1,56 @@
+"""Sheet bodies drawn in worker processes: shared memory handoff, timeouts and errors."""
+import os
+import glob
+from multiprocessing import shared_memory
+
+import pytest
+
+from conftest import make_board
+
+def segments():
+    return set(glob.glob("/dev/shm/psm_*"))
+
+@pytest.fixture
+def workers(dc, monkeypatch):
+    """Two sheet workers, shut down after the test."""
+    monkeypatch.setattr(dc, "SHEET_WORKERS", 2)
+    monkeypatch.setitem(dc._sheet_pool_state, "off", False)
+    yield dc
+    if dc._sheet_pool is not None: dc.reset_sheet_pool(dc._sheet_pool)
+
+def in_process(dc, monkeypatch, board):
+    monkeypatch.setattr(dc, "SHEET_WORKERS", 1)
+    deck = dc.generate_pptx(**board)
+    monkeypatch.setattr(dc, "SHEET_WORKERS", 2)
+    return deck
+
+def test_shm_take_unlinks_segment(dc):
+    name, spans = dc.shm_put([b"abc", b"", b"defg"])
+    assert dc.shm_take(name, spans, bytes) == [b"abc", b"", b"defg"]
+    with pytest.raises(FileNotFoundError): shared_memory.SharedMemory(name=name)
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs /dev/shm")
+def test_workers_leave_no_segments(workers, monkeypatch):
+    dc, board = workers, make_board(12)
+    taken = []; take = dc.shm_take
+    monkeypatch.setattr(dc, "shm_take", lambda *args: taken.append(args[0]) or take(*args))
+    before = segments()
+    assert dc.generate_pptx(**board) == in_process(dc, monkeypatch, board)
+    assert len(taken) == 2 and segments() == before
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs /dev/shm")
+def test_timeout_draws_in_process(workers, monkeypatch):
+    dc, board = workers, make_board(12)
+    expected = in_process(dc, monkeypatch, board)
+    dc.generate_pptx(**board) # Warm workers
+    before = segments()
+    monkeypatch.setattr(dc, "SHEET_TIMEOUT_S", 0)
+    assert dc.generate_pptx(**board) == expected
+    assert dc._sheet_pool is None and not dc._sheet_pool_state["off"] # Reset, not turned off
+    assert segments() == before
+
+def test_drawing_error_propagates(workers):
+    dc = workers
+    with pytest.raises(TypeError):
+        dc.draw_sheet_bodies([(dc.draw_sheet_lhs, ()), (dc.draw_sheet_rhs, ())])
+    assert dc._sheet_pool is not None # Still usable